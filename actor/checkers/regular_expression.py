@@ -1,6 +1,137 @@
+import collections
 import re
+import threading
 
-from actor.core.plugins import Checker
+from actor.core.config import config
+from actor.core.plugins import Checker, freeze
+
+# Patterns which cannot be combined with others, since they use
+# backreferences (numbered groups shift in the combined pattern) or global
+# inline flags (which would apply to all the patterns)
+UNCOMBINABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)')
+
+# The re module supports at most 100 groups per pattern
+MAX_GROUPS = 99
+
+
+class MultiPattern(object):
+    """
+    Finds which of the named patterns match a string, scanning it once.
+
+    The patterns are combined into an alternation, whose matches are found
+    in a single pass. Since the alternation reports only the first pattern
+    matching at a position and skips the positions its matches cover, the
+    covered positions are then tested for all the patterns at once, using
+    a combination of optional lookaheads anchored at the position. Every
+    pattern match starts at some covered position.
+    """
+
+    def __init__(self, patterns):
+        self.combined = []
+        self.separate = {}
+
+        chunk = []
+        groups = 0
+
+        for name, pattern in sorted(patterns.items()):
+            regex = re.compile(pattern)
+
+            if UNCOMBINABLE.search(pattern):
+                self.separate[name] = regex
+                continue
+
+            if groups + regex.groups + 1 > MAX_GROUPS:
+                self.combine(chunk)
+                chunk, groups = [], 0
+
+            chunk.append((name, pattern, regex))
+            groups += regex.groups + 1
+
+        self.combine(chunk)
+
+    def combine(self, chunk):
+        if not chunk:
+            return
+
+        names = {}
+        alternatives = []
+        lookaheads = []
+
+        for index, (name, pattern, _) in enumerate(chunk):
+            group = 'p{0}'.format(index)
+            names[group] = name
+            alternatives.append('(?P<{0}>{1})'.format(group, pattern))
+            lookaheads.append('(?:(?=(?P<{0}>{1})))?'.format(group, pattern))
+
+        try:
+            self.combined.append((re.compile('|'.join(alternatives)),
+                                  re.compile(''.join(lookaheads)),
+                                  names))
+        except re.error:
+            # I.e. the patterns share the names of their groups
+            self.separate.update((name, regex) for name, _, regex in chunk)
+
+    def matches(self, string):
+        """
+        Returns the sorted list of the names of the patterns matching the
+        string.
+        """
+
+        names = [name for name, regex in self.separate.items()
+                 if regex.search(string)]
+
+        for scanner, anchored, groups in self.combined:
+            positions = set()
+
+            for match in scanner.finditer(string):
+                positions.update(range(match.start(),
+                                       max(match.end(), match.start() + 1)))
+
+            found = set()
+
+            for position in sorted(positions):
+                match = anchored.match(string, position)
+                found.update(group for group in groups
+                             if match.group(group) is not None)
+
+                if len(found) == len(groups):
+                    break
+
+            names.extend(groups[group] for group in found)
+
+        return sorted(names)
+
+
+class PatternCache(object):
+    """
+    Keeps up to REGEX_CACHE_SIZE compiled (multi)patterns, dropping the
+    least recently used ones.
+    """
+
+    def __init__(self):
+        self.patterns = collections.OrderedDict()
+
+        # Checkers can be evaluated from the prefetching threads
+        self.lock = threading.Lock()
+
+    def get(self, key, compile_pattern):
+        with self.lock:
+            pattern = self.patterns.pop(key, None)
+
+        if pattern is None:
+            pattern = compile_pattern()
+
+        with self.lock:
+            self.patterns[key] = pattern
+
+            while len(self.patterns) > config.REGEX_CACHE_SIZE:
+                self.patterns.popitem(last=False)
+
+        return pattern
+
+
+# Shared by the regular expression checkers
+cache = PatternCache()
 
 
 class RegularExpressionChecker(Checker):
@@ -18,4 +149,32 @@ class RegularExpressionChecker(Checker):
     def run(self, regexp, string):
         # pylint: disable=arguments-differ
 
-        return bool(re.search(regexp, string or ''))
+        pattern = cache.get(regexp, lambda: re.compile(regexp))
+        return bool(pattern.search(string or ''))
+
+
+class RegularExpressionsChecker(Checker):
+    """
+    Evaluates which of the patterns occur in the input, scanning it once.
+
+    Expects following keyword arguments:
+      - patterns - Dictionary of the regular expressions, keyed by their
+                   names, or a list of the regular expressions (which then
+                   serve as their own names)
+      - string   - Input string tested to match the regular expressions
+
+    Returns the sorted list of the names of the matching patterns, i.e. an
+    empty (false) list if none of them matches.
+    """
+
+    identifier = 'regular_expressions'
+
+    def run(self, patterns, string):
+        # pylint: disable=arguments-differ
+
+        if not isinstance(patterns, dict):
+            patterns = {pattern: pattern for pattern in patterns}
+
+        multipattern = cache.get(('multi', freeze(patterns)),
+                                 lambda: MultiPattern(patterns))
+        return multipattern.matches(string or '')
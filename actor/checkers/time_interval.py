@@ -1,7 +1,5 @@
-import datetime
-
 from actor.core.plugins import Checker
-from actor.core.util import convert_timestamp
+from actor.core.timeline import index
 
 
 class TimeIntervalChecker(Checker):
@@ -10,7 +8,8 @@ class TimeIntervalChecker(Checker):
     (interval computed as <a,b) - start inclusive, end exclusive)
 
     The start and end points are to be specified by datetime.time object
-    or string of '%H.%M' form.
+    or string of '%H.%M' form. The intervals are parsed once, and looked up
+    in the shared schedule index (see actor.core.timeline.ScheduleIndex).
     """
 
     identifier = 'time_interval'
@@ -18,15 +17,4 @@ class TimeIntervalChecker(Checker):
     def run(self, start, end):
         # pylint: disable=arguments-differ
 
-        start = convert_timestamp(start)
-        end = convert_timestamp(end)
-
-        # If the start of the interval is later than the end, add one day
-        if start > end:
-            end = end + datetime.timedelta(days=1)
-
-        time = self.report('time')
-        time_shifted = time + datetime.timedelta(days=1)
-
-        return any([start <= time < end,
-                    start <= time_shifted < end])
+        return index.contains(start, end, self.report('time'))
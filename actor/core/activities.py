@@ -3,8 +3,10 @@ import itertools
 import psutil
 import subprocess
 
+import snapshot
 import util
 from plugins import Plugin, PluginMount, ContextProxyMixin, PersistentStateMixin
+from proctree import index as process_index
 from config import config
 
 # Define own our commands so that we don't kill ourselves under
@@ -49,6 +51,9 @@ class ActivityApplicationEnforcementMixin(object):
     whitelisted_commands = tuple()
     whitelisted_titles = tuple()
 
+    # Compiled in the setup, see compile_matchers
+    blacklisted_command = None
+
     def active(self):
         return any([self.blacklisted_commands,
                     self.whitelisted_commands,
@@ -65,6 +70,40 @@ class ActivityApplicationEnforcementMixin(object):
         self.whitelisted_titles = (self.whitelisted_titles +
                                    config.WHITELISTED_TITLES)
 
+        self.compile_matchers()
+
+    def compile_matchers(self):
+        # Compile the lists once, they are checked on every round
+        self.whitelisted_title = util.SubstringMatcher(self.whitelisted_titles)
+        self.whitelisted_command = util.SubstringMatcher(
+            self.whitelisted_commands)
+        self.blacklisted_command = util.SubstringMatcher(
+            self.blacklisted_commands)
+        self.terminal_emulator = util.SubstringMatcher(
+            config.TERMINAL_EMULATORS)
+
+        # Verdicts about the commands of the running processes, keyed by
+        # (pid, command)
+        self.verdicts = {}
+
+    def forbidden(self, pid, command):
+        """
+        Returns True if the command running in the given process (inside
+        a terminal emulator) is blacklisted.
+        """
+
+        key = (pid, command)
+        verdict = self.verdicts.get(key)
+
+        if verdict is None:
+            # Do not let the verdicts of the exited processes pile up
+            if len(self.verdicts) >= 1024:
+                self.verdicts.clear()
+
+            verdict = self.verdicts[key] = self.blacklisted_command(command)
+
+        return verdict
+
     def run(self):
         """
         Performs the periodic activity validation.
@@ -78,48 +117,50 @@ class ActivityApplicationEnforcementMixin(object):
         if current_command is None or current_title is None:
             return
 
+        # The setup is skipped for the activities restored from the database
+        if self.blacklisted_command is None:
+            self.compile_matchers()
+
         # If no of the whitelisted entries partially matches the reported
         # window command / title, user will have to face the consenquences
-        if not any([t in current_title for t in self.whitelisted_titles] +
-                   [c in current_command for c in self.whitelisted_commands]):
+        if not (self.whitelisted_title(current_title) or
+                self.whitelisted_command(current_command)):
             self.fix('notify', message="Application not allowed")
             self.fix('kill_process', pid=self.report('active_window_pid'))
 
         # If we're running terminal emulator, we need to get inside
         # the emulator to detect what is actually being run inside
-        emulator_processes = []
-
-        if any([e in current_command
-                for e in config.TERMINAL_EMULATORS]):
+        if self.terminal_emulator(current_command):
 
-            active_window_process = self.report('active_window_process')
+            active_window_pid = self.report('active_window_pid')
 
-            if active_window_process:
-                emulator_processes = active_window_process.children(
-                    recursive=True)
+            if active_window_pid:
+                emulator_pids = process_index.descendants(active_window_pid)
 
                 # If we're running tmux, the commands are being executed
                 # under tmux server instead
-                if any(['tmux' in ' '.join(e.cmdline())
-                        for e in emulator_processes]):
+                if any(['tmux' in (process_index.cmdline(pid) or '')
+                        for pid in emulator_pids]):
 
-                    emulator_processes = list(itertools.chain(*[
-                        psutil.Process(pane_pid).children(recursive=True)
+                    emulator_pids = list(itertools.chain(*[
+                        process_index.descendants(pane_pid)
                         for pane_pid in self.report('tmux_active_panes_pids')
-                        if psutil.pid_exists(pane_pid)
                     ]))
 
                 # If the active window is a terminal emulator, perform
                 # selective blacklisting of the spawned applications
-                for process in emulator_processes:
-                    try:
-                        command = ' '.join(process.cmdline())
-                        if any([forbidden in command
-                                for forbidden in self.blacklisted_commands]):
-                            process.kill()
-                    except psutil.NoSuchProcess:
+                for pid in emulator_pids:
+                    command = process_index.cmdline(pid)
+
+                    if command is None:
                         # If process ended in the mean time, ignore it
-                        pass
+                        continue
+
+                    if self.forbidden(pid, command):
+                        try:
+                            psutil.Process(pid).kill()
+                        except psutil.NoSuchProcess:
+                            pass
 
 
 class AcitivityStartupCommandsMixin(object):
@@ -332,6 +373,20 @@ class ActivitySpec(object):
         return "{0}, duration {1}, shrinking {2} (max {3}), skipped: {4}".format(
                 self.identifier, self.duration, self.shrinking, self.max_shrinking, self.skipped)
 
+    def snapshot(self):
+        return (self.identifier, self.duration, self.max_shrinking,
+                self.priority, self.shrinking, self.skipped)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        spec = cls(*state[:4])
+        spec.shrinking, spec.skipped = state[4:]
+        return spec
+
+
+snapshot.register_codec(ActivitySpec, 'A', ActivitySpec.snapshot,
+                        ActivitySpec.from_snapshot)
+
 
 class Flow(PersistentStateMixin, ContextProxyMixin, Plugin):
     """
@@ -2,6 +2,7 @@
 
 import atexit
 import multiprocessing
+import signal
 import sys
 sys.dont_write_bytecode = True
 
@@ -19,6 +20,10 @@ def main(logging_level=config.LOGGING_LEVEL):
     desktop.start()
     atexit.register(desktop.terminate)
 
+    # Make sure the exit handlers (i.e. flushing the database) run when
+    # terminated by the service manager
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     # Forward all exceptions to the log
     sys.excepthook = Actor.log_exception
     Actor.setup_logging(level=logging_level)
@@ -2,10 +2,18 @@
 Provides long term storage backend implementations.
 """
 
+import atexit
+import collections
+import contextlib
 import datetime
+import json
+import sqlite3
+import threading
+
 from pony import orm
 
 from config import config
+from logger import LoggerMixin
 
 db = orm.Database('sqlite', config.DB_FILE, create_db=True)
 
@@ -17,12 +25,63 @@ class Record(db.Entity):
 
 db.generate_mapping(create_tables=True)
 
+# The journal mode is persistent, but it cannot be changed from within a
+# transaction, which every Pony session is
+with contextlib.closing(sqlite3.connect(config.DB_FILE)) as connection:
+    connection.execute('PRAGMA journal_mode=WAL')
+
+UPSERT_SQL = (
+    'INSERT INTO "Record" ("name", "key", "value") '
+    'VALUES ($name, $key, $value) '
+    'ON CONFLICT ("name", "key") DO UPDATE SET "value" = excluded."value"'
+)
+
+# The range queries are answered using the index of the (name, key)
+# composite key
+SELECT_SQL = (
+    'SELECT "value" FROM "Record" WHERE "name" = $name AND "key" = $key'
+)
+SELECT_RANGE_SQL = (
+    'SELECT "key", "value" FROM "Record" '
+    'WHERE "name" = $name AND "key" >= $start AND "key" < $end '
+    'ORDER BY "key"'
+)
+
+# Marks the keys known not to be stored in the database
+MISSING = object()
 
-class Backend(object):
+
+def decode(value):
+    """
+    Decodes a value read using raw SQL. Numbers are converted by SQLite
+    already, due to the numeric affinity of the JSON column.
+    """
+
+    return json.loads(value) if isinstance(value, basestring) else value
+
+
+class Backend(LoggerMixin):
     """
     Backend implementation using local sqlite database.
+
+    All the values that were read or written are kept in memory, so that
+    repeated reads do not touch the database.
+
+    The values are not written immediately. They are queued and written in
+    a single transaction BACKEND_FLUSH_INTERVAL seconds after the first
+    queued value, or when Actor exits.
     """
 
+    def __init__(self):
+        self.values = {}
+        self.pending = collections.OrderedDict()
+        self.timer = None
+
+        # Values are flushed from the timer thread
+        self.lock = threading.Lock()
+
+        atexit.register(self.flush)
+
     @staticmethod
     def convert_key(key):
         """
@@ -36,24 +95,126 @@ class Backend(object):
 
         return key
 
-    @orm.db_session
     def put(self, name, key, value, meta=False):
         key = self.convert_key(key)
-        record = self.get(name, key, value_only=False)
 
-        if not record:
-            record = Record(name=name, key=key, value=value)
-        else:
-            record.value = value
+        with self.lock:
+            self.values[(name, key)] = value
+            self.pending[(name, key)] = value
+
+            if self.timer is None and config.BACKEND_FLUSH_INTERVAL:
+                self.timer = threading.Timer(config.BACKEND_FLUSH_INTERVAL,
+                                             self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if not config.BACKEND_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all the queued values in a single transaction.
+        """
+
+        with self.lock:
+            # Do not join the timer, it may be waiting for the lock itself
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            pending, self.pending = self.pending, collections.OrderedDict()
+
+        if not pending:
+            return
+
+        try:
+            self.write(pending)
+        except orm.DatabaseError as exc:
+            self.error("Could not store {0} value(s): {1}", len(pending), exc)
+
+            # Try again with the next flush, unless newer values were queued
+            with self.lock:
+                for record_id, value in pending.items():
+                    self.pending.setdefault(record_id, value)
 
     @orm.db_session
+    def write(self, pending):
+        for (name, key), value in pending.items():
+            value = json.dumps(value)
+            db.execute(UPSERT_SQL)
+
     def get(self, name, key, value_only=True):
         key = self.convert_key(key)
+
+        if not value_only:
+            return self.get_record(name, key)
+
+        with self.lock:
+            cached = (name, key) in self.values
+            value = self.values.get((name, key))
+
+        if not cached:
+            value = self.read(name, key)
+
+            with self.lock:
+                # Do not overwrite a value put in the meantime
+                value = self.values.setdefault((name, key), value)
+
+        return None if value is MISSING else value
+
+    @orm.db_session
+    def read(self, name, key):
+        values = db.select(SELECT_SQL)
+        return decode(values[0]) if values else MISSING
+
+    @orm.db_session
+    def get_record(self, name, key):
+        # The record must be up to date
+        self.flush()
+
         matching = Record.select(lambda r: r.name == name and r.key == key)
+        return list(matching)[0] if matching else None
 
-        if value_only:
-            # Return only value
-            return list(matching)[0].value if matching else None
+    @orm.db_session
+    def get_range(self, name, start, end):
+        """
+        Returns an ordered dictionary of the keys (and their values) stored
+        under the given name, for which start <= key < end. Dates and
+        datetimes are compared chronologically, i.e. get_range('mood',
+        date(2016, 1, 1), date(2016, 2, 1)) returns the values of January.
+        """
+
+        start = self.convert_key(start)
+        end = self.convert_key(end)
+
+        rows = db.select(SELECT_RANGE_SQL)
+        result = collections.OrderedDict(
+            (key, decode(value)) for key, value in rows
+        )
+
+        # Add the values that were not written yet
+        with self.lock:
+            pending = [(key, value)
+                       for (pending_name, key), value in self.pending.items()
+                       if pending_name == name and start <= key < end]
+
+        if pending:
+            result.update(pending)
+            result = collections.OrderedDict(sorted(result.items()))
+
+        return result
+
+    def get_prefix(self, name, prefix):
+        """
+        Returns an ordered dictionary of the keys (and their values) stored
+        under the given name, which start with the given prefix, i.e.
+        get_prefix('mood', '2016-01') returns the values of January.
+        """
+
+        # The smallest string greater than all the strings with the prefix
+        if prefix:
+            end = prefix[:-1] + unichr(ord(prefix[-1]) + 1)
         else:
-            # Return the whole record object
-            return list(matching)[0] if matching else None
+            end = u'\uffff'
+
+        return self.get_range(name, prefix, end)
@@ -21,7 +21,9 @@ class CLIClient(DBusMixin):
         'flow-stop',
         'flow-status',
         'pause',
-        'report')
+        'report',
+        'stats',
+        'stats-reset')
 
     @dbus_error_handler
     def command_activity_start(self, identifier, time_limit):
@@ -63,6 +65,35 @@ class CLIClient(DBusMixin):
         result = self.interface.Report(identifier)
         print(u"{0}: {1}".format(identifier, result))
 
+    @dbus_error_handler
+    def command_stats(self):
+        rows = self.interface.Stats()
+
+        if not rows:
+            print(u"No statistics collected yet.")
+            return
+
+        print(u"{0:<10} {1:<40} {2:>7} {3:>6} {4:>6} {5:>5} {6:>10} {7:>9} "
+              u"{8:>9}".format('Category', 'Name', 'Calls', 'Hits', 'Misses',
+                               'Exc', 'Total(ms)', 'Self(ms)', 'Max(ms)'))
+
+        for row in rows:
+            print(u"{0:<10} {1:<40} {2:>7} {3:>6} {4:>6} {5:>5} {6:>10.1f} "
+                  u"{7:>9.1f} {8:>9.1f}".format(*row[:9]))
+
+        # Histogram of the slowest plugins
+        print(u"\nHistogram of the 10 slowest (buckets in ms: <1, <5, <10, "
+              u"<50, <100, <500, <1000, more):")
+
+        for row in rows[:10]:
+            print(u"{0:<10} {1:<40} {2}".format(
+                row[0], row[1], ' '.join(str(count) for count in row[9])))
+
+    @dbus_error_handler
+    def command_stats_reset(self):
+        self.interface.ResetStats()
+        print(u"Statistics were reset.")
+
     @dbus_error_handler
     def command_pause(self, minutes):
         self.interface.Pause(int(minutes))
@@ -44,6 +44,10 @@ class Config(object):
     # The location of the database
     DB_FILE = os.path.join(CONFIG_DIR, 'actor.db')
 
+    # The location of the cached manifest of the reporters, checkers and
+    # fixers, see LAZY_PLUGIN_LOADING
+    PLUGIN_MANIFEST_FILE = os.path.join(CONFIG_DIR, 'plugins.json')
+
     # The source directory
     SOURCE_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -87,5 +91,110 @@ class Config(object):
     # The timetracking interface you wish to use
     TIMETRACKER = 'timewarrior'
 
+    # The default interval (in seconds) between two evaluations of a rule or
+    # a tracker that does not declare its own run_interval. Current activity
+    # and flow are enforced in this interval as well.
+
+    CHECK_INTERVAL = 2
+
+    # The interval (in seconds) in which the current activity and flow are
+    # stored in the database
+
+    STORE_INTERVAL = 8
+
+    # The number of threads used to prefetch the reporters needed in a
+    # checking round. Set to 0 to evaluate all the reporters sequentially.
+
+    PREFETCH_WORKERS = 4
+
+    # The number of threads used to evaluate the asynchronous plugins, i.e.
+    # the prompts and overlays
+
+    ASYNC_WORKERS = 4
+
+    # The timeout (in seconds) of the DBus calls, so that a hung service
+    # (i.e. Hamster or Pidgin) does not block the checking rounds
+
+    DBUS_TIMEOUT = 5
+
+    # The maximum delay (in seconds) between the attempts to connect to a
+    # DBus service which is not available. The delay doubles after each
+    # failed attempt, and is reset when the service appears on the bus.
+
+    DBUS_MAX_BACKOFF = 60
+
+    # The directory of the Timewarrior data files. If None, the directory
+    # is determined the same way as timew does it.
+
+    TIMEWARRIOR_DATA_DIR = None
+
+    # The maximum age (in seconds) of the cached results of the TaskWarrior
+    # filters. The results are refreshed sooner if the tasks change.
+
+    TASKWARRIOR_RESULT_MAX_AGE = 30
+
+    # The codec files of the sound cards, searched for the headphone jack
+    # node if the jack events of acpid are not available
+
+    HEADPHONES_CODEC_GLOB = '/proc/asound/card*/codec#*'
+
+    # The socket of acpid, and the minimum number of seconds between two
+    # attempts to connect to it
+
+    ACPID_SOCKET = '/var/run/acpid.socket'
+    ACPID_RECONNECT_INTERVAL = 60
+
+    # The maximum number of reporter results that are kept across the
+    # checking rounds, for the reporters that declare their freshness
+
+    FRESH_CACHE_SIZE = 512
+
+    # The maximum number of compiled regular expressions kept by the regular
+    # expression checkers
+
+    REGEX_CACHE_SIZE = 1024
+
+    # The maximum number of files whose contents are kept by the file
+    # content reporters, so that unchanged files are not read again
+
+    FILE_CONTENT_CACHE_SIZE = 64
+
+    # Whether timing statistics of the rules and plugins should be collected.
+    # Use 'actor stats' command to display them.
+
+    PROFILING = True
+
+    # The maximum age (in seconds) of the model of the tmux sessions, windows
+    # and panes. The model is refreshed sooner if tmux notifies about a change.
+
+    TMUX_MODEL_MAX_AGE = 5
+
+    # The number of seconds to wait for a reply from tmux, and the minimum
+    # number of seconds between two attempts to connect to the tmux server
+
+    TMUX_TIMEOUT = 2
+    TMUX_RECONNECT_INTERVAL = 10
+
+    # The minimum number of seconds between two attempts to connect to the
+    # X server, which is used to monitor the active window
+
+    X11_RECONNECT_INTERVAL = 10
+
+    # The maximum age (in seconds) of the index of the running processes,
+    # which is used to find the applications running in terminal emulators
+
+    PROCESS_INDEX_MAX_AGE = 1
+
+    # The number of seconds the values tracked in the database are kept in
+    # memory before they are written, so that they are written in batches.
+    # They are written on exit as well. Set to 0 to write them immediately.
+
+    BACKEND_FLUSH_INTERVAL = 30
+
+    # Whether the reporters, checkers and fixers should be imported only when
+    # they are first used. Otherwise, all of them are imported at startup.
+
+    LAZY_PLUGIN_LOADING = True
+
 config = Config()
 config._load_customizations()
@@ -1,9 +1,11 @@
 from plugins import (Reporter, Checker, Fixer, NoSuchPlugin,
-                     PluginCache, PluginFactory)
+                     PluginCache, PluginFactory, ContextProxyMixin)
 from logger import LoggerMixin
 from activities import Activity, Flow
 from timetracking import Timetracking
 from backend import Backend
+from scheduler import Scheduler
+from profiler import Profiler
 
 
 class Context(LoggerMixin):
@@ -13,12 +15,17 @@ class Context(LoggerMixin):
     - List of rule and tracker instances
     - Current activity and flow
     - Timetracking interface
+    - Scheduler of the rules and trackers
+    - Profiler collecting the timing statistics
     """
 
     def __init__(self):
         self.rules = []
         self.trackers = []
 
+        # Needs to be available before any of the plugins are used
+        self.profiler = Profiler()
+
         self.activity = None
         self.flow = None
 
@@ -35,6 +42,7 @@ class Context(LoggerMixin):
 
         self.timetracking = Timetracking(self)
         self.backend = Backend()
+        self.scheduler = Scheduler()
 
     def clear_cache(self):
         """
@@ -43,9 +51,43 @@ class Context(LoggerMixin):
         might provide new values.
         """
 
-        self.reporters.cache.clear()
-        self.checkers.cache.clear()
-        self.fixers.cache.clear()
+        self.reporters.clear()
+        self.checkers.clear()
+        self.fixers.clear()
+
+    def prefetch(self, plugins):
+        """
+        Prefetches the reporters the given plugins (rules, trackers, current
+        activity and flow) are expected to need in the current round. These
+        are the sources they declare, along with the reporters they used
+        when they were last evaluated. Sources which are not reporters (e.g.
+        the prompt fixers waking up the trackers) are skipped.
+        """
+
+        requests = []
+
+        for plugin in plugins:
+            requests.extend((source, tuple(), dict())
+                            for source in getattr(plugin, 'sources', tuple())
+                            if self.reporters.provides(source))
+
+            if isinstance(plugin, ContextProxyMixin):
+                requests.extend(self.reporters.rule_requests(plugin.identifier))
+
+        self.reporters.prefetch(requests)
+
+    def wakeup(self, source):
+        """
+        Wakes up the plugins that depend on the given reporter, either
+        directly or through any of the reporters derived from it.
+        """
+
+        dependents = [
+            identifier for identifier in list(self.reporters.plugins)
+            if source in self.reporters.dependency_order(identifier)
+        ]
+
+        self.scheduler.wakeup(source, *dependents)
 
     def set_activity(self, identifier, time_limit=None):
         """
@@ -57,6 +99,7 @@ class Context(LoggerMixin):
         self.activity = self.activities.make(identifier,
                                              kwargs=dict(time_limit=time_limit))
         self.info("Activity is now {0}", self.activity)
+        self.scheduler.notify()
 
     def unset_activity(self):
         """
@@ -74,6 +117,7 @@ class Context(LoggerMixin):
         self.info("Setting flow {0} ({1})", identifier, time_limit or 'unlimited')
         self.flow = self.flows.make(identifier,
                                     kwargs=dict(time_limit=time_limit))
+        self.scheduler.notify()
 
     def unset_flow(self):
         """
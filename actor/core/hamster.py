@@ -0,0 +1,182 @@
+"""
+Provides the monitor of the facts tracked by Hamster Time Tracker, based on
+the signals of the Hamster DBus service.
+"""
+
+import datetime
+import threading
+import time
+
+import dbus
+
+from logger import LoggerMixin
+from proxies import proxies
+
+BUS_NAME = 'org.gnome.Hamster'
+OBJECT_PATH = '/org/gnome/Hamster'
+
+# Indexes of the fact fields, see to_dbus_fact method in src/hamster-service
+FACT_END_TIME = 2
+FACT_NAME = 4
+FACT_CATEGORY = 6
+FACT_DELTA = 9
+
+
+class HamsterMonitor(LoggerMixin):
+    """
+    Keeps the per-activity and per-category totals (in minutes) of today's
+    facts. The facts are loaded once and then again only when Hamster emits
+    FactsChanged or ActivitiesChanged, when its owner on the bus changes, or
+    when the day changes. The duration of the ongoing fact is extrapolated
+    from the time it was loaded.
+
+    The monitor subscribes to the signals when the facts are first
+    requested. The signals are only delivered within the GLib main loop,
+    hence if the subscription failed, the facts are loaded on every
+    request. Listeners registered using add_listener are called whenever
+    the facts change.
+    """
+
+    def __init__(self):
+        self.subscribed = False
+        self.dirty = True
+        self.listeners = []
+
+        self.loaded_at = None
+        self.loaded_day = None
+        self.current = None
+        self.activity_totals = {}
+        self.category_totals = {}
+
+        # Reporters are evaluated from the prefetching threads
+        self.lock = threading.RLock()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def subscribe(self):
+        with self.lock:
+            if self.subscribed:
+                return
+
+            try:
+                bus = proxies.session_bus()
+                for signal_name in ('FactsChanged', 'ActivitiesChanged'):
+                    bus.add_signal_receiver(self.changed,
+                                            signal_name=signal_name,
+                                            dbus_interface=BUS_NAME,
+                                            bus_name=BUS_NAME)
+                bus.watch_name_owner(BUS_NAME, self.changed)
+            except dbus.exceptions.DBusException as exc:
+                self.warning("Could not subscribe to Hamster signals: {0}",
+                             exc)
+                return
+
+            self.subscribed = True
+
+    def changed(self, *args):
+        # pylint: disable=unused-argument
+        self.dirty = True
+
+        for callback in self.listeners:
+            callback()
+
+    def refresh(self):
+        """
+        Reloads today's facts, if needed.
+        """
+
+        with self.lock:
+            self.subscribe()
+
+            if (self.subscribed and not self.dirty and
+                    self.loaded_day == datetime.date.today()):
+                return
+
+            interface = proxies.get(BUS_NAME, OBJECT_PATH)
+
+            try:
+                facts = interface.GetTodaysFacts() if interface else []
+            except dbus.exceptions.DBusException as exc:
+                self.debug("Could not load Hamster facts: {0}", exc)
+                facts = []
+                interface = None
+
+            self.load(facts)
+
+            # Try again on the next request if Hamster is not available
+            self.dirty = interface is None
+
+    def load(self, facts):
+        self.loaded_at = time.time()
+        self.loaded_day = datetime.date.today()
+        self.current = None
+        self.activity_totals = {}
+        self.category_totals = {}
+
+        for fact in facts:
+            activity = "%s@%s" % (fact[FACT_NAME], fact[FACT_CATEGORY])
+            category = fact[FACT_CATEGORY]
+            duration = fact[FACT_DELTA] / 60.0
+
+            self.activity_totals[activity] = (
+                self.activity_totals.get(activity, 0.0) + duration)
+            self.category_totals[category] = (
+                self.category_totals.get(category, 0.0) + duration)
+
+        # End time is set to 0 for the ongoing fact, which is the last one
+        if facts and facts[-1][FACT_END_TIME] == 0:
+            self.current = (
+                "%s@%s" % (facts[-1][FACT_NAME], facts[-1][FACT_CATEGORY]),
+                facts[-1][FACT_CATEGORY]
+            )
+
+    def elapsed(self, key, index):
+        """
+        Returns the minutes the ongoing fact was tracked since the facts were
+        loaded, if the given activity (index 0) or category (index 1) matches
+        the ongoing fact.
+        """
+
+        if self.current is None or self.current[index] != key:
+            return 0.0
+
+        return (time.time() - self.loaded_at) / 60.0
+
+    def current_activity(self):
+        """
+        Returns the ongoing activity in the format 'activity@category', or
+        None if there is no ongoing activity.
+        """
+
+        with self.lock:
+            self.refresh()
+            return self.current[0] if self.current else None
+
+    def activity_duration(self, activity):
+        with self.lock:
+            self.refresh()
+            return (self.activity_totals.get(activity, 0.0) +
+                    self.elapsed(activity, 0))
+
+    def category_duration(self, category):
+        with self.lock:
+            self.refresh()
+            return (self.category_totals.get(category, 0.0) +
+                    self.elapsed(category, 1))
+
+    def activity_durations(self):
+        """
+        Returns the dictionary of today's activities and their durations.
+        """
+
+        with self.lock:
+            self.refresh()
+            return {
+                activity: duration + self.elapsed(activity, 0)
+                for activity, duration in self.activity_totals.items()
+            }
+
+
+# Shared by the Hamster reporters and the main loop
+monitor = HamsterMonitor()
@@ -0,0 +1,194 @@
+"""
+Provides the state of the headphone jack, based on the jack events of acpid,
+with fallback to the HDA codec information in /proc/asound.
+"""
+
+import glob
+import re
+import socket
+import threading
+import time
+
+from config import config
+from logger import LoggerMixin
+
+NODE_PREFIX = 'Node 0x'
+
+# The node data is assumed to fit in this many bytes when it is read again
+NODE_MAX_LENGTH = 4096
+
+PIN_CTLS = re.compile(r'Pin-ctls: (0x[0-9a-f]+)')
+
+
+def find_headphone_node(data):
+    """
+    Returns the offset and the length of the only node of the codec data
+    whose connection is analog (the output jack), or None if there is no
+    such node, or more than one.
+    """
+
+    nodes = []
+    offset = data.find(NODE_PREFIX)
+
+    while offset != -1:
+        end = data.find('\n' + NODE_PREFIX, offset)
+        end = len(data) if end == -1 else end + 1
+
+        if 'Conn = Analog' in data[offset:end]:
+            nodes.append((offset, end - offset))
+
+        offset = data.find(NODE_PREFIX, end) if end < len(data) else -1
+
+    return nodes[0] if len(nodes) == 1 else None
+
+
+def headphones_plugged(node):
+    """
+    Returns True if the pin of the given node data is not enabled (the
+    headphones took over), False if it is an enabled output, None if it is
+    not known.
+    """
+
+    match = PIN_CTLS.search(node)
+
+    if match is None:
+        return None
+
+    return {'0x00': True, '0x40': False}.get(match.group(1))
+
+
+class HeadphoneJack(LoggerMixin):
+    """
+    Keeps the state of the headphone jack. While connected to acpid, the
+    state is updated by the jack/headphone events.
+
+    Otherwise the state is read from the codec files of the sound cards.
+    The files are parsed once to locate the headphone node, after that only
+    the byte range of the node is read, as long as it still starts with the
+    same node header.
+    """
+
+    def __init__(self, codec_glob=None, acpid_socket=None):
+        self.codec_glob = codec_glob or config.HEADPHONES_CODEC_GLOB
+        self.acpid_socket = acpid_socket or config.ACPID_SOCKET
+
+        # (path, offset, header) of the headphone node
+        self.node = None
+
+        # The state reported by acpid, None if not known
+        self.state = None
+        self.thread = None
+        self.last_attempt = 0
+
+        # Reporters are evaluated from the prefetching threads
+        self.lock = threading.RLock()
+
+    def listen(self):
+        """
+        Starts listening to the acpid events, if not already listening. The
+        attempts to connect are rate limited.
+        """
+
+        with self.lock:
+            if self.thread is not None:
+                return
+
+            if time.time() - self.last_attempt < config.ACPID_RECONNECT_INTERVAL:
+                return
+
+            self.last_attempt = time.time()
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+            try:
+                connection.connect(self.acpid_socket)
+            except socket.error as exc:
+                self.debug("Could not connect to acpid: {0}", exc)
+                connection.close()
+                return
+
+            self.thread = threading.Thread(target=self.read_events,
+                                           args=(connection,))
+            self.thread.daemon = True
+            self.thread.start()
+
+    def read_events(self, connection):
+        try:
+            for line in connection.makefile('r'):
+                # i.e. 'jack/headphone HEADPHONE plug'
+                parts = line.split()
+                if len(parts) >= 3 and parts[0] == 'jack/headphone':
+                    self.state = parts[2] == 'plug'
+        except socket.error as exc:
+            self.debug("Connection to acpid failed: {0}", exc)
+        finally:
+            connection.close()
+
+            with self.lock:
+                self.state = None
+                self.thread = None
+
+    def discover(self):
+        """
+        Locates the headphone node in the codec files of the sound cards.
+        """
+
+        for path in sorted(glob.glob(self.codec_glob)):
+            try:
+                with open(path, 'r') as fil:
+                    data = fil.read()
+            except IOError:
+                continue
+
+            node = find_headphone_node(data)
+
+            if node is not None:
+                offset, length = node
+                header = data[offset:data.index('\n', offset)]
+                return path, offset, header
+
+        return None
+
+    def read_node(self):
+        """
+        Returns the data of the headphone node, or None if the node moved
+        (or disappeared) since it was discovered.
+        """
+
+        path, offset, header = self.node
+
+        try:
+            with open(path, 'r') as fil:
+                fil.seek(offset)
+                data = fil.read(NODE_MAX_LENGTH)
+        except IOError:
+            return None
+
+        if not data.startswith(header + '\n'):
+            return None
+
+        end = data.find('\n' + NODE_PREFIX)
+        return data if end == -1 else data[:end + 1]
+
+    def plugged(self):
+        """
+        Returns True if the headphones are plugged in, False if not, None
+        if the detection failed.
+        """
+
+        self.listen()
+
+        if self.state is not None:
+            return self.state
+
+        with self.lock:
+            node = self.read_node() if self.node is not None else None
+
+            if node is None:
+                self.node = self.discover()
+                node = self.read_node() if self.node is not None else None
+
+            return headphones_plugged(node) if node is not None else None
+
+
+# Shared by the headphone reporters
+jack = HeadphoneJack()
@@ -2,6 +2,7 @@ import contextlib
 import os
 import sys
 import logging
+import time
 import traceback
 
 from config import config
@@ -41,9 +42,11 @@ class LoggerMixin(object):
         label = plugin_formatter(description, *args)
         self.debug("Entering: {0}", label)
         LoggerMixin.indentation += 1
+        start = time.time()
         yield
         LoggerMixin.indentation -= 1
-        self.debug("Leaving: {0}", label)
+        self.debug("Leaving: {0} ({1:.1f} ms)", label,
+                   (time.time() - start) * 1000)
 
     # Logging-related helpers
     @classmethod
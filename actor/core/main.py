@@ -4,7 +4,6 @@ import os
 import sys
 import datetime
 import time
-import importlib
 import imp
 
 import gobject
@@ -14,9 +13,15 @@ import dbus.mainloop.glib
 
 from activities import Activity, Flow
 from context import Context
-from plugins import Rule, DBusMixin
+from manifest import manifest
+from plugins import Rule, Reporter, Checker, Fixer, DBusMixin, NoSuchPlugin
+from profiler import SUMMARY_SIGNATURE
 from trackers import Tracker
 from util import Expiration
+from tmux import client as tmux_client
+from x11 import monitor as active_window_monitor
+from purple import monitor as purple_monitor
+from hamster import monitor as hamster_monitor
 
 from config import config
 from logger import LoggerMixin
@@ -80,6 +85,15 @@ class ActorDBusProxy(dbus.service.Object):
     def Report(self, identifier):
         return self.actor.context.reporters.get(identifier)
 
+    @dbus.service.method("org.freedesktop.Actor", in_signature='',
+                         out_signature=SUMMARY_SIGNATURE)
+    def Stats(self):
+        return self.actor.context.profiler.summary()
+
+    @dbus.service.method("org.freedesktop.Actor", in_signature='')
+    def ResetStats(self):
+        self.actor.context.profiler.reset()
+
 
 class Actor(DBusMixin, LoggerMixin):
 
@@ -93,6 +107,11 @@ class Actor(DBusMixin, LoggerMixin):
 
         super(Actor, self).__init__()
 
+        # Wakeups of the scheduler and reporter prefetching can come from
+        # other threads
+        gobject.threads_init()
+        dbus.mainloop.glib.threads_init()
+
         self.rules = []
         self.trackers = []
 
@@ -102,7 +121,38 @@ class Actor(DBusMixin, LoggerMixin):
         self.load_plugins()
 
         self.pause_expired = Expiration()
-        self.period = 0
+        self.round_timeout = None
+
+        # The last stored snapshots of the current flow and activity
+        self.stored_state = {}
+
+        # Evaluate the next round early if something requested it
+        self.context.scheduler.add_listener(self.request_round)
+
+        # Rules depending on the active window are evaluated as soon as the
+        # active window changes
+        active_window_monitor.add_listener(
+            lambda: self.context.wakeup('active_window')
+        )
+
+        # Same for the tmux sessions, windows and panes
+        tmux_client.add_listener(self.tmux_changed)
+
+        # Same for the unread Pidgin conversations and the Hamster facts,
+        # the monitors subscribe to the signals once they are first used
+        purple_monitor.add_listener(lambda: self.context.wakeup('messages'))
+        hamster_monitor.add_listener(self.hamster_changed)
+
+    def tmux_changed(self):
+        for source in ('tmux_active_sessions', 'tmux_active_windows',
+                       'tmux_active_panes_pids'):
+            self.context.wakeup(source)
+
+    def hamster_changed(self):
+        for source in ('hamster_activity', 'hamster_activity_daily_duration',
+                       'hamster_category_daily_duration'):
+            self.context.reporters.invalidate(source)
+            self.context.wakeup(source)
 
     def handle_exception(self):
         exception_type, value, trace = sys.exc_info()
@@ -130,6 +180,8 @@ class Actor(DBusMixin, LoggerMixin):
                 self.info('Desktop process setup finished.')
                 break
             else:
+                # Do not back off, the desktop process is expected soon
+                self.reconnect()
                 timeout = timeout - 1
                 time.sleep(1)
 
@@ -139,23 +191,14 @@ class Actor(DBusMixin, LoggerMixin):
     # Initialization related methods
 
     def import_plugins(self):
-        import actor.reporters
-        import actor.checkers
-        import actor.fixers
-        categories = [actor.reporters, actor.checkers, actor.fixers]
+        # With lazy loading, the reporters, checkers and fixers are imported
+        # when they are first used, see PluginFactory.get_plugin
+        if config.LAZY_PLUGIN_LOADING:
+            manifest.load()
+            return
 
-        # pylint: disable=broad-except
-        for category in categories:
-            for module in category.__all__:
-                try:
-                    module_id = "{0}.{1}".format(category.__name__, module)
-                    importlib.import_module(module_id)
-                    self.debug(module_id + " loaded successfully.")
-                except Exception as exc:
-                    self.warning(
-                        "The {0} {1} module could not be loaded: {2} ",
-                        module, category.__name__[:-1], str(exc))
-                    self.log_exception()
+        for mount in (Reporter, Checker, Fixer):
+            manifest.import_all(mount)
 
     def load_plugins(self):
         # Load the rule files. They will be automatically
@@ -185,6 +228,9 @@ class Actor(DBusMixin, LoggerMixin):
         for tracker_class in Tracker.plugins:
             self.trackers.append(tracker_class(self.context))
 
+        for plugin in self.rules + self.trackers:
+            self.context.scheduler.add(plugin)
+
         if not rules:
             self.warning("No rules available")
 
@@ -246,27 +292,40 @@ class Actor(DBusMixin, LoggerMixin):
 
     # Runtime related methods
 
-    def check_everything(self):
+    def check_everything(self, plugins):
+        """
+        Evaluates the given rules and trackers, followed by the current
+        activity and flow.
+        """
+
         if not self.pause_expired:
             return True
         elif self.pause_expired.just_expired():
             self.info('Actor is resumed.')
 
-        with self.stage('Checking round'):
+        profiler = self.context.profiler
+
+        with self.stage('Checking round'), profiler.measure('round', 'round'):
             # Clear the cached values
             self.context.clear_cache()
 
-            for rule in self.rules:
-                with self.stage('Evaluating rule: {0}', rule):
-                    try:
-                        rule.run()
-                    except Exception as e:
-                        self.handle_exception()
-
-            for tracker in self.trackers:
-                with self.stage('Evaluating tracker: {0}', tracker):
+            # Obtain the values of the slow reporters concurrently. The
+            # rules are evaluated even if prefetching fails, the reporters
+            # are evaluated as they are used then.
+            try:
+                with profiler.measure('round', 'prefetch'):
+                    self.context.prefetch(
+                        plugins + [self.context.activity, self.context.flow]
+                    )
+            except Exception as e:
+                self.handle_exception()
+
+            for plugin in plugins:
+                category = 'rule' if isinstance(plugin, Rule) else 'tracker'
+                with self.stage('Evaluating {0}: {1}', category, plugin):
                     try:
-                        tracker.run()
+                        with profiler.measure(category, self.plugin_name(plugin)):
+                            plugin.run()
                     except Exception as e:
                         self.handle_exception()
 
@@ -274,31 +333,49 @@ class Actor(DBusMixin, LoggerMixin):
             if self.context.activity is not None:
                 with self.stage('Evaluating activity: {0}', self.context.activity):
                     try:
-                        self.context.activity.run()
+                        with profiler.measure('activity',
+                                              self.context.activity.identifier):
+                            self.context.activity.run()
                     except Exception as e:
                         self.handle_exception()
 
             if self.context.flow is not None:
                 with self.stage('Evaluating flow: {0}', self.context.flow):
                     try:
-                        self.context.flow.run()
+                        with profiler.measure('flow',
+                                              self.context.flow.identifier):
+                            self.context.flow.run()
                     except Exception as e:
                         self.handle_exception()
 
+    @staticmethod
+    def plugin_name(plugin):
+        """
+        Returns the name of the plugin, qualified by the name of the rule file
+        it was defined in.
+        """
+
+        return "{0}.{1}".format(plugin.__class__.__module__,
+                                plugin.__class__.__name__)
+
     def store_everything(self):
         """
         Stores current state into the backend.
         """
         backend = self.context.backend
 
-        backend.put('meta_store', 'current_flow',
-            self.context.flow.store()
-            if self.context.flow else None
-        )
-        backend.put('meta_store', 'current_activity',
-            self.context.activity.store()
-            if self.context.activity else None
-        )
+        state = {
+            'current_flow':
+                self.context.flow.store() if self.context.flow else None,
+            'current_activity':
+                self.context.activity.store() if self.context.activity else None,
+        }
+
+        for key, value in state.items():
+            # Do not write the same snapshot over and over again
+            if key not in self.stored_state or self.stored_state[key] != value:
+                backend.put('meta_store', key, value)
+                self.stored_state[key] = value
 
     def restore_everyting(self):
         """
@@ -307,42 +384,111 @@ class Actor(DBusMixin, LoggerMixin):
         backend = self.context.backend
 
         flow_data = backend.get('meta_store', 'current_flow')
-        if flow_data is not None:
-            self.context.flow = Flow.restore(flow_data,
-                    mount=self.context.flows,
-                    context=self.context
-            )
-
         activity_data = backend.get('meta_store', 'current_activity')
-        if activity_data is not None:
-            self.context.activity = Activity.restore(activity_data,
-                    mount=self.context.activities,
-                    context=self.context
-            )
 
+        self.stored_state = {
+            'current_flow': flow_data,
+            'current_activity': activity_data,
+        }
+
+        self.context.flow = self.restore_state(
+            'current_flow', Flow, self.context.flows)
+        self.context.activity = self.restore_state(
+            'current_activity', Activity, self.context.activities)
+
+    def restore_state(self, key, plugin_class, mount):
+        """
+        Restores the flow or activity stored under the given key. If the
+        stored state cannot be restored (e.g. it was stored by an unknown
+        version), it is logged and dropped, so that the startup continues.
+        """
+
+        data = self.stored_state[key]
+
+        if data is None:
+            return None
+
+        try:
+            return plugin_class.restore(data, mount=mount,
+                                        context=self.context)
+        except (ValueError, NoSuchPlugin) as exc:
+            self.warning("Could not restore {0}, dropping it: {1}", key, exc)
+            self.context.backend.put('meta_store', key, None)
+            self.stored_state[key] = None
+            return None
 
     def periodic_executor(self):
         """
-        Executes Actor's periodic methods in proper intervals which are given
-        as multiplies of the base interval.
+        Evaluates a checking round with the plugins that are due and
+        schedules the next round.
+        """
+
+        self.round_timeout = None
+
+        # Nothing is evaluated while paused, so the plugins that are due
+        # (i.e. woken up meanwhile) stay due until the pause ends. The next
+        # round is scheduled even if this one fails, otherwise no further
+        # rounds would run.
+        try:
+            if self.pause_expired:
+                self.check_everything(self.context.scheduler.due())
+        finally:
+            self.schedule_round()
+
+        # The timeout is re-registered by schedule_round
+        return False
+
+    def schedule_round(self, timeout=None):
+        """
+        Schedules the next checking round. Unless timeout (in seconds) is
+        given, sleeps until the next scheduled plugin is due.
+        """
+
+        if timeout is None:
+            timeout = self.context.scheduler.timeout()
+
+            # Current activity and flow need to be enforced continuously
+            if self.context.activity is not None or self.context.flow is not None:
+                timeout = min(timeout, config.CHECK_INTERVAL) \
+                          if timeout is not None else config.CHECK_INTERVAL
+
+            # Nothing is evaluated while paused
+            if not self.pause_expired:
+                timeout = self.pause_expired.remaining
+
+        # Nothing to do, wait until a round is requested
+        if timeout is None:
+            return
+
+        if self.round_timeout is not None:
+            gobject.source_remove(self.round_timeout)
+
+        self.round_timeout = gobject.timeout_add(int(max(timeout, 0) * 1000),
+                                                 self.periodic_executor)
+
+    def request_round(self):
+        """
+        Requests an immediate checking round. Safe to be called from any
+        thread.
         """
-        self.period += 1
-        self.check_everything()
 
-        if self.period % 4 == 0:
-            self.store_everything()
+        # Reschedule from within the main loop
+        gobject.idle_add(self.schedule_round, 0)
 
+    def periodic_store(self):
+        self.store_everything()
         return True
 
     def main(self):
         # Start the main loop
         loop = gobject.MainLoop()
-        gobject.timeout_add(2000, self.periodic_executor)
+        gobject.timeout_add_seconds(config.STORE_INTERVAL, self.periodic_store)
 
         # Wait for the desktop process
         self.wait_for_desktop()
 
         self.info("Restoring status from the database")
         self.restore_everyting()
+        self.schedule_round()
         self.info("AcTor started.")
         loop.run()
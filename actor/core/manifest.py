@@ -0,0 +1,220 @@
+"""
+Provides the manifest of the reporters, checkers and fixers shipped with
+Actor, which maps their identifiers to the modules defining them, so that
+the modules can be imported only when their plugins are first used.
+"""
+
+import ast
+import importlib
+import json
+import os
+import threading
+
+from config import config
+from logger import LoggerMixin
+
+
+# The packages containing the plugins, keyed by the name of their mount
+PACKAGES = {
+    'Reporter': 'actor.reporters',
+    'Checker': 'actor.checkers',
+    'Fixer': 'actor.fixers',
+}
+
+VERSION = 2
+
+
+def scan_module(path):
+    """
+    Returns the list of the plugin identifiers defined in the module at
+    the given path, i.e. the string literals assigned to the identifier
+    attribute in the bodies of the classes, and whether some identifier is
+    assigned anything else than a string literal or None.
+    """
+
+    with open(path, 'r') as fil:
+        tree = ast.parse(fil.read(), path)
+
+    identifiers = []
+    dynamic = False
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef):
+            continue
+
+        for statement in node.body:
+            if not (isinstance(statement, ast.Assign) and
+                    any(isinstance(target, ast.Name) and
+                        target.id == 'identifier'
+                        for target in statement.targets)):
+                continue
+
+            if isinstance(statement.value, ast.Str):
+                identifiers.append(statement.value.s)
+            elif not (isinstance(statement.value, ast.Name) and
+                      statement.value.id == 'None'):
+                dynamic = True
+
+    return identifiers, dynamic
+
+
+class PluginManifest(LoggerMixin):
+    """
+    Keeps the identifiers defined in each of the plugin modules. The
+    modules are scanned without importing them, and the result is cached
+    in PLUGIN_MANIFEST_FILE, so only new or modified modules are scanned
+    at startup.
+    """
+
+    def __init__(self):
+        self.modules = None
+        self.imported = set()
+
+        # The (mount name, identifier) pairs which were not found, so that
+        # the modules are not searched for them again
+        self.missing = set()
+
+        # Plugins can be requested from the prefetching threads
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def package_modules(package):
+        """
+        Returns the dictionary of the module ids of the given package and
+        their paths.
+        """
+
+        directory = os.path.join(config.SOURCE_DIR, package.split('.')[-1])
+
+        return {
+            '{0}.{1}'.format(package, filename[:-3]):
+                os.path.join(directory, filename)
+            for filename in os.listdir(directory)
+            if filename.endswith('.py') and not filename.startswith('_')
+        }
+
+    def read_cache(self):
+        try:
+            with open(config.PLUGIN_MANIFEST_FILE, 'r') as fil:
+                cache = json.load(fil)
+        except (IOError, ValueError):
+            return {}
+
+        if cache.get('version') != VERSION:
+            return {}
+
+        return cache.get('modules', {})
+
+    def write_cache(self):
+        try:
+            with open(config.PLUGIN_MANIFEST_FILE, 'w') as fil:
+                json.dump({'version': VERSION, 'modules': self.modules}, fil)
+        except IOError as exc:
+            self.warning("Could not write the plugin manifest: {0}", exc)
+
+    def load(self):
+        """
+        Loads the manifest, scanning the modules which changed since it was
+        cached.
+        """
+
+        with self.lock:
+            cached = self.read_cache()
+            self.modules = {}
+
+            for package in PACKAGES.values():
+                for module_id, path in self.package_modules(package).items():
+                    mtime = os.path.getmtime(path)
+                    entry = cached.get(module_id)
+
+                    if entry is None or entry['path'] != path or \
+                            entry['mtime'] != mtime:
+                        try:
+                            identifiers, dynamic = scan_module(path)
+                        except (IOError, SyntaxError) as exc:
+                            self.warning("Could not scan {0}: {1}", path, exc)
+                            # Importing it will tell what is wrong
+                            identifiers, dynamic = [], True
+
+                        entry = {'path': path, 'mtime': mtime,
+                                 'identifiers': identifiers,
+                                 'dynamic': dynamic}
+
+                    self.modules[module_id] = entry
+
+            if self.modules != cached:
+                self.write_cache()
+
+    def import_module(self, module_id):
+        """
+        Imports the module (only once). Failures are logged, since a plugin
+        module usually fails to import due to a missing optional dependency.
+        """
+
+        with self.lock:
+            if module_id in self.imported:
+                return
+
+            self.imported.add(module_id)
+
+            # pylint: disable=broad-except
+            try:
+                importlib.import_module(module_id)
+                self.debug(module_id + " loaded successfully.")
+            except Exception as exc:
+                self.warning("The {0} module could not be loaded: {1} ",
+                             module_id, str(exc))
+                self.log_exception()
+
+    def import_all(self, mount):
+        """
+        Imports all the plugin modules of the given mount.
+        """
+
+        package = PACKAGES.get(mount.__name__)
+
+        if package is not None:
+            for module_id in sorted(self.package_modules(package)):
+                self.import_module(module_id)
+
+    def import_plugin(self, mount, identifier):
+        """
+        Imports the module defining the plugin of the given mount with the
+        given identifier. If the manifest does not know the identifier,
+        imports the modules whose identifiers are not string literals. The
+        identifiers which are not found are remembered, hence the modules
+        are searched only once for each of them.
+        """
+
+        package = PACKAGES.get(mount.__name__)
+
+        if package is None:
+            return
+
+        with self.lock:
+            if (mount.__name__, identifier) in self.missing:
+                return
+
+            if self.modules is None:
+                self.load()
+
+            entries = sorted(
+                (module_id, entry) for module_id, entry in self.modules.items()
+                if module_id.startswith(package + '.')
+            )
+            module_ids = [module_id for module_id, entry in entries
+                          if identifier in entry['identifiers']]
+
+            if not module_ids:
+                module_ids = [module_id for module_id, entry in entries
+                              if entry['dynamic']]
+
+            for module_id in module_ids:
+                self.import_module(module_id)
+
+            if identifier not in mount.index:
+                self.missing.add((mount.__name__, identifier))
+
+
+# Shared among all the plugin factories
+manifest = PluginManifest()
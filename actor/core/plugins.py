@@ -1,9 +1,15 @@
-import dbus
+import collections
 import time
 import threading
+import snapshot
 import util
 
+from multiprocessing.pool import ThreadPool
+
 import logger
+from config import config
+from manifest import manifest
+from proxies import proxies, UNAVAILABLE_ERRORS
 
 # This file contains definitions of plugin classes, most of
 # which intentionally do not implement their abstract method
@@ -18,13 +24,28 @@ class NoSuchPlugin(Exception):
     pass
 
 
+class CyclicDependency(Exception):
+    """
+    Raised when the dependencies of the plugins contain a cycle.
+    """
+    pass
+
+
 class PluginMount(type):
+    """
+    Registers all the subclasses of the mount class in its plugins list.
+    The plugins are also indexed by their identifiers in the index
+    dictionary. If two plugins share an identifier, the one defined later
+    takes precedence. Plugins without a string identifier (e.g. the rules,
+    whose identifier is their class name) are not indexed.
+    """
 
     def __init__(cls, name, bases, attrs):
         super(PluginMount, cls).__init__(name, bases, attrs)
 
         if not hasattr(cls, 'plugins'):
             cls.plugins = []
+            cls.index = {}
         else:
             # System generic plugin classes are marked with 'noplugin'
             # attribute. We do not want to mix those with user plugin
@@ -32,6 +53,21 @@ class PluginMount(type):
             if 'noplugin' not in cls.__dict__:
                 cls.plugins.append(cls)
 
+                identifier = getattr(cls, 'identifier', None)
+
+                if not isinstance(identifier, basestring):
+                    return
+
+                existing = cls.index.get(identifier)
+
+                if existing is not None:
+                    cls.warning("Overrides {0}.{1} with the same identifier "
+                                "'{2}'", existing.__module__,
+                                existing.__name__, identifier)
+
+                cls.index[identifier] = cls
+
+
 class PersistentStateMixin(object):
     """
     Provides store/restoration capabilities for plugins that want to keep state
@@ -49,7 +85,7 @@ class PersistentStateMixin(object):
             for attribute in self.persistent_attrs
         }
 
-        return util.json_encode(data_dict)
+        return snapshot.dumps(data_dict)
 
     @staticmethod
     def restore(data, mount, context):
@@ -58,7 +94,11 @@ class PersistentStateMixin(object):
         restores the stored attributes to it.
         """
 
-        data_dict = util.json_decode(data)
+        # The state stored by the previous versions is JSON encoded
+        if snapshot.is_snapshot(data):
+            data_dict = snapshot.loads(data)
+        else:
+            data_dict = util.json_decode(data)
 
         # Reinitialize the class
         identifier = data_dict.pop('identifier')
@@ -118,6 +158,12 @@ class Worker(Plugin):
     stateless = True
     side_effects = False
 
+    # Whether the plugin can be evaluated outside of the main thread
+    parallel = True
+
+    # For how long the result of the plugin stays valid, see PluginCache
+    freshness = None
+
     def evaluate(self, *args, **kwargs):
         """
         Wraps the run method. Currently only adds the debug logging.
@@ -134,10 +180,17 @@ class Worker(Plugin):
 class Reporter(Worker):
     """
     Reports user activity to the AcTor.
+
+    Reporters that derive their result from other reporters should list
+    their identifiers in the dependencies attribute, and obtain their values
+    using the report method. Within a checking round, each of the
+    dependencies is then evaluated only once.
     """
 
     __metaclass__ = PluginMount
 
+    dependencies = tuple()
+
 
 class Checker(Worker):
     """
@@ -193,15 +246,26 @@ class ContextProxyMixin(object):
 class Rule(ContextProxyMixin, Plugin):
     """
     Performs custom rule.
+
+    The rule is evaluated every run_interval seconds (config.CHECK_INTERVAL
+    if not set), and immediately whenever any of the sources it depends on
+    signals a change.
     """
 
     __metaclass__ = PluginMount
 
+    run_interval = None
+    sources = tuple()
+
 
 class DBusMixin(object):
     """
-    Sets the interface of the specified DBus object as self.interface. In case
-    DBusException occurs during setup, self.interface is set to None.
+    Provides the interface of the specified DBus object as self.interface. In
+    case the service is not available, self.interface is None.
+
+    The proxies are shared by all the plugins (see proxies.ProxyCache), the
+    calls time out after DBUS_TIMEOUT seconds, so that a hung service does
+    not block the evaluation of the rules.
     """
 
     bus_name = None        # i.e. 'org.freedesktop.PowerManagement'
@@ -214,65 +278,134 @@ class DBusMixin(object):
 
     def __init__(self, *args, **kwargs):
         super(DBusMixin, self).__init__(*args, **kwargs)
-        self.bus = dbus.SessionBus()
-        self.initialize_interface()
-
-    def initialize_interface(self):
-        try:
-            dbus_object = self.bus.get_object(self.bus_name, self.object_path)
-            self._interface = dbus.Interface(
-                dbus_object,
-                self.interface_name or self.bus_name
-            )
-        except dbus.exceptions.DBusException:
-            self._interface = None
+        self.bus = proxies.session_bus()
 
     @property
     def interface(self):
-        if self._interface is not None:
-            return self._interface
-        else:
-            self.initialize_interface()
-            return self._interface
+        return proxies.get(self.bus_name, self.object_path,
+                           self.interface_name)
+
+    def reconnect(self):
+        """
+        Makes the next access to self.interface connect to the service
+        immediately, even if it is being backed off.
+        """
+
+        proxies.forget(self.bus_name)
 
+    def call_async(self, method, *args):
+        """
+        Calls the given method of the interface without waiting for the
+        reply. Errors are logged. Returns False if the service is not
+        available.
+        """
+
+        interface = self.interface
+
+        if interface is None:
+            return False
+
+        def error_handler(error):
+            if error.get_dbus_name() in UNAVAILABLE_ERRORS:
+                proxies.failed(self.bus_name)
+
+            logger.LoggerMixin.logger.warning(
+                "DBus call {0}.{1} failed: {2}".format(
+                    self.bus_name, method, error))
+
+        getattr(interface, method)(*args,
+                                   reply_handler=lambda *reply: None,
+                                   error_handler=error_handler)
+        return True
 
 
 class AsyncEvalMixinBase(object):
 
     """
     Base class for the asynchronous evaluation of the plugins. It makes
-    sure that the plugin is evaluated in a separate thread, and hence
-    it does not block the main execution loop of the program.
+    sure that the plugin is evaluated in a separate thread (from a thread
+    pool shared by all the asynchronous plugins), and hence it does not
+    block the main execution loop of the program.
+
+    When the result is available, the scheduler is woken up, so that the
+    plugins waiting for it (i.e. the trackers listing the identifier of this
+    plugin in their sources) are evaluated immediately.
 
     This class is not to be used directly, instead one of the two child
     classes is supposed to be used:
-        AsyncEvalNonBlockingMixin - does not block the thread, useful for
-                                    plugins that leverage polling to obtain
-                                    the data
-        AsyncEvalBlockingMixin - blocks the thread, useful for the plugins
-                                 that have data pushed using callbacks
+        AsyncEvalNonBlockingMixin - the result is the return value of the
+                                    run method, useful for plugins that
+                                    leverage polling to obtain the data
+        AsyncEvalBlockingMixin - the result is set to the result attribute
+                                 later, useful for the plugins that have data
+                                 pushed using callbacks
     """
 
     stateless = False
 
+    # Shared among all the asynchronous plugins, see executor()
+    pool = None
+    pool_lock = threading.Lock()
+
     def __init__(self, *args, **kwargs):
         super(AsyncEvalMixinBase, self).__init__(*args, **kwargs)
 
         self.running = False
         self.completed = False
-        self.result = None
+        self._result = None
+
+    @classmethod
+    def executor(cls):
+        with cls.pool_lock:
+            if AsyncEvalMixinBase.pool is None:
+                AsyncEvalMixinBase.pool = ThreadPool(config.ASYNC_WORKERS)
+
+        return AsyncEvalMixinBase.pool
+
+    @property
+    def result(self):
+        return self._result
+
+    @result.setter
+    def result(self, value):
+        # Results are pushed by setting the attribute
+        self._result = value
+
+        if value is not None:
+            self.complete()
+
+    def complete(self):
+        """
+        Marks the evaluation as completed and wakes up the main loop.
+        """
+
+        self.completed = True
+        self.running = False
+
+        scheduler = getattr(self.context, 'scheduler', None)
+
+        # Activities are evaluated in every round, make sure the round
+        # happens now, even if no plugin waits for this one
+        if scheduler is not None and not scheduler.wakeup(self.identifier):
+            scheduler.notify()
+
+    def run_handler(self, *args, **kwargs):
+        # pylint: disable=broad-except
+        try:
+            self.thread_handler(*args, **kwargs)
+        except Exception:
+            self.log_exception()
+
+            # Let the plugin be evaluated again
+            self.running = False
 
     def thread_handler(self, *args, **kwargs):
         raise NotImplementedError("This class is not meant to be run directly")
 
     def evaluate(self, *args, **kwargs):
         if not self.running and not self.completed:
-            thread = threading.Thread(
-                target=self.thread_handler,
-                args=args,
-                kwargs=kwargs
-            )
-            thread.start()
+            self.running = True
+            self.executor().apply_async(self.run_handler, args, kwargs)
         elif self.completed:
             return self.result
 
@@ -287,44 +420,36 @@ class AsyncEvalMixinBase(object):
 
         self.running = False
         self.completed = False
-        self.result = None
+        self._result = None
 
 
 class AsyncEvalNonBlockingMixin(AsyncEvalMixinBase):
     """
-    Async mixin for polling-based plugins. Does not block the thread.
+    Async mixin for polling-based plugins. The result is the return value
+    of the run method.
     """
 
     def thread_handler(self, *args, **kwargs):
-        self.running = True
-
         # Here we intentionally call the evaluate on the grandparent to avoid
         # getting into a deadlock
         # pylint: disable=bad-super-call
-        self.result = super(AsyncEvalMixinBase, self).evaluate(*args, **kwargs)
-        self.completed = True
-        self.running = False
+        self._result = super(AsyncEvalMixinBase, self).evaluate(*args, **kwargs)
+        self.complete()
 
 
 class AsyncEvalBlockingMixin(AsyncEvalMixinBase):
     """
-    Async mixin for pushing-based plugins. Does block the thread, waiting
-    for the result to be updated.
+    Async mixin for pushing-based plugins. The evaluation is completed when
+    a result is set to the result attribute, i.e. from a callback. No thread
+    is blocked while waiting for it.
     """
 
     def thread_handler(self, *args, **kwargs):
-        self.running = True
-        super(AsyncEvalBlockingMixin, self).evaluate(*args, **kwargs)
-
-        # Block until result is available
-        while getattr(self, 'result', None) is None:
-            time.sleep(1)
-
-        self.completed = True
-        self.running = False
+        # pylint: disable=bad-super-call
+        super(AsyncEvalMixinBase, self).evaluate(*args, **kwargs)
 
 
-class AsyncDBusEvalMixin(AsyncEvalNonBlockingMixin, DBusMixin):
+class AsyncDBusEvalMixin(AsyncEvalBlockingMixin, DBusMixin):
     """
     Async mixin for pushing-based plugins leveraging async dbus
     calls.
@@ -338,16 +463,48 @@ class AsyncDBusEvalMixin(AsyncEvalNonBlockingMixin, DBusMixin):
         raise error
 
 
-class HashableDict(dict):
+def freeze(value):
     """
-    Enhanced dictionary that can be hashed (hence used as a key).
+    Returns a hashable equivalent of the given value, i.e. converts the
+    (nested) dictionaries and lists to tuples.
+    """
+
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    elif isinstance(value, set):
+        return frozenset(value)
+
+    return value
+
+
+class CacheKey(tuple):
     """
+    Result cache key of a plugin call with arguments, in the form of
+    (identifier, args, kwargs, hash). The hash is computed only once, since
+    the key is looked up in several dictionaries.
+
+    Calls without arguments use the identifier itself as the key.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, identifier, args, kwargs):
+        args = freeze(args)
+        kwargs = freeze(kwargs)
+        return tuple.__new__(cls, (identifier, args, kwargs,
+                                   hash((identifier, args, kwargs))))
 
     def __hash__(self):
-        return hash(frozenset(self.items()))
+        return self[3]
+
 
+# Marks the results missing in the result cache, since None is a valid result
+MISSING = object()
 
-class PluginFactory(object):
+
+class PluginFactory(logger.LoggerMixin):
     """
     Simple factory class for a plugin mount. Provides creation capabilities
     for plugins of given type.
@@ -364,10 +521,20 @@ class PluginFactory(object):
         given PluginMount upon which the factory is built.
         """
 
-        return {
-            plugin_class.identifier: plugin_class
-            for plugin_class in self.mount.plugins
-        }
+        return self.mount.index
+
+    def provides(self, identifier):
+        """
+        Returns True if there is a plugin with the given identifier, importing
+        the module defining it if needed.
+        """
+
+        try:
+            self.get_plugin(identifier)
+        except NoSuchPlugin:
+            return False
+
+        return True
 
     def make(self, identifier, args=None, kwargs=None):
         """
@@ -387,6 +554,10 @@ class PluginFactory(object):
         NoSuchPlugin exception if none found.
         """
 
+        # The module defining the plugin might not be imported yet
+        if identifier not in self.plugins:
+            manifest.import_plugin(self.mount, identifier)
+
         try:
             return self.plugins[identifier]
         except KeyError:
@@ -414,14 +585,42 @@ class PluginCache(PluginFactory):
                    multiple Rules.
       * side_effects: Plugin has side effects, i.e. it makes sense to
                       re-evaluate it when called with the same arguments.
+
+    The result cache is cleared after each round. Results of plugins that
+    declare their freshness are kept in a second, size-bounded cache across
+    the rounds, until they expire. Freshness is either number of seconds, or
+    one of 'minute', 'hour', 'day', meaning the result is valid until the
+    start of the next minute, hour or day.
+
+    Results of the cacheable plugins can be prefetched in parallel using
+    the prefetch method. To know which results to prefetch, PluginCache
+    remembers which cacheable plugins were requested by each rule in the
+    round it was last evaluated.
     """
 
     def __init__(self, mount, context):
         super(PluginCache, self).__init__(mount, context)
 
+        # Used to label the profiling statistics, i.e. 'reporter'
+        self.category = mount.__name__.lower()
+
         self.cache = {}
+        self.fresh = collections.OrderedDict()
         self.instances = {}
 
+        # Cacheable requests made by the rules, as rule name -> {key: request}
+        self.requests = {}
+        self.round_requests = {}
+
+        self.pool = None
+
+        # The plugins evaluated by the prefetching threads report the other
+        # plugins too, hence the caches are shared with the main thread
+        self.lock = threading.RLock()
+
+        # Memoized dependency_order results
+        self.orders = {}
+
     def get(self, identifier, args=None, kwargs=None, rule_name=None):
         """
         Obtain a result from the given plugin. If the plugin is stateless
@@ -436,25 +635,36 @@ class PluginCache(PluginFactory):
 
         plugin_class = self.get_plugin(identifier)
 
-        # Instances can be shared, and be kept for the time the Actor runs,
-        # however, in the case of stateful plugins, we need to make sure
-        # we create a separate instance per rule.
-
-        if plugin_class.stateless and not plugin_class.side_effects:
-            # Can be cached (per loop).
-            return self.result_from_cache(identifier, args, kwargs)
-        elif plugin_class.stateless:
-            # It has side-effects, hence we need to run it.
-            return self.run_plugin_instance(identifier, args, kwargs)
-        else:
-            if rule_name is None:
-                raise ValueError("Only stateless plugins can be accessed "
-                                 "from workers.")
-            # It is stateful, hence cannot be shared between modules.
-            # Modify instance name to include the rule name.
-            instance_id = '{0}_{1}'.format(identifier, rule_name)
-            return self.run_plugin_instance(instance_id, args, kwargs,
-                                            class_identifier=identifier)
+        with self.context.profiler.measure(self.category,
+                                           identifier) as measurement:
+            # Instances can be shared, and be kept for the time the Actor runs,
+            # however, in the case of stateful plugins, we need to make sure
+            # we create a separate instance per rule.
+
+            if plugin_class.stateless and not plugin_class.side_effects:
+                # Can be cached (per loop).
+                key = self.key(identifier, args, kwargs)
+
+                if rule_name is not None:
+                    with self.lock:
+                        self.round_requests.setdefault(rule_name, {})[key] = (
+                            identifier, args, kwargs)
+
+                return self.result_from_cache(identifier, args, kwargs,
+                                              measurement=measurement,
+                                              key=key)
+            elif plugin_class.stateless:
+                # It has side-effects, hence we need to run it.
+                return self.run_plugin_instance(identifier, args, kwargs)
+            else:
+                if rule_name is None:
+                    raise ValueError("Only stateless plugins can be accessed "
+                                     "from workers.")
+                # It is stateful, hence cannot be shared between modules.
+                # Modify instance name to include the rule name.
+                instance_id = '{0}_{1}'.format(identifier, rule_name)
+                return self.run_plugin_instance(instance_id, args, kwargs,
+                                                class_identifier=identifier)
 
     def get_plugin_instance(self, identifier, class_identifier=None):
         """
@@ -466,32 +676,265 @@ class PluginCache(PluginFactory):
         Makes sure plugins are initialized only once.
         """
 
-        instance = self.instances.get(identifier)
+        with self.lock:
+            instance = self.instances.get(identifier)
 
-        if instance is None:
-            identifier = class_identifier or identifier
-            self.instances[identifier] = instance = self.make(identifier)
+            if instance is None:
+                instance = self.make(class_identifier or identifier)
+                self.instances[identifier] = instance
 
-        return instance
+            return instance
 
-    def result_from_cache(self, identifier, args, kwargs):
+    def result_from_cache(self, identifier, args, kwargs, measurement=None,
+                          key=None):
         """
         Only for stateless plugins with no side-effects. Gets the result from
         evaluation of the plugin with the corresponding identifier.
 
         Makes sure plugins are evaluated only once per (args, kwargs) tuple.
+        If measurement is given, it is marked as cache hit or miss.
         """
         # Note: Only for stateless and no side-effects
 
-        key = (identifier, args, HashableDict(**kwargs))
-        value = self.cache.get(key)
+        if key is None:
+            key = self.key(identifier, args, kwargs)
 
-        if value is None:
-            plugin_instance = self.get_plugin(identifier)(self.context)
-            self.cache[key] = value = plugin_instance.evaluate(*args, **kwargs)
+        value = self.cached_value(key)
+
+        if measurement is not None:
+            measurement.hit = value is not MISSING
+
+        if value is MISSING:
+            # Evaluate each of the dependencies only once, before any of
+            # the plugins depending on it
+            for dependency in self.dependency_order(identifier)[:-1]:
+                self.result_from_cache(dependency, tuple(), dict())
+
+            # Stateless plugins can share a single instance
+            plugin_instance = self.get_plugin_instance(identifier)
+            value = plugin_instance.evaluate(*args, **kwargs)
+            self.store(identifier, key, value)
 
         return value
 
+    def cached_value(self, key):
+        """
+        Returns the cached result for the given key, or MISSING if the result
+        is not available. Looks into the round cache first, then into the
+        cache of results that are still fresh.
+        """
+
+        with self.lock:
+            value = self.cache.get(key, MISSING)
+
+            if value is MISSING and key in self.fresh:
+                expiration, value = self.fresh.pop(key)
+
+                if expiration > time.time():
+                    # Mark the entry as recently used
+                    self.fresh[key] = (expiration, value)
+                    self.cache[key] = value
+                else:
+                    value = MISSING
+
+            return value
+
+    def store(self, identifier, key, value):
+        """
+        Stores the result in the round cache. If the plugin declares its
+        freshness, the result is stored in the cache that survives across
+        rounds too, evicting the least recently used results if the cache is
+        full.
+        """
+
+        freshness = getattr(self.get_plugin(identifier), 'freshness', None)
+
+        with self.lock:
+            self.cache[key] = value
+
+            if freshness is None:
+                return
+
+            self.fresh.pop(key, None)
+            self.fresh[key] = (util.expiration_timestamp(freshness), value)
+
+            while len(self.fresh) > config.FRESH_CACHE_SIZE:
+                self.fresh.popitem(last=False)
+
+    def invalidate(self, identifier):
+        """
+        Drops all the cached results of the given plugin, i.e. after a fixer
+        changed the state the plugin reports.
+        """
+
+        with self.lock:
+            for cache in (self.cache, self.fresh):
+                for key in [key for key in cache
+                            if key == identifier or
+                            isinstance(key, CacheKey) and
+                            key[0] == identifier]:
+                    del cache[key]
+
+    @staticmethod
+    def key(identifier, args, kwargs):
+        """
+        Returns the result cache key for the given plugin call.
+        """
+
+        if not args and not kwargs:
+            return identifier
+
+        return CacheKey(identifier, args, kwargs)
+
+    def evaluate_request(self, request):
+        """
+        Evaluates a single (identifier, args, kwargs) request. Returns an
+        (identifier, key, value) tuple, value being MISSING if the evaluation
+        failed. To be run in the worker threads.
+        """
+
+        identifier, args, kwargs = request
+        key = self.key(identifier, args, kwargs)
+
+        # pylint: disable=broad-except
+        try:
+            plugin_instance = self.get_plugin_instance(identifier)
+            return identifier, key, plugin_instance.evaluate(*args, **kwargs)
+        except Exception as exc:
+            # Failed plugins are left to be re-evaluated by the rules, which
+            # will handle the exception properly
+            self.debug("Prefetching {0} failed: {1}", identifier, exc)
+            return identifier, key, MISSING
+
+    def prefetch(self, requests):
+        """
+        Evaluates the given (identifier, args, kwargs) requests concurrently
+        on a bounded thread pool and stores their results in the result
+        cache. Only cacheable plugins are considered, the rest is silently
+        skipped. Plugins that are not thread-safe are evaluated in the main
+        thread.
+
+        Dependencies of the requested plugins are prefetched as well. The
+        requests are evaluated in levels, so that each plugin is evaluated
+        only after all of its dependencies are available in the cache.
+        """
+
+        if not config.PREFETCH_WORKERS:
+            return
+
+        pending = {}
+
+        for identifier, args, kwargs in requests:
+            try:
+                order = self.dependency_order(identifier)
+            except (NoSuchPlugin, CyclicDependency) as exc:
+                # Left to the rules, which handle the exception properly
+                self.warning("Not prefetching {0}: {1}", identifier, exc)
+                continue
+
+            pending.update(
+                (self.key(dependency, tuple(), dict()),
+                 (dependency, tuple(), dict()))
+                for dependency in order[:-1]
+            )
+            pending[self.key(identifier, args, kwargs)] = (identifier, args, kwargs)
+
+        # Group the requests by their depth in the dependency graph
+        levels = {}
+        for key, request in pending.items():
+            level = len(self.dependency_order(request[0]))
+            levels.setdefault(level, {})[key] = request
+
+        for level in sorted(levels):
+            evaluable = []
+
+            for key, request in levels[level].items():
+                try:
+                    if (self.cached_value(key) is MISSING and
+                            self.can_prefetch(request[0])):
+                        evaluable.append(
+                            (request, self.get_plugin(request[0]).parallel))
+                except (NoSuchPlugin, CyclicDependency) as exc:
+                    self.warning("Not prefetching {0}: {1}", request[0], exc)
+
+            # Plugins bound to the main thread (or lone plugins, which are not
+            # worth the thread synchronization) are evaluated directly
+            threaded = [request for request, parallel in evaluable
+                        if parallel]
+            inline = [request for request, parallel in evaluable
+                      if not parallel or len(threaded) < 2]
+
+            results = [self.evaluate_request(request) for request in inline]
+
+            if len(threaded) >= 2:
+                if self.pool is None:
+                    self.pool = ThreadPool(config.PREFETCH_WORKERS)
+
+                results += self.pool.map(self.evaluate_request, threaded)
+
+            # The plugins reported by the requested ones were stored by
+            # the workers already, see cached_value and store
+            for identifier, key, value in results:
+                if value is not MISSING:
+                    self.store(identifier, key, value)
+
+    def can_prefetch(self, identifier):
+        """
+        Returns True if the plugin given by the identifier can be prefetched,
+        i.e. it is cacheable and all of its dependencies are already cached.
+        """
+
+        plugin_class = self.get_plugin(identifier)
+
+        return (plugin_class.stateless and
+                not plugin_class.side_effects and
+                all(self.cached_value(dependency) is not MISSING
+                    for dependency in getattr(plugin_class, 'dependencies',
+                                              tuple())))
+
+    def dependency_order(self, identifier):
+        """
+        Returns the list of identifiers of all the (transitive) dependencies
+        of the given plugin, in the order they need to be evaluated, followed
+        by the identifier itself.
+
+        Raises CyclicDependency if the dependencies do not form a DAG.
+        """
+
+        order = self.orders.get(identifier)
+
+        if order is None:
+            order = []
+
+            def visit(current, path):
+                if current in path:
+                    raise CyclicDependency(
+                        "Plugins {0} depend on each other"
+                        .format(' -> '.join(path + (current,)))
+                    )
+
+                if current in order:
+                    return
+
+                plugin_class = self.get_plugin(current)
+                for dependency in getattr(plugin_class, 'dependencies', tuple()):
+                    visit(dependency, path + (current,))
+
+                order.append(current)
+
+            visit(identifier, tuple())
+            self.orders[identifier] = order
+
+        return order
+
+    def rule_requests(self, rule_name):
+        """
+        Returns the list of cacheable requests the given rule made during
+        its last evaluation.
+        """
+
+        return self.requests.get(rule_name, {}).values()
+
     def run_plugin_instance(self, identifier, args,
                             kwargs, class_identifier=None):
         """
@@ -507,12 +950,18 @@ class PluginCache(PluginFactory):
         Clears the result cache. Instance cache is preserved.
         """
 
-        self.cache.clear()
+        with self.lock:
+            self.cache.clear()
+
+            # Remember the requests made by the rules evaluated in the last
+            # round
+            self.requests.update(self.round_requests)
+            self.round_requests = {}
 
     def __iter__(self):
         """
         Iterates over all the instances of the plugins available to the cache.
         """
 
-        for plugin_class in self.plugins:
-            yield self.get_plugin_instance(plugin_class.identifier, None)
+        for identifier in list(self.plugins):
+            yield self.get_plugin_instance(identifier, None)
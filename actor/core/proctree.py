@@ -0,0 +1,359 @@
+"""
+Provides an index of the running processes (their parents, children and
+command lines), which is kept up to date incrementally, so that the
+descendants of a process can be looked up without walking the whole /proc.
+"""
+
+import collections
+import errno
+import os
+import socket
+import struct
+import threading
+import time
+
+from config import config
+from logger import LoggerMixin
+
+
+# Constants of the netlink process events connector, see
+# linux/netlink.h, linux/connector.h and linux/cn_proc.h
+NETLINK_CONNECTOR = 11
+NLMSG_DONE = 3
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+
+NLMSGHDR = struct.Struct('=IHHII')
+CN_MSG = struct.Struct('=IIIIHH')
+PROC_EVENT = struct.Struct('=IIQ')
+EVENT_DATA = struct.Struct('=IIII')
+
+
+def read_stat(pid):
+    """
+    Returns the PID of the parent, the start time and the command name of
+    the given process, or None if the process does not exist.
+    """
+
+    try:
+        with open('/proc/%d/stat' % pid, 'r') as fil:
+            stat = fil.read()
+    except IOError:
+        return None
+
+    # The command name can contain spaces and parentheses, hence the fields
+    # are counted from its end
+    end = stat.rfind(')')
+    fields = stat[end + 2:].split(' ')
+    return int(fields[1]), int(fields[19]), stat[stat.find('(') + 1:end]
+
+
+def read_parent(pid):
+    """
+    Returns the PID of the parent of the given process, or None if the
+    process does not exist.
+    """
+
+    stat = read_stat(pid)
+    return stat[0] if stat is not None else None
+
+
+def read_identity(pid):
+    """
+    Returns the start time, the command name and the executable of the given
+    process, which change when the PID is reused or the process executes
+    another program. Returns None if the process does not exist.
+    """
+
+    stat = read_stat(pid)
+    if stat is None:
+        return None
+
+    try:
+        executable = os.readlink('/proc/%d/exe' % pid)
+    except OSError:
+        # Kernel threads and processes of other users
+        executable = None
+
+    return stat[1], stat[2], executable
+
+
+def read_cmdline(pid):
+    """
+    Returns the command line of the given process, with the arguments
+    separated by spaces. Returns None if the process does not exist.
+    """
+
+    try:
+        with open('/proc/%d/cmdline' % pid, 'r') as fil:
+            return fil.read().rstrip('\0').replace('\0', ' ')
+    except IOError:
+        return None
+
+
+def list_pids():
+    return set(int(entry) for entry in os.listdir('/proc') if entry.isdigit())
+
+
+class ProcessEventsListener(LoggerMixin):
+    """
+    Receives fork, exec and exit events from the kernel using the netlink
+    process events connector. Requires CAP_NET_ADMIN, hence it is not
+    available for unprivileged users on most systems.
+    """
+
+    def __init__(self):
+        self.socket = None
+
+    def connect(self):
+        """
+        Subscribes to the process events. Returns True on success.
+        """
+
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                 NETLINK_CONNECTOR)
+            sock.bind((0, CN_IDX_PROC))
+
+            payload = struct.pack('=I', PROC_CN_MCAST_LISTEN)
+            message = CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0,
+                                  len(payload), 0) + payload
+            sock.send(NLMSGHDR.pack(NLMSGHDR.size + len(message),
+                                    NLMSG_DONE, 0, 0, os.getpid()) + message)
+        except (socket.error, AttributeError) as exc:
+            self.debug("Process events connector not available: {0}", exc)
+            return False
+
+        sock.setblocking(False)
+        self.socket = sock
+        return True
+
+    def events(self):
+        """
+        Yields the pending events in the form of (event, pid, parent) tuples.
+        Raises socket.error with ENOBUFS if some events were lost.
+        """
+
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except socket.error as exc:
+                if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+
+            offset = 0
+
+            while offset + NLMSGHDR.size <= len(data):
+                length = NLMSGHDR.unpack_from(data, offset)[0]
+                event = offset + NLMSGHDR.size + CN_MSG.size
+
+                try:
+                    what = PROC_EVENT.unpack_from(data, event)[0]
+                    values = EVENT_DATA.unpack_from(data,
+                                                    event + PROC_EVENT.size)
+                except struct.error as exc:
+                    # The rest of the datagram cannot be trusted
+                    self.warning("Malformed process event: {0}", exc)
+                    break
+
+                if what == PROC_EVENT_FORK:
+                    parent_pid, parent_tgid, child_pid, child_tgid = values
+                    # Threads are not interesting
+                    if child_pid == child_tgid:
+                        yield what, child_tgid, parent_tgid
+                elif what in (PROC_EVENT_EXEC, PROC_EVENT_EXIT):
+                    pid, tgid = values[:2]
+                    if pid == tgid:
+                        yield what, tgid, None
+
+                offset += max(NLMSGHDR.size, (length + 3) & ~3)
+
+
+class ProcessIndex(LoggerMixin):
+    """
+    Keeps the tree of the running processes and their command lines.
+
+    The index is updated from the netlink process events if they are
+    available, otherwise by comparing the list of PIDs in /proc with the
+    previous one. Only the entries of new processes are read. Command lines
+    are read lazily and cached together with the identity of the process
+    (see read_identity), which is checked on every lookup, so that neither
+    an exec nor a reused PID leaves a stale command line or parent behind.
+
+    The index is refreshed whenever it is queried and it is older than
+    PROCESS_INDEX_MAX_AGE seconds.
+    """
+
+    def __init__(self):
+        self.parents = {}
+        self.children = collections.defaultdict(set)
+        self.cmdlines = {}
+        self.start_times = {}
+        self.orphans = set()
+
+        self.listener = None
+        self.refreshed = None
+        self.lock = threading.RLock()
+
+    def add(self, pid, parent, start_time=None):
+        self.parents[pid] = parent
+        self.children[parent].add(pid)
+
+        if start_time is not None:
+            self.start_times[pid] = start_time
+
+    def remove(self, pid):
+        parent = self.parents.pop(pid, None)
+        self.cmdlines.pop(pid, None)
+        self.start_times.pop(pid, None)
+        self.orphans.discard(pid)
+
+        if parent is not None:
+            self.children[parent].discard(pid)
+            if not self.children[parent]:
+                del self.children[parent]
+
+        # The children are adopted by init (or a subreaper), find out which
+        # one on the next refresh
+        self.orphans.update(self.children.pop(pid, set()))
+
+    def reparent(self, pid):
+        parent = read_parent(pid)
+
+        if parent is None:
+            self.remove(pid)
+        elif parent != self.parents.get(pid):
+            self.children.get(self.parents[pid], set()).discard(pid)
+            self.parents[pid] = parent
+            self.children[parent].add(pid)
+
+    def rescan(self):
+        """
+        Updates the index by comparing the PIDs in /proc with the indexed
+        ones.
+        """
+
+        pids = list_pids()
+        known = set(self.parents)
+
+        for pid in known - pids:
+            self.remove(pid)
+
+        for pid in pids - known:
+            stat = read_stat(pid)
+            if stat is not None:
+                self.add(pid, stat[0], stat[1])
+
+    def process_events(self):
+        """
+        Updates the index from the process events received since the last
+        refresh.
+        """
+
+        try:
+            for event, pid, parent in self.listener.events():
+                if event == PROC_EVENT_FORK:
+                    if pid in self.parents:
+                        self.remove(pid)
+                    self.add(pid, parent)
+                elif event == PROC_EVENT_EXEC:
+                    self.cmdlines.pop(pid, None)
+                elif event == PROC_EVENT_EXIT:
+                    self.remove(pid)
+        except socket.error as exc:
+            # Most probably we did not keep up with the events
+            self.warning("Lost process events, rescanning: {0}", exc)
+            self.rescan()
+
+    def refresh(self, force=False):
+        with self.lock:
+            now = time.time()
+
+            if (not force and self.refreshed is not None and
+                    now - self.refreshed < config.PROCESS_INDEX_MAX_AGE):
+                return
+
+            if self.refreshed is None:
+                self.listener = ProcessEventsListener()
+                if not self.listener.connect():
+                    self.listener = None
+
+                # The events connector does not tell us about the processes
+                # which already exist
+                self.rescan()
+            elif self.listener is not None:
+                self.process_events()
+            else:
+                self.rescan()
+
+            for pid in list(self.orphans):
+                if pid in self.parents:
+                    self.reparent(pid)
+            self.orphans = set()
+
+            self.refreshed = now
+
+    def cmdline(self, pid):
+        """
+        Returns the command line of the given process, or None if it is not
+        running.
+        """
+
+        with self.lock:
+            self.refresh()
+
+            identity = read_identity(pid)
+            if identity is None:
+                return None
+
+            cached = self.cmdlines.get(pid)
+            if cached is not None and cached[0] == identity:
+                return cached[1]
+
+            start_time = self.start_times.get(pid)
+            if start_time is not None and start_time != identity[0]:
+                # The PID was reused between two refreshes
+                parent = read_parent(pid)
+                self.remove(pid)
+                if parent is not None:
+                    self.add(pid, parent, identity[0])
+
+            cmdline = read_cmdline(pid)
+            if cmdline is None:
+                return None
+
+            self.cmdlines[pid] = identity, cmdline
+            return cmdline
+
+    def descendants(self, pid):
+        """
+        Returns the list of PIDs of all the descendants of the given process.
+        """
+
+        with self.lock:
+            self.refresh()
+
+            result = []
+            queue = collections.deque(self.children.get(pid, tuple()))
+
+            while queue:
+                child = queue.popleft()
+                result.append(child)
+                queue.extend(self.children.get(child, tuple()))
+
+            return result
+
+    def direct_children(self, pid):
+        with self.lock:
+            self.refresh()
+            return sorted(self.children.get(pid, tuple()))
+
+
+# Shared among all the activities and reporters
+index = ProcessIndex()
@@ -0,0 +1,161 @@
+"""
+Provides timing statistics of the rules, trackers, activities, flows and
+workers evaluated by Actor.
+"""
+
+import contextlib
+import threading
+import time
+
+from config import config
+
+
+# DBus signature of the summary, see Profiler.summary
+SUMMARY_SIGNATURE = 'a(ssiiiidddai)'
+
+
+class Measurement(object):
+    """
+    A single timed evaluation. The code being measured can mark whether
+    the result was obtained from cache by setting the hit attribute.
+    """
+
+    def __init__(self):
+        self.hit = None
+
+        # Time spent in the measurements nested in this one, in seconds
+        self.nested = 0.0
+
+
+class Statistics(object):
+    """
+    Aggregated statistics of the evaluations of a single plugin.
+    """
+
+    # Upper bounds (in milliseconds) of the histogram buckets. The last
+    # bucket holds all the slower evaluations.
+    BUCKETS = (1, 5, 10, 50, 100, 500, 1000)
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.exceptions = 0
+        self.total = 0.0
+        self.exclusive = 0.0
+        self.maximum = 0.0
+        self.histogram = [0] * (len(self.BUCKETS) + 1)
+
+    def record(self, duration, exclusive=None, hit=None, failed=False):
+        milliseconds = duration * 1000.0
+
+        if exclusive is None:
+            exclusive = duration
+
+        self.calls += 1
+        self.total += milliseconds
+        self.exclusive += exclusive * 1000.0
+        self.maximum = max(self.maximum, milliseconds)
+
+        if hit is True:
+            self.hits += 1
+        elif hit is False:
+            self.misses += 1
+
+        if failed:
+            self.exceptions += 1
+
+        bucket = len([bound for bound in self.BUCKETS if bound <= milliseconds])
+        self.histogram[bucket] += 1
+
+
+class Profiler(object):
+    """
+    Collects the timing statistics, keyed by the category (i.e. 'rule' or
+    'reporter') and the name of the measured plugin.
+
+    The total time of a measurement includes the measurements nested in it
+    (i.e. the reporters used by a rule), the exclusive time does not.
+    Measurements are nested only within a single thread.
+    """
+
+    def __init__(self):
+        self.statistics = {}
+
+        # Workers can be evaluated from the prefetching threads
+        self.lock = threading.Lock()
+
+        # The stack of the measurements in progress, per thread
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def measure(self, category, name):
+        """
+        Measures the wall time of the wrapped block and records it, along
+        with any exception raised from it. Yields a Measurement object.
+        """
+
+        measurement = Measurement()
+
+        if not config.PROFILING:
+            yield measurement
+            return
+
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+
+        failed = False
+        start = time.time()
+        stack.append(measurement)
+
+        try:
+            yield measurement
+        except Exception:
+            failed = True
+            raise
+        finally:
+            duration = time.time() - start
+            stack.pop()
+
+            if stack:
+                stack[-1].nested += duration
+
+            self.record(category, name, duration,
+                        exclusive=duration - measurement.nested,
+                        hit=measurement.hit, failed=failed)
+
+    def record(self, category, name, duration, exclusive=None, hit=None,
+               failed=False):
+        with self.lock:
+            key = (category, name)
+            statistics = self.statistics.get(key)
+
+            if statistics is None:
+                statistics = self.statistics[key] = Statistics()
+
+            statistics.record(duration, exclusive=exclusive, hit=hit,
+                              failed=failed)
+
+    def summary(self):
+        """
+        Returns the list of the collected statistics, sorted by the total
+        time spent, in the form of tuples:
+
+        (category, name, calls, hits, misses, exceptions, total time (ms),
+         exclusive time (ms), maximum time (ms), histogram)
+        """
+
+        with self.lock:
+            rows = [
+                (category, name, stats.calls, stats.hits, stats.misses,
+                 stats.exceptions, stats.total, stats.exclusive,
+                 stats.maximum, list(stats.histogram))
+                for (category, name), stats in self.statistics.items()
+            ]
+
+        return sorted(rows, key=lambda row: row[6], reverse=True)
+
+    def reset(self):
+        with self.lock:
+            self.statistics.clear()
@@ -0,0 +1,169 @@
+"""
+Provides the cache of the DBus proxy objects shared by all the DBus plugins.
+"""
+
+import threading
+import time
+
+import dbus
+
+from config import config
+from logger import LoggerMixin
+
+
+# Errors meaning that the service is not available (or not responding)
+UNAVAILABLE_ERRORS = (
+    'org.freedesktop.DBus.Error.NoReply',
+    'org.freedesktop.DBus.Error.ServiceUnknown',
+    'org.freedesktop.DBus.Error.NameHasNoOwner',
+    'org.freedesktop.DBus.Error.Disconnected',
+    'org.freedesktop.DBus.Error.Timeout',
+)
+
+
+class BoundedInterface(object):
+    """
+    Wraps dbus.Interface. Unless given explicitly, the synchronous calls time
+    out after DBUS_TIMEOUT seconds, since they block the checking rounds.
+    The asynchronous calls (given a reply_handler) keep the default timeout
+    of dbus, i.e. the services are given time to suspend or lock the screen.
+    Calls failing because the service is not available make the proxy cache
+    back off from the service.
+    """
+
+    def __init__(self, interface, cache, bus_name):
+        self.interface = interface
+        self.cache = cache
+        self.bus_name = bus_name
+
+    def __getattr__(self, name):
+        method = getattr(self.interface, name)
+
+        def call(*args, **kwargs):
+            if 'reply_handler' not in kwargs:
+                kwargs.setdefault('timeout', config.DBUS_TIMEOUT)
+
+            try:
+                return method(*args, **kwargs)
+            except dbus.exceptions.DBusException as exc:
+                if exc.get_dbus_name() in UNAVAILABLE_ERRORS:
+                    self.cache.failed(self.bus_name)
+                raise
+
+        return call
+
+
+class ProxyCache(LoggerMixin):
+    """
+    Keeps one proxy per DBus object. If a service is not available, the
+    attempts to connect to it are backed off exponentially, up to
+    DBUS_MAX_BACKOFF seconds. The owners of the bus names are watched, so
+    that the proxies are recreated as soon as the service is restarted.
+    """
+
+    def __init__(self):
+        self.bus = None
+        self.proxies = {}
+        self.watched = set()
+
+        # Bus name -> (number of consecutive failures, retry timestamp)
+        self.failures = {}
+
+        # Proxies are requested from the prefetching threads too
+        self.lock = threading.RLock()
+
+    def session_bus(self):
+        with self.lock:
+            if self.bus is None:
+                self.bus = dbus.SessionBus()
+
+        return self.bus
+
+    def get(self, bus_name, object_path, interface_name=None):
+        """
+        Returns the (bounded) interface of the given object, or None if the
+        service is not available.
+        """
+
+        key = (bus_name, object_path, interface_name or bus_name)
+        proxy = self.proxies.get(key)
+
+        if proxy is not None:
+            return proxy
+
+        with self.lock:
+            retry = self.failures.get(bus_name, (0, 0))[1]
+            if time.time() < retry:
+                return None
+
+        try:
+            bus = self.session_bus()
+            self.watch(bus_name)
+            dbus_object = bus.get_object(bus_name, object_path)
+            proxy = BoundedInterface(dbus.Interface(dbus_object, key[2]),
+                                     self, bus_name)
+        except dbus.exceptions.DBusException as exc:
+            self.debug("Could not connect to {0}: {1}", bus_name, exc)
+            self.failed(bus_name)
+            return None
+
+        with self.lock:
+            self.proxies[key] = proxy
+            self.failures.pop(bus_name, None)
+
+        return proxy
+
+    def drop(self, bus_name):
+        with self.lock:
+            for key in [key for key in self.proxies if key[0] == bus_name]:
+                del self.proxies[key]
+
+    def failed(self, bus_name):
+        """
+        Drops the proxies of the given service and backs off from it.
+        """
+
+        with self.lock:
+            count = self.failures.get(bus_name, (0, 0))[0] + 1
+            delay = min(2 ** (count - 1), config.DBUS_MAX_BACKOFF)
+            self.failures[bus_name] = (count, time.time() + delay)
+
+        self.drop(bus_name)
+        self.debug("{0} not available, retrying in {1} s", bus_name, delay)
+
+    def forget(self, bus_name):
+        """
+        Drops the proxies and the failures of the given service, so that the
+        next request connects to it immediately.
+        """
+
+        with self.lock:
+            self.failures.pop(bus_name, None)
+
+        self.drop(bus_name)
+
+    def watch(self, bus_name):
+        with self.lock:
+            if bus_name in self.watched:
+                return
+            self.watched.add(bus_name)
+
+        def owner_changed(owner):
+            # The proxies are bound to the previous owner. The backoff is
+            # reset only when the service appears, since the callback is
+            # also called with the current owner right after watching.
+            self.debug("Owner of {0} changed to '{1}'", bus_name, owner)
+
+            if owner:
+                self.forget(bus_name)
+            else:
+                self.drop(bus_name)
+
+        try:
+            self.session_bus().watch_name_owner(bus_name, owner_changed)
+        except dbus.exceptions.DBusException as exc:
+            self.debug("Could not watch {0}: {1}", bus_name, exc)
+
+
+# Shared among all the DBus plugins
+proxies = ProxyCache()
@@ -0,0 +1,175 @@
+"""
+Provides a monitor of the unread Pidgin (libpurple) conversations, based on
+the signals of the Purple DBus service.
+"""
+
+import threading
+
+import dbus
+
+from logger import LoggerMixin
+from proxies import proxies
+
+BUS_NAME = 'im.pidgin.purple.PurpleService'
+OBJECT_PATH = '/im/pidgin/purple/PurpleObject'
+INTERFACE_NAME = 'im.pidgin.purple.PurpleInterface'
+
+# See PurpleConvUpdateType in libpurple/conversation.h
+CONV_UPDATE_UNSEEN = 4
+
+
+class PurpleMonitor(LoggerMixin):
+    """
+    Keeps the senders of the unread IM conversations, keyed by the
+    conversation ids, up to date by listening to the ReceivedImMsg,
+    ConversationUpdated and DeletingConversation signals.
+
+    Only the conversations which do not have focus are considered unread.
+    The monitor subscribes to the signals when the unread senders are first
+    requested, the conversations open when Pidgin appears on the bus are
+    loaded once. The signals are only delivered within the GLib main loop.
+    Listeners registered using add_listener are called whenever the unread
+    senders change.
+    """
+
+    def __init__(self):
+        self.unread = {}
+        self.listeners = []
+        self.subscribed = False
+
+        # The reporters can subscribe from the prefetching threads
+        self.lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def notify(self):
+        for callback in self.listeners:
+            callback()
+
+    @property
+    def interface(self):
+        return proxies.get(BUS_NAME, OBJECT_PATH, INTERFACE_NAME)
+
+    def subscribe(self):
+        with self.lock:
+            if self.subscribed:
+                return
+
+            try:
+                bus = proxies.session_bus()
+                for signal_name, handler in (
+                        ('ReceivedImMsg', self.received_im_msg),
+                        ('ConversationUpdated', self.conversation_updated),
+                        ('DeletingConversation', self.deleting_conversation)):
+                    bus.add_signal_receiver(handler,
+                                            signal_name=signal_name,
+                                            dbus_interface=INTERFACE_NAME,
+                                            bus_name=BUS_NAME)
+
+                # Called with the current owner right away
+                bus.watch_name_owner(BUS_NAME, self.owner_changed)
+            except dbus.exceptions.DBusException as exc:
+                self.warning("Could not subscribe to Purple signals: {0}",
+                             exc)
+                return
+
+            self.subscribed = True
+
+    def owner_changed(self, owner):
+        self.unread = {}
+
+        if owner:
+            self.load()
+
+        self.notify()
+
+    def load(self):
+        """
+        Loads the open IM conversations which are not focused, without
+        waiting for the replies.
+        """
+
+        interface = self.interface
+
+        if interface is None:
+            return
+
+        def load_conversation(conversation):
+            def name_handler(name):
+                self.unread[conversation] = name
+                self.notify()
+
+            def focus_handler(focused):
+                if not focused:
+                    interface.PurpleConversationGetName(
+                        conversation,
+                        reply_handler=name_handler,
+                        error_handler=self.error_handler)
+
+            interface.PurpleConversationHasFocus(
+                conversation,
+                reply_handler=focus_handler,
+                error_handler=self.error_handler)
+
+        def ims_handler(conversations):
+            for conversation in conversations:
+                load_conversation(conversation)
+
+        interface.PurpleGetIms(reply_handler=ims_handler,
+                               error_handler=self.error_handler)
+
+    def error_handler(self, error):
+        self.debug("Purple call failed: {0}", error)
+
+    def received_im_msg(self, account, sender, message, conversation, flags):
+        # pylint: disable=unused-argument,too-many-arguments
+        interface = self.interface
+
+        if interface is None:
+            return
+
+        # The message is seen right away in the focused conversation
+        def focus_handler(focused):
+            if not focused and self.unread.get(conversation) != sender:
+                self.unread[conversation] = sender
+                self.notify()
+
+        interface.PurpleConversationHasFocus(
+            conversation,
+            reply_handler=focus_handler,
+            error_handler=self.error_handler)
+
+    def conversation_updated(self, conversation, update_type):
+        if update_type != CONV_UPDATE_UNSEEN or conversation not in self.unread:
+            return
+
+        interface = self.interface
+
+        if interface is None:
+            return
+
+        def focus_handler(focused):
+            if focused and self.unread.pop(conversation, None) is not None:
+                self.notify()
+
+        interface.PurpleConversationHasFocus(
+            conversation,
+            reply_handler=focus_handler,
+            error_handler=self.error_handler)
+
+    def deleting_conversation(self, conversation):
+        if self.unread.pop(conversation, None) is not None:
+            self.notify()
+
+    def unread_senders(self):
+        """
+        Returns the list of the senders of the unread IM conversations.
+        """
+
+        self.subscribe()
+        return list(self.unread.values())
+
+
+# Shared by the messages reporter and the main loop
+monitor = PurpleMonitor()
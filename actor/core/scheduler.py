@@ -0,0 +1,141 @@
+"""
+Provides the scheduler that decides which rules and trackers need to be
+evaluated in a particular checking round.
+"""
+
+import threading
+import time
+
+from config import config
+from logger import LoggerMixin
+from timeline import index as schedule_index
+
+
+class Scheduler(LoggerMixin):
+    """
+    Keeps track of the point in time when each of the scheduled plugins
+    should be evaluated next.
+
+    Each plugin declares its cadence using the following attributes:
+
+      * run_interval: Number of seconds between two evaluations of the
+                      plugin. If None, config.CHECK_INTERVAL is used.
+      * sources: Identifiers of the data sources (reporters, or fixers such
+                 as the prompts) the plugin depends on. Whenever a source
+                 signals a change using the wakeup method, all the dependent
+                 plugins are evaluated immediately, regardless of their
+                 interval. The sources which are reporters are also
+                 prefetched before the plugin is evaluated.
+
+    All the plugins are also evaluated as soon as any of the time windows
+    of the rules (see timeline.ScheduleIndex) starts or ends.
+    """
+
+    def __init__(self):
+        self.plugins = []
+        self.next_run = {}
+        self.listeners = []
+        self.last_due = None
+
+        # Wakeups can be requested from other threads
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def interval(plugin):
+        return getattr(plugin, 'run_interval', None) or config.CHECK_INTERVAL
+
+    def add(self, plugin):
+        """
+        Registers the plugin with the scheduler. The plugin is due
+        immediately.
+        """
+
+        with self.lock:
+            self.plugins.append(plugin)
+            self.next_run[plugin] = 0
+
+    def add_listener(self, callback):
+        """
+        Registers a callback that is called (without arguments) whenever
+        a wakeup is requested.
+        """
+
+        self.listeners.append(callback)
+
+    def wakeup(self, *sources):
+        """
+        Marks all the plugins depending on any of the given sources as due.
+        Returns True if any plugin was affected.
+
+        This method is thread-safe.
+        """
+
+        sources = set(sources)
+
+        with self.lock:
+            woken = [plugin for plugin in self.plugins
+                     if sources.intersection(getattr(plugin, 'sources', tuple()))]
+
+            for plugin in woken:
+                self.next_run[plugin] = 0
+
+        if woken:
+            self.debug("Sources {0} woke up {1} plugin(s)",
+                       ', '.join(sorted(sources)), len(woken))
+            self.notify()
+
+        return bool(woken)
+
+    def notify(self):
+        """
+        Requests a new checking round as soon as possible, i.e. because
+        the current activity or flow has changed.
+        """
+
+        for callback in self.listeners:
+            callback()
+
+    def due(self, now=None):
+        """
+        Returns the list of the plugins that should be evaluated now, in the
+        order they were registered, and schedules their next evaluation.
+        """
+
+        now = now or time.time()
+
+        # Evaluate everything if a time window started or ended meanwhile
+        boundary = (schedule_index.next_boundary(self.last_due)
+                    if self.last_due is not None else None)
+        crossed = boundary is not None and boundary <= now
+
+        with self.lock:
+            self.last_due = now
+            due_plugins = [plugin for plugin in self.plugins
+                           if crossed or self.next_run[plugin] <= now]
+
+            for plugin in due_plugins:
+                self.next_run[plugin] = now + self.interval(plugin)
+
+        return due_plugins
+
+    def timeout(self, now=None):
+        """
+        Returns the number of seconds until the next plugin is due (or the
+        next time window starts or ends), or None if there is nothing
+        scheduled.
+        """
+
+        now = now or time.time()
+
+        with self.lock:
+            if not self.next_run:
+                return None
+
+            next_run = min(self.next_run.values())
+
+        # Wake up at the start or the end of the nearest time window
+        boundary = schedule_index.next_boundary(now)
+        if boundary is not None:
+            next_run = min(next_run, boundary)
+
+        return max(0, next_run - now)
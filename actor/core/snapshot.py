@@ -0,0 +1,189 @@
+"""
+Provides a compact binary format for the snapshots of the persistent state
+of the flows and activities.
+
+Each value is encoded as a single byte tag followed by its data. Objects
+of the classes registered using register_codec are encoded as the tag of
+their codec followed by their encoded state. Other objects are pickled.
+"""
+
+import base64
+import datetime
+import pickle
+import struct
+
+# Snapshots are stored as strings, this prefix tells them apart from the
+# JSON encoded state stored by the previous versions
+PREFIX = 'snapshot|'
+
+VERSION = 1
+
+LENGTH = struct.Struct('>I')
+INTEGER = struct.Struct('>q')
+FLOAT = struct.Struct('>d')
+DATETIME = struct.Struct('>HBBBBBI')
+
+# Codecs of the registered classes, keyed by the class and by the tag
+codecs = {}
+codecs_by_tag = {}
+
+
+def register_codec(cls, tag, encode, decode):
+    """
+    Registers the codec of the given class. The encode function returns the
+    state of the object as an encodable value, the decode function creates
+    the object out of the state. The tag identifies the class in the
+    snapshots and must not change.
+    """
+
+    if tag in codecs_by_tag and codecs_by_tag[tag][0] is not cls:
+        raise ValueError("Snapshot codec tag {0} is already used by {1}"
+                         .format(tag, codecs_by_tag[tag][0].__name__))
+
+    codecs[cls] = (tag, encode)
+    codecs_by_tag[tag] = (cls, decode)
+
+
+def encode_value(value, chunks):
+    # pylint: disable=too-many-branches,unidiomatic-typecheck
+    if value is None:
+        chunks.append('N')
+    elif value is True:
+        chunks.append('T')
+    elif value is False:
+        chunks.append('F')
+    elif type(value) in (int, long) and -2**63 <= value < 2**63:
+        chunks.extend(['i', INTEGER.pack(value)])
+    elif type(value) is float:
+        chunks.extend(['f', FLOAT.pack(value)])
+    elif type(value) in (str, unicode):
+        data = value if type(value) is str else value.encode('utf-8')
+        chunks.extend(['s' if type(value) is str else 'u',
+                       LENGTH.pack(len(data)), data])
+    elif type(value) in (list, tuple):
+        chunks.extend(['l' if type(value) is list else 't',
+                       LENGTH.pack(len(value))])
+        for item in value:
+            encode_value(item, chunks)
+    elif type(value) is dict:
+        chunks.extend(['d', LENGTH.pack(len(value))])
+        for key in sorted(value):
+            encode_value(key, chunks)
+            encode_value(value[key], chunks)
+    elif type(value) is datetime.datetime and value.tzinfo is None:
+        chunks.extend(['D', DATETIME.pack(
+            value.year, value.month, value.day, value.hour, value.minute,
+            value.second, value.microsecond)])
+    elif type(value) is datetime.timedelta:
+        chunks.extend(['R', INTEGER.pack(value.days),
+                       INTEGER.pack(value.seconds * 10**6 +
+                                    value.microseconds)])
+    elif type(value) in codecs:
+        tag, encode = codecs[type(value)]
+        chunks.extend(['c', tag])
+        encode_value(encode(value), chunks)
+    else:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        chunks.extend(['P', LENGTH.pack(len(data)), data])
+
+
+def decode_value(data, offset):
+    """
+    Decodes the value starting at the given offset. Returns the value and
+    the offset of the next one.
+    """
+
+    # pylint: disable=too-many-return-statements,too-many-branches
+    tag = data[offset]
+    offset += 1
+
+    if tag == 'N':
+        return None, offset
+    elif tag == 'T':
+        return True, offset
+    elif tag == 'F':
+        return False, offset
+    elif tag == 'i':
+        return INTEGER.unpack_from(data, offset)[0], offset + INTEGER.size
+    elif tag == 'f':
+        return FLOAT.unpack_from(data, offset)[0], offset + FLOAT.size
+    elif tag in ('s', 'u', 'P'):
+        length = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        value = data[offset:offset + length]
+        if tag == 'u':
+            value = value.decode('utf-8')
+        elif tag == 'P':
+            value = pickle.loads(value)
+        return value, offset + length
+    elif tag in ('l', 't'):
+        length = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        items = []
+        for _ in range(length):
+            item, offset = decode_value(data, offset)
+            items.append(item)
+        return (items if tag == 'l' else tuple(items)), offset
+    elif tag == 'd':
+        length = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        result = {}
+        for _ in range(length):
+            key, offset = decode_value(data, offset)
+            result[key], offset = decode_value(data, offset)
+        return result, offset
+    elif tag == 'D':
+        fields = DATETIME.unpack_from(data, offset)
+        return datetime.datetime(*fields), offset + DATETIME.size
+    elif tag == 'R':
+        days, microseconds = struct.unpack_from('>qq', data, offset)
+        value = datetime.timedelta(days=days, microseconds=microseconds)
+        return value, offset + 2 * INTEGER.size
+    elif tag == 'c':
+        if data[offset] not in codecs_by_tag:
+            raise ValueError("Unknown snapshot codec: {0!r}"
+                             .format(data[offset]))
+
+        cls, decode = codecs_by_tag[data[offset]]
+        state, offset = decode_value(data, offset + 1)
+        return decode(state), offset
+
+    raise ValueError("Unknown snapshot tag: {0!r}".format(tag))
+
+
+def dumps(value):
+    """
+    Encodes the value into a snapshot string.
+    """
+
+    chunks = [chr(VERSION)]
+    encode_value(value, chunks)
+    return PREFIX + base64.b64encode(''.join(chunks))
+
+
+def loads(snapshot):
+    """
+    Decodes the snapshot string created by dumps. Raises ValueError if the
+    snapshot is corrupted, or was created by an unsupported version.
+    """
+
+    try:
+        data = base64.b64decode(snapshot[len(PREFIX):])
+    except TypeError as exc:
+        raise ValueError("Corrupted snapshot: {0}".format(exc))
+
+    version = ord(data[0]) if data else None
+
+    if version != VERSION:
+        raise ValueError("Unsupported snapshot version: {0}".format(version))
+
+    # Truncated data, or pickled objects of the classes which no longer exist
+    try:
+        return decode_value(data, 1)[0]
+    except (IndexError, struct.error, pickle.UnpicklingError, EOFError,
+            AttributeError, ImportError) as exc:
+        raise ValueError("Corrupted snapshot: {0}".format(exc))
+
+
+def is_snapshot(data):
+    return isinstance(data, basestring) and data.startswith(PREFIX)
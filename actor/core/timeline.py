@@ -0,0 +1,138 @@
+"""
+Provides the index of the daily time windows the rules are scheduled by.
+"""
+
+import bisect
+import datetime
+import threading
+import time
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def seconds_of_day(value):
+    """
+    Converts the time of day (datetime.time or datetime.datetime object, or
+    string of '%H.%M' form) to the number of seconds since midnight.
+    """
+
+    if isinstance(value, basestring):
+        value = datetime.datetime.strptime(value, '%H.%M').time()
+
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def window_contains(window, seconds):
+    """
+    Returns True if the window contains the given second of the day. The
+    windows are start inclusive, end exclusive, windows with the start
+    later than the end extend over the midnight.
+    """
+
+    start, end = window
+
+    if start <= end:
+        return start <= seconds < end
+    else:
+        return seconds >= start or seconds < end
+
+
+class ScheduleIndex(object):
+    """
+    Keeps the time windows registered by the rules, parsed into the seconds
+    of the day. The day is split at the boundaries of the windows into the
+    segments, each having a fixed set of the windows containing it, hence
+    the windows containing the particular moment are looked up using a
+    binary search.
+    """
+
+    def __init__(self):
+        self.windows = {}       # (start, end) as given -> (start, end) in seconds
+        self.edges = []         # Sorted start and end points of the windows
+        self.boundaries = [0]   # Edges, with the midnight
+        self.segments = [frozenset()]
+
+        # Checkers are evaluated from the prefetching threads
+        self.lock = threading.Lock()
+
+    def register(self, start, end):
+        """
+        Registers the window and returns its parsed form. The windows are
+        parsed only once.
+        """
+
+        key = (start, end)
+        window = self.windows.get(key)
+
+        if window is None:
+            window = (seconds_of_day(start), seconds_of_day(end))
+
+            with self.lock:
+                self.windows[key] = window
+                self.rebuild()
+
+        return window
+
+    def rebuild(self):
+        windows = set(self.windows.values())
+
+        self.edges = sorted(set(point for window in windows
+                                for point in window))
+        boundaries = sorted(set([0] + self.edges))
+
+        # The set of windows only changes at the boundaries
+        self.segments = [
+            frozenset(window for window in windows
+                      if window_contains(window, boundary))
+            for boundary in boundaries
+        ]
+        self.boundaries = boundaries
+
+    def active(self, seconds):
+        """
+        Returns the set of the (parsed) windows containing the given second
+        of the day.
+        """
+
+        with self.lock:
+            index = bisect.bisect_right(self.boundaries, seconds) - 1
+            return self.segments[index]
+
+    def contains(self, start, end, moment):
+        """
+        Returns True if the window contains the moment (datetime.datetime
+        object).
+        """
+
+        window = self.register(start, end)
+        return window in self.active(seconds_of_day(moment))
+
+    def next_boundary(self, now=None):
+        """
+        Returns the timestamp of the nearest edge of any window after the
+        given timestamp, or None if there are no windows.
+        """
+
+        now = now or time.time()
+        current = datetime.datetime.fromtimestamp(now)
+        seconds = seconds_of_day(current)
+
+        with self.lock:
+            if not self.edges:
+                return None
+
+            index = bisect.bisect_right(self.edges, seconds)
+
+            if index < len(self.edges):
+                offset = self.edges[index]
+            else:
+                offset = self.edges[0] + SECONDS_PER_DAY
+
+        midnight = datetime.datetime.combine(current.date(), datetime.time())
+        boundary = midnight + datetime.timedelta(seconds=offset)
+
+        return time.mktime(boundary.timetuple())
+
+
+# Shared by the time interval checkers and the scheduler
+index = ScheduleIndex()
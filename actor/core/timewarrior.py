@@ -0,0 +1,206 @@
+"""
+Provides the state of Timewarrior, read directly from its data files.
+"""
+
+import datetime
+import glob
+import os
+import shlex
+import threading
+
+from config import config
+from logger import LoggerMixin
+from watch import watcher
+
+TIME_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def data_directory():
+    """
+    Returns the directory of the Timewarrior data files, see the TIMEWARRIORDB
+    environment variable and the timew(1) manpage.
+    """
+
+    if config.TIMEWARRIOR_DATA_DIR is not None:
+        return config.TIMEWARRIOR_DATA_DIR
+
+    if 'TIMEWARRIORDB' in os.environ:
+        return os.path.join(os.environ['TIMEWARRIORDB'], 'data')
+
+    legacy = os.path.join(config.HOME_DIR, '.timewarrior', 'data')
+    if os.path.isdir(legacy):
+        return legacy
+
+    return os.path.join(config.HOME_DIR, '.local', 'share', 'timewarrior',
+                        'data')
+
+
+def quote(tag):
+    return '"{0}"'.format(tag) if ' ' in tag else tag
+
+
+def parse_interval(line):
+    """
+    Parses the interval line of a data file, i.e.
+
+        inc 20170101T100000Z - 20170101T110000Z # tag "other tag"
+
+    Returns the start, the end (None for an open interval) and the tags, or
+    None if the line is not an interval.
+    """
+
+    tokens = shlex.split(line)
+
+    if len(tokens) < 2 or tokens[0] != 'inc':
+        return None
+
+    start = datetime.datetime.strptime(tokens[1], TIME_FORMAT)
+    end = None
+    tags = ()
+
+    rest = tokens[2:]
+
+    if len(rest) >= 2 and rest[0] == '-':
+        end = datetime.datetime.strptime(rest[1], TIME_FORMAT)
+        rest = rest[2:]
+
+    if rest and rest[0] == '#':
+        # The tags may be followed by the annotation
+        rest = rest[1:]
+        tags = tuple(rest[:rest.index('#')] if '#' in rest else rest)
+
+    return start, end, tags
+
+
+class TimewarriorData(LoggerMixin):
+    """
+    Keeps the latest interval tracked by Timewarrior. The intervals are kept
+    sorted in the data files (one per month), hence only the tail of the
+    latest data file is read. The file is read again only when it changes
+    (see watch.FileWatcher), starting from the last line read before, since
+    stopping the tracking rewrites it.
+    """
+
+    def __init__(self):
+        self.directory_signature = None
+        self.path = None
+        self.signature = None
+
+        self.inode = None
+        self.size = 0
+        self.line_offset = 0
+        self.interval = None
+
+        # Reporters are evaluated from the prefetching threads
+        self.lock = threading.RLock()
+
+    def refresh(self):
+        directory = data_directory()
+        directory_signature = watcher.signature(directory, directory=True)
+
+        if directory_signature != self.directory_signature:
+            self.directory_signature = directory_signature
+            paths = sorted(glob.glob(os.path.join(directory, '*.data')))
+            path = paths[-1] if paths else None
+
+            if path != self.path:
+                self.path = path
+                self.signature = None
+                self.inode = None
+                self.interval = None
+
+        if self.path is None:
+            return
+
+        signature = watcher.signature(self.path)
+
+        if signature != self.signature:
+            self.signature = signature
+            self.tail()
+
+    def tail(self):
+        """
+        Reads the lines of the data file appended or rewritten since it
+        was last read.
+        """
+
+        try:
+            with open(self.path, 'r') as fil:
+                stat = os.fstat(fil.fileno())
+
+                # The file was replaced or shrunk (i.e. the last interval was
+                # cancelled), read it again
+                if stat.st_ino != self.inode or stat.st_size < self.size:
+                    self.inode = stat.st_ino
+                    self.line_offset = 0
+                    self.interval = None
+
+                self.size = stat.st_size
+
+                fil.seek(self.line_offset)
+                data = fil.read()
+        except IOError as exc:
+            self.warning("Could not read {0}: {1}", self.path, exc)
+            self.interval = None
+            return
+
+        offset = self.line_offset
+
+        for line in data.splitlines(True):
+            # Ignore the incomplete line that is just being written
+            if not line.endswith('\n'):
+                break
+
+            try:
+                interval = parse_interval(line)
+            except ValueError as exc:
+                self.warning("Could not parse {0}: {1}", line.strip(), exc)
+                interval = None
+
+            if interval is not None:
+                self.interval = interval
+                self.line_offset = offset
+
+            offset += len(line)
+
+    def current_interval(self):
+        """
+        Returns the open interval, or None if nothing is tracked.
+        """
+
+        with self.lock:
+            self.refresh()
+
+            if self.interval is None or self.interval[1] is not None:
+                return None
+
+            return self.interval
+
+    def activity(self):
+        """
+        Returns the tags of the tracked interval, as printed by timew.
+        """
+
+        interval = self.current_interval()
+
+        if interval is None:
+            return None
+
+        return ' '.join(quote(tag) for tag in interval[2])
+
+    def duration(self):
+        """
+        Returns the duration (in whole minutes) of the tracked interval.
+        """
+
+        interval = self.current_interval()
+
+        if interval is None:
+            return None
+
+        elapsed = datetime.datetime.utcnow() - interval[0]
+        return int(elapsed.total_seconds() // 60)
+
+
+# Shared by the Timewarrior reporters and fixers
+data = TimewarriorData()
@@ -0,0 +1,300 @@
+"""
+Provides a client for the tmux control mode, which keeps a single tmux
+connection open and maintains a model of the tmux sessions, windows and
+panes.
+"""
+
+import collections
+import Queue
+import subprocess
+import threading
+import time
+
+try:
+    import gobject
+except ImportError:
+    gobject = None
+
+from config import config
+from logger import LoggerMixin
+from util import run
+
+
+# Name of the hidden session the control client is attached to
+CONTROL_SESSION = 'actor-control'
+
+# One line per pane, describing its session and window too
+PANE_FORMAT = '\t'.join([
+    '#{session_attached}', '#{session_name}',
+    '#{window_active}', '#{window_name}',
+    '#{pane_active}', '#{pane_pid}', '#{pane_id}',
+])
+
+Pane = collections.namedtuple('Pane', [
+    'session_attached', 'session_name',
+    'window_active', 'window_name',
+    'pane_active', 'pane_pid', 'pane_id',
+])
+
+# Notifications that do not change the structure of sessions/windows/panes
+IGNORED_NOTIFICATIONS = ('%output', '%extended-output', '%begin', '%end',
+                         '%error')
+
+
+class TmuxError(Exception):
+    """
+    Raised when a tmux command sent over the control connection fails.
+    """
+    pass
+
+
+class TmuxControlClient(LoggerMixin):
+    """
+    Keeps a 'tmux -C' control mode client running, attached to its own
+    hidden session. Commands are sent over its standard input, so that no
+    tmux process needs to be spawned per query.
+
+    The pane model is refreshed (using a single list-panes command) only
+    after tmux notified us about a change, or after TMUX_MODEL_MAX_AGE
+    seconds, since not all changes (i.e. client attaching) are notified.
+
+    The listeners registered using add_listener are called from the GLib
+    main loop, not from the thread reading the notifications.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.replies = Queue.Queue()
+        self.listeners = []
+
+        self.panes = []
+        self.dirty = True
+        self.refreshed = 0
+        self.last_attempt = 0
+
+        # Whether the listeners are already scheduled to be called
+        self.notify_pending = False
+
+        # Serializes the commands sent over the connection
+        self.lock = threading.RLock()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    @property
+    def connected(self):
+        return self.process is not None and self.process.poll() is None
+
+    def connect(self):
+        """
+        Spawns the control mode client, if the tmux server is running. Does
+        not start the tmux server if it is not running.
+        """
+
+        # Do not retry too often if the tmux server is not running
+        if time.time() - self.last_attempt < config.TMUX_RECONNECT_INTERVAL:
+            return False
+
+        self.last_attempt = time.time()
+
+        try:
+            if run(['tmux', 'has-session'])[2] != 0:
+                return False
+
+            self.process = subprocess.Popen(
+                ['tmux', '-C', 'new-session', '-A', '-s', CONTROL_SESSION,
+                 'cat'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as exc:
+            self.warning("Could not start tmux control client: {0}", exc)
+            return False
+
+        self.replies = Queue.Queue()
+        reader = threading.Thread(target=self.read,
+                                  args=(self.process, self.replies))
+        reader.daemon = True
+        reader.start()
+
+        try:
+            # The initial reply belongs to the new-session command
+            self.wait_for_reply()
+
+            # Clean up the session when we disconnect
+            self.command('set-option -t {0} destroy-unattached on'
+                         .format(CONTROL_SESSION))
+        except TmuxError as exc:
+            self.warning("Could not set up tmux control client: {0}", exc)
+            self.disconnect()
+            return False
+
+        self.dirty = True
+        return True
+
+    def disconnect(self):
+        if self.connected:
+            self.process.terminate()
+
+        self.process = None
+        self.dirty = True
+
+    def read(self, process, replies):
+        """
+        Parses the output of the control client. Command replies are passed
+        to the waiting command through the replies queue of the connection,
+        notifications mark the model as dirty. Runs in a separate thread.
+        """
+
+        block = None
+
+        for line in iter(process.stdout.readline, ''):
+            line = line.rstrip('\n')
+
+            if line.startswith('%begin'):
+                block = []
+            elif block is not None and line.startswith(('%end', '%error')):
+                replies.put((line.startswith('%end'), block))
+                block = None
+            elif block is not None:
+                block.append(line)
+            elif not line.startswith(IGNORED_NOTIFICATIONS):
+                self.debug("Notification: {0}", line)
+                self.dirty = True
+                self.schedule_notify()
+
+        # The connection was closed, wake up anyone waiting for a reply
+        replies.put((False, ['tmux control client exited']))
+        self.dirty = True
+
+    def schedule_notify(self):
+        """
+        Schedules the listeners to be called from the main loop. A burst of
+        notifications is reported only once.
+        """
+
+        if gobject is None or self.notify_pending:
+            return
+
+        self.notify_pending = True
+        gobject.idle_add(self.notify)
+
+    def notify(self):
+        self.notify_pending = False
+
+        for callback in self.listeners:
+            callback()
+
+        # Do not repeat the idle callback
+        return False
+
+    def wait_for_reply(self):
+        try:
+            success, lines = self.replies.get(timeout=config.TMUX_TIMEOUT)
+        except Queue.Empty:
+            self.disconnect()
+            raise TmuxError("tmux did not reply in time")
+
+        if not success:
+            raise TmuxError('\n'.join(lines))
+
+        return lines
+
+    def command(self, command):
+        """
+        Sends the command over the control connection and returns the lines
+        of its output. Raises TmuxError if the command failed.
+        """
+
+        with self.lock:
+            if not self.connected and not self.connect():
+                raise TmuxError("tmux server is not running")
+
+            try:
+                self.process.stdin.write(command + '\n')
+                self.process.stdin.flush()
+            except IOError as exc:
+                self.disconnect()
+                raise TmuxError(str(exc))
+
+            return self.wait_for_reply()
+
+    def refresh(self):
+        """
+        Reloads the pane model from tmux, if needed.
+        """
+
+        with self.lock:
+            stale = time.time() - self.refreshed > config.TMUX_MODEL_MAX_AGE
+
+            if not (self.dirty or stale or not self.connected):
+                return
+
+            # Cleared before the command, so that changes notified while it
+            # is processed are not lost
+            self.dirty = False
+
+            try:
+                lines = self.command("list-panes -a -F '{0}'"
+                                     .format(PANE_FORMAT))
+            except TmuxError as exc:
+                self.debug("Could not list tmux panes: {0}", exc)
+                self.panes = []
+                self.dirty = True
+                return
+
+            panes = []
+
+            for line in lines:
+                fields = line.split('\t')
+                if len(fields) != len(Pane._fields):
+                    continue
+
+                pane = Pane(*fields)
+
+                if pane.session_name != CONTROL_SESSION:
+                    panes.append(pane._replace(
+                        session_attached=int(pane.session_attached),
+                        window_active=pane.window_active == '1',
+                        pane_active=pane.pane_active == '1',
+                        pane_pid=int(pane.pane_pid),
+                    ))
+
+            self.panes = panes
+            self.refreshed = time.time()
+
+    def active_panes(self):
+        """
+        Returns the list of the active panes in the active windows of the
+        attached sessions.
+        """
+
+        self.refresh()
+
+        return [pane for pane in self.panes
+                if pane.session_attached and pane.window_active and
+                pane.pane_active]
+
+    def active_sessions(self):
+        """
+        Returns the list of the names of the attached sessions.
+        """
+
+        return [pane.session_name for pane in self.active_panes()]
+
+    def active_windows(self):
+        """
+        Returns the list of the names of the active windows of the attached
+        sessions.
+        """
+
+        return [pane.window_name for pane in self.active_panes()]
+
+    def kill_pane(self, pane_id):
+        self.command('kill-pane -t {0}'.format(pane_id))
+        self.dirty = True
+
+
+# Shared among all the tmux plugins
+client = TmuxControlClient()
@@ -15,6 +15,11 @@ class Tracker(Plugin):
     availability = None
     message = None
 
+    # Trackers need to be checked only occasionally, the answers to the
+    # prompts wake them up (see Scheduler)
+    run_interval = 30
+    sources = ('prompt',)
+
     def __init__(self, *args, **kwargs):
         super(Tracker, self).__init__(*args, **kwargs)
 
@@ -73,6 +78,7 @@ class BoolTracker(Tracker):
     """
 
     noplugin = True
+    sources = ('prompt_yesno',)
 
     def __init__(self, *args, **kwargs):
         super(BoolTracker, self).__init__(*args, **kwargs)
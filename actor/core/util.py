@@ -2,8 +2,12 @@ import datetime
 import dbus
 import json
 import pickle
+import re
 import subprocess
 import sys
+import time
+
+import snapshot
 
 
 def json_encode(data):
@@ -93,6 +97,15 @@ class Periodic(object):
     def start_new_interval(self):
         self.last_execution = datetime.datetime.now()
 
+    def snapshot(self):
+        return (self.period, self.last_execution, self.automatic)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        periodic = cls.__new__(cls)
+        periodic.period, periodic.last_execution, periodic.automatic = state
+        return periodic
+
 
 class Expiration(object):
     """
@@ -139,6 +152,48 @@ class Expiration(object):
     def duration(self):
         return self.interval.total_seconds()
 
+    def snapshot(self):
+        return (self.interval, self.expiration_point, self.expiration_notified)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        expiration = cls.__new__(cls)
+        (expiration.interval, expiration.expiration_point,
+         expiration.expiration_notified) = state
+        return expiration
+
+
+snapshot.register_codec(Periodic, 'P', Periodic.snapshot,
+                        Periodic.from_snapshot)
+snapshot.register_codec(Expiration, 'E', Expiration.snapshot,
+                        Expiration.from_snapshot)
+
+
+class SubstringMatcher(object):
+    """
+    Checks whether a string contains any of the given substrings, using a
+    single compiled regular expression instead of testing the substrings
+    one by one.
+    """
+
+    def __init__(self, substrings):
+        substrings = set(substrings)
+
+        # An empty substring is contained in every string
+        self.matches_all = '' in substrings
+
+        # Longer alternatives first, so that the match itself is the most
+        # specific one
+        alternatives = sorted(substrings - set(['']), key=len, reverse=True)
+        self.regex = (re.compile('|'.join(re.escape(s) for s in alternatives))
+                      if alternatives else None)
+
+    def __call__(self, string):
+        if self.matches_all:
+            return True
+
+        return self.regex is not None and self.regex.search(string) is not None
+
 
 def run(args):
     child = subprocess.Popen(
@@ -173,6 +228,33 @@ def convert_timestamp(timestamp):
         return datetime.datetime.combine(datetime.date.today(), timestamp)
 
 
+def expiration_timestamp(freshness, now=None):
+    """
+    Returns the timestamp until which a value of given freshness stays
+    valid. Freshness is either number of seconds, or one of 'minute', 'hour'
+    and 'day', in which case the value expires at the next boundary.
+    """
+
+    now = now or time.time()
+    current = datetime.datetime.fromtimestamp(now)
+
+    if freshness == 'minute':
+        boundary = (current.replace(second=0, microsecond=0) +
+                    datetime.timedelta(minutes=1))
+    elif freshness == 'hour':
+        boundary = (current.replace(minute=0, second=0, microsecond=0) +
+                    datetime.timedelta(hours=1))
+    elif freshness == 'day':
+        boundary = datetime.datetime.combine(
+            current.date() + datetime.timedelta(days=1),
+            datetime.time()
+        )
+    else:
+        return now + freshness
+
+    return time.mktime(boundary.timetuple())
+
+
 def extract_dbus_exception_error(exception):
     exception_type = exception.get_dbus_name().split('.')[-1]
     error_lines = [l for l in exception.message.splitlines()
@@ -0,0 +1,229 @@
+"""
+Provides a watcher of the changes of files and directories, based on
+inotify (using ctypes). If inotify is not available, the changes are
+detected by comparing the stat signatures of the files.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import errno
+import itertools
+import os
+import struct
+import threading
+
+from logger import LoggerMixin
+
+# See inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# The files are watched through their directories, so that the files which
+# are replaced (i.e. rotated or saved by renaming) are still watched
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+              IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT = struct.Struct('iIII')
+
+# Pseudo filesystems, whose files change without any inotify events (and
+# mostly without any change of their stat signatures)
+VOLATILE_PREFIXES = ('/proc/', '/sys/')
+
+
+def load_inotify():
+    """
+    Returns the libc with the inotify functions, or None if not available.
+    """
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                           ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+
+    return libc
+
+
+def stat_signature(path):
+    """
+    Returns the signature of the file, which changes whenever the file is
+    modified or replaced, or None if the file does not exist.
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+
+class FileWatcher(LoggerMixin):
+    """
+    Provides the signatures of the files and directories, which change
+    whenever the file (or any file in the directory) changes.
+
+    With inotify, the signature is a counter of the events concerning the
+    path, hence checking any number of paths costs a single read of the
+    (non-blocking) inotify file descriptor. The paths whose directory
+    cannot be watched fall back to the stat signatures. The files of the
+    pseudo filesystems (see VOLATILE_PREFIXES) get a new signature every
+    time, as their changes cannot be detected.
+    """
+
+    def __init__(self):
+        self.fd = None
+        self.libc = None
+        self.initialized = False
+
+        # Watch descriptor -> directories, more paths can lead to the same
+        # directory through the symlinks
+        self.watches = collections.defaultdict(set)
+        self.directories = {}  # Directory -> watch descriptor
+        self.versions = collections.defaultdict(int)
+        self.volatile = itertools.count()
+
+        # Signatures are requested from the prefetching threads
+        self.lock = threading.RLock()
+
+    def initialize(self):
+        self.initialized = True
+        self.libc = load_inotify()
+
+        if self.libc is None:
+            self.info("inotify is not available, files will be polled.")
+            return
+
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if fd < 0:
+            self.warning("Could not initialize inotify: {0}",
+                         os.strerror(ctypes.get_errno()))
+            return
+
+        self.fd = fd
+
+    def watch_directory(self, directory):
+        """
+        Watches the given directory. Returns False if it cannot be watched.
+        """
+
+        if directory in self.directories:
+            return True
+
+        if self.fd is None:
+            return False
+
+        wd = self.libc.inotify_add_watch(self.fd, directory, WATCH_MASK)
+
+        if wd < 0:
+            # Most likely the directory does not exist (yet)
+            return False
+
+        self.watches[wd].add(directory)
+        self.directories[directory] = wd
+        return True
+
+    def process_events(self):
+        """
+        Reads the pending inotify events and bumps the versions of the
+        affected paths.
+        """
+
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                if exc.errno != errno.EAGAIN:
+                    self.warning("Could not read inotify events: {0}", exc)
+                return
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = data[offset:offset + length].rstrip('\0')
+                offset += length
+
+                self.handle_event(wd, mask, name)
+
+    def handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost, consider everything changed
+            for path in self.versions:
+                self.versions[path] += 1
+            return
+
+        directories = self.watches.get(wd, ())
+
+        for directory in directories:
+            self.versions[directory] += 1
+            if name:
+                self.versions[os.path.join(directory, name)] += 1
+
+        if mask & IN_IGNORED and directories:
+            # The directory was removed, it will be watched again once it
+            # is created
+            for directory in self.watches.pop(wd):
+                del self.directories[directory]
+
+    def signature(self, path, directory=False):
+        """
+        Returns the signature of the given file (or directory, if directory
+        is set). The signature should be requested before reading the file,
+        so that no change is missed.
+
+        The symlinks are followed, the directory of the target is watched
+        for the changes of the file, and the directory of the link for the
+        link being replaced.
+        """
+
+        path = os.path.abspath(path)
+        real = os.path.realpath(path)
+
+        if real.startswith(VOLATILE_PREFIXES):
+            return ('volatile', next(self.volatile))
+
+        paths = (real,) if real == path else (real, path)
+
+        with self.lock:
+            if not self.initialized:
+                self.initialize()
+
+            watched = [each if directory else os.path.dirname(each)
+                       for each in paths]
+
+            if not all(self.watch_directory(each) for each in watched):
+                return stat_signature(real)
+
+            self.process_events()
+
+            # The watch could have been dropped while processing the events
+            if not all(each in self.directories for each in watched):
+                return stat_signature(real)
+
+            return ('inotify',) + tuple(self.versions[each] for each in paths)
+
+
+# Shared by the reporters watching files
+watcher = FileWatcher()
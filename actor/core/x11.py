@@ -0,0 +1,262 @@
+"""
+Provides a monitor of the active window, based on a persistent connection
+to the X server. Requires python-xlib, if not available, the active window
+reporters fall back to wnck.
+"""
+
+import collections
+import time
+
+try:
+    from Xlib import X, error, display
+except ImportError:
+    X = None
+
+from config import config
+from logger import LoggerMixin
+
+
+WindowSnapshot = collections.namedtuple(
+    'WindowSnapshot', ['window_id', 'name', 'pid', 'process_name']
+)
+
+
+def process_name(pid):
+    """
+    Returns the command line of the process with the given pid, using
+    /proc/<pid>/cmdline with fallback to /proc/<pid>/comm. Returns None if
+    the process does not exist.
+    """
+
+    for path in ('/proc/%d/cmdline', '/proc/%d/comm'):
+        try:
+            with open(path % pid, 'r') as fil:
+                return fil.read().strip()
+        except IOError:
+            pass
+
+
+class ActiveWindowMonitor(LoggerMixin):
+    """
+    Keeps a snapshot of the active window (its title, PID and the command of
+    its process) up to date by listening to the PropertyNotify events of the
+    root window (_NET_ACTIVE_WINDOW) and of the active window itself
+    (title changes).
+
+    The events are processed whenever the snapshot is requested, or as soon
+    as they arrive if GLib main loop is running. Listeners registered using
+    add_listener are called whenever the snapshot changes.
+
+    The attempts to connect to the X server are rate limited by
+    X11_RECONNECT_INTERVAL.
+    """
+
+    def __init__(self, display_name=None):
+        self.display_name = display_name
+        self.last_attempt = 0
+        self.display = None
+        self.root = None
+        self.atoms = {}
+        self.window = None
+        self.snapshot = None
+        self.listeners = []
+        self.io_watch = None
+
+    @property
+    def available(self):
+        """
+        Returns True if the connection to the X server is established (or
+        could be established).
+        """
+
+        if X is None:
+            return False
+
+        if self.display is None:
+            self.connect()
+
+        return self.display is not None
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def connect(self):
+        # Do not retry too often if the X server is not available
+        if time.time() - self.last_attempt < config.X11_RECONNECT_INTERVAL:
+            return
+
+        self.last_attempt = time.time()
+
+        try:
+            self.display = display.Display(self.display_name)
+        except (error.DisplayError, error.ConnectionClosedError) as exc:
+            self.warning("Could not connect to the X server: {0}", exc)
+            self.display = None
+            return
+
+        self.root = self.display.screen().root
+        self.atoms = {
+            name: self.display.intern_atom(name)
+            for name in ('_NET_ACTIVE_WINDOW', '_NET_WM_NAME', '_NET_WM_PID',
+                         'UTF8_STRING', 'WM_NAME')
+        }
+
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        self.update_window()
+
+        # Process the events as soon as they arrive, if running within
+        # the GLib main loop
+        try:
+            import gobject
+            self.io_watch = gobject.io_add_watch(
+                self.display.fileno(), gobject.IO_IN, self.handle_io
+            )
+        except ImportError:
+            pass
+
+    def disconnect(self):
+        if self.io_watch is not None:
+            import gobject
+            gobject.source_remove(self.io_watch)
+
+        if self.display is not None:
+            # pylint: disable=broad-except
+            try:
+                self.display.close()
+            except Exception as exc:
+                self.debug("Could not close the display: {0}", exc)
+
+        self.display = None
+        self.window = None
+        self.snapshot = None
+        self.io_watch = None
+
+    def handle_io(self, *args):
+        # The watch is removed by returning False if we get disconnected,
+        # removing it in disconnect too would remove it twice
+        io_watch, self.io_watch = self.io_watch, None
+        self.process_events()
+
+        if self.display is None:
+            return False
+
+        self.io_watch = io_watch
+        return True
+
+    def process_events(self):
+        """
+        Processes the pending X events and updates the snapshot if needed.
+        """
+
+        changed = False
+
+        try:
+            while self.display.pending_events():
+                event = self.display.next_event()
+
+                if event.type != X.PropertyNotify:
+                    continue
+
+                if (event.window.id == self.root.id and
+                        event.atom == self.atoms['_NET_ACTIVE_WINDOW']):
+                    changed = self.update_window() or changed
+                elif (self.window is not None and
+                      event.window.id == self.window.id and
+                      event.atom in (self.atoms['_NET_WM_NAME'],
+                                     self.atoms['WM_NAME'])):
+                    changed = self.update_name() or changed
+        except error.ConnectionClosedError:
+            self.warning("Connection to the X server was closed.")
+            self.disconnect()
+            changed = True
+
+        if changed:
+            for callback in self.listeners:
+                callback()
+
+    def get_property(self, window, name, property_type=None):
+        prop = window.get_full_property(self.atoms[name],
+                                        property_type or X.AnyPropertyType)
+        return prop.value if prop is not None else None
+
+    def update_window(self):
+        """
+        Reads the active window from the root window and subscribes to its
+        property changes. Returns True if the active window changed.
+        """
+
+        value = self.get_property(self.root, '_NET_ACTIVE_WINDOW')
+        window_id = value[0] if value else 0
+
+        if self.window is not None:
+            if self.window.id == window_id:
+                return False
+
+            # We are not interested in the previous window anymore
+            try:
+                self.window.change_attributes(event_mask=X.NoEventMask)
+            except error.BadWindow:
+                pass
+
+        self.window = None
+        self.snapshot = None
+
+        if not window_id:
+            return True
+
+        window = self.display.create_resource_object('window', window_id)
+
+        try:
+            window.change_attributes(event_mask=X.PropertyChangeMask)
+            pid = self.get_property(window, '_NET_WM_PID')
+            pid = int(pid[0]) if pid else None
+            name = (self.get_property(window, '_NET_WM_NAME',
+                                      self.atoms['UTF8_STRING']) or
+                    window.get_wm_name())
+        except error.BadWindow:
+            # The window was destroyed in the meantime
+            return True
+
+        self.window = window
+        self.snapshot = WindowSnapshot(
+            window_id=window_id,
+            name=name,
+            pid=pid,
+            process_name=process_name(pid) if pid else None
+        )
+
+        return True
+
+    def update_name(self):
+        """
+        Updates the title of the active window. Returns True if it changed.
+        """
+
+        try:
+            name = (self.get_property(self.window, '_NET_WM_NAME',
+                                      self.atoms['UTF8_STRING']) or
+                    self.window.get_wm_name())
+        except error.BadWindow:
+            return self.update_window()
+
+        if self.snapshot is None or name == self.snapshot.name:
+            return False
+
+        self.snapshot = self.snapshot._replace(name=name)
+        return True
+
+    def active_window(self):
+        """
+        Returns the WindowSnapshot of the active window, or None if there is
+        no active window.
+        """
+
+        if not self.available:
+            return None
+
+        self.process_events()
+        return self.snapshot
+
+
+# Shared among all the active window reporters
+monitor = ActiveWindowMonitor()
@@ -13,4 +13,4 @@ class LockScreenFixer(DBusMixin, Fixer):
 
     def run(self):
         if self.interface and not self.interface.GetActive():
-            self.interface.Lock()
+            self.call_async('Lock')
@@ -54,4 +54,4 @@ class BaloonFixer(DBusMixin, Fixer):
 
     def run(self, message, title='Actor alert!', duration=10):
         # pylint: disable=arguments-differ
-        self.interface.ShowMessage(title, message, duration)
+        self.call_async('ShowMessage', title, message, duration)
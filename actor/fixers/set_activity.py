@@ -32,8 +32,10 @@ class SetHamsterActivityFixer(DBusMixin, Fixer):
         if current_activity is None or current_activity not in activity:
 
             # Zero stands for now
-            self.interface.StopTracking(0)
-            self.interface.AddFact(activity, 0, 0, False)
+            # The calls are queued in order, no need to wait for the replies
+            self.call_async('StopTracking', 0)
+            self.call_async('AddFact', activity, 0, 0, False)
+            self.context.reporters.invalidate('hamster_activity_daily_duration')
 
 
 class StopHamsterActivityFixer(DBusMixin, Fixer):
@@ -52,7 +54,7 @@ class StopHamsterActivityFixer(DBusMixin, Fixer):
             return
 
         # Zero stands for now
-        self.interface.StopTracking(0)
+        self.call_async('StopTracking', 0)
 
 
 class SetTimewActivityFixer(Fixer):
@@ -75,8 +77,9 @@ class SetTimewActivityFixer(Fixer):
         # We use substring search here to support setting activity
         # of the form activity@Project, description
         # since we generate only activity@Project
-        if current_activity is not activity:
+        if current_activity is None or current_activity not in activity:
             subprocess.call(['timew', 'start'] + shlex.split(activity))
+            self.context.reporters.invalidate('timew_activity_duration')
 
 
 class StopTimewActivityFixer(Fixer):
@@ -89,3 +92,4 @@ class StopTimewActivityFixer(Fixer):
     def run(self):
         # pylint: disable=arguments-differ
         subprocess.call(['timew', 'stop'])
+        self.context.reporters.invalidate('timew_activity_duration')
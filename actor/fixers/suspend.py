@@ -20,7 +20,7 @@ class SuspendFixer(DBusMixin, Fixer):
         if enforced:
             run(['sudo', 'pm-suspend'])
         else:
-            self.interface.Suspend()
+            self.call_async('Suspend')
 
 
 class SuspendUntilFixer(Fixer):
@@ -1,4 +1,5 @@
 from actor.core.plugins import Fixer
+from actor.core.tmux import client
 from actor.core.util import run
 
 
@@ -15,28 +16,11 @@ class TmuxDetachFixer(Fixer):
 
 class TmuxKillActivePaneFixer(Fixer):
     """
-    Returns a list of pids of the processes in the active panes.
+    Kills the active panes of the attached sessions.
     """
 
     identifier = 'tmux_kill_active_pane'
 
-    def get_active_panes(self):
-        active_sessions = self.report('tmux_active_sessions')
-        active_pane_ids = []
-
-        for session in active_sessions:
-            output = run(
-                ['tmux',
-                 'list-panes',
-                 '-t', session,
-                 '-F', '#{pane_active} #{pane_id}'])[0]
-
-            active_pane_ids = active_pane_ids + [line[2:]
-                                                 for line in output.splitlines()
-                                                 if line.startswith('1 ')]
-
-        return active_pane_ids
-
     def run(self):
-        for pane_id in self.get_active_panes():
-            run(['tmux', 'kill-pane', '-t', pane_id])
+        for pane in client.active_panes():
+            client.kill_pane(pane.pane_id)
@@ -1,42 +1,83 @@
-import wnck
-import gtk
 import psutil
 
+try:
+    import wnck
+    import gtk
+except ImportError:
+    wnck = None
+
 from actor.core.util import run
 from actor.core.plugins import Reporter
+from actor.core.x11 import monitor, process_name, WindowSnapshot
 
 
-class ActiveWindowNameReporter(Reporter):
+class ActiveWindowReporter(Reporter):
     """
-    Returns a string containing the title of the active window.
+    Returns the WindowSnapshot (window_id, name, pid, process_name) of the
+    active window. Serves as the common dependency of the other active window
+    reporters.
+
+    The snapshot is served from memory by the X11 active window monitor,
+    with fallback to wnck if python-xlib is not available.
 
     If no active window could be detected, returns None.
     """
 
-    identifier = 'active_window_name'
+    identifier = 'active_window'
+
+    # Neither X connection nor wnck are thread-safe
+    parallel = False
 
-    def get_active_window(self):
+    def get_active_window_using_wnck(self):
         """
-        Returns the active window object.
+        Obtains the active window using wnck bindings, if available.
         """
 
+        if wnck is None:
+            return None
+
         while gtk.events_pending():
             gtk.main_iteration()
 
         screen = wnck.screen_get_default()
         screen.force_update()
 
-        if screen:
-            return screen.get_active_window()
+        window = screen.get_active_window() if screen else None
+
+        if window:
+            return WindowSnapshot(
+                window_id=window.get_xid(),
+                name=window.get_name(),
+                pid=window.get_pid(),
+                process_name=None
+            )
+
+    def run(self):
+        if monitor.available:
+            return monitor.active_window()
+        else:
+            return self.get_active_window_using_wnck()
+
+
+class ActiveWindowNameReporter(Reporter):
+    """
+    Returns a string containing the title of the active window.
+
+    If no active window could be detected, returns None.
+    """
+
+    identifier = 'active_window_name'
+    dependencies = ('active_window',)
+    parallel = False
 
     def run(self):
-        window = self.get_active_window()
+        window = self.report('active_window')
 
         if window:
-            return window.get_name()
+            return window.name
 
 
-class ActiveWindowPidReporter(ActiveWindowNameReporter):
+class ActiveWindowPidReporter(Reporter):
     """
     Returns the PID of the process the active window belongs to.
 
@@ -44,18 +85,20 @@ class ActiveWindowPidReporter(ActiveWindowNameReporter):
     """
 
     identifier = 'active_window_pid'
+    dependencies = ('active_window',)
+    parallel = False
 
-    def get_pid_using_wnck(self):
+    def get_pid_using_snapshot(self):
         """
-        Obtains the PID of the active window using wnck bindings.
+        Obtains the PID of the active window from the active window snapshot.
 
         Returns None if active window could not be detected.
         """
 
-        window = self.get_active_window()
+        window = self.report('active_window')
 
         if window:
-            return window.get_pid()
+            return window.pid
 
     def get_pid_using_xprop(self):
         """
@@ -98,27 +141,30 @@ class ActiveWindowPidReporter(ActiveWindowNameReporter):
 
     def run(self):
         """
-        Obtains the active window PID using wnck, with fallback to xprop.
+        Obtains the active window PID from the snapshot, with fallback to
+        xprop.
         """
 
-        pid = self.get_pid_using_wnck()
+        pid = self.get_pid_using_snapshot()
 
-        if not self.verify_pid(pid):
+        # The X11 monitor reads the same property xprop would
+        if not self.verify_pid(pid) and not monitor.available:
             pid = self.get_pid_using_xprop()
 
         return pid
 
 
-class ActiveWindowProcessReporter(ActiveWindowPidReporter):
+class ActiveWindowProcessReporter(Reporter):
     """
     Returns the process belonging to the active window using the
     psutil.Process abstraction.
     """
 
     identifier = 'active_window_process'
+    dependencies = ('active_window_pid',)
 
     def run(self):
-        pid = super(ActiveWindowProcessReporter, self).run()
+        pid = self.report('active_window_pid')
 
         if pid is None:
             return None
@@ -129,7 +175,7 @@ class ActiveWindowProcessReporter(ActiveWindowPidReporter):
             return None
 
 
-class ActiveWindowProcessNameReporter(ActiveWindowPidReporter):
+class ActiveWindowProcessNameReporter(Reporter):
     """
     Returns the command name of the process the active window belongs to.
 
@@ -140,23 +186,18 @@ class ActiveWindowProcessNameReporter(ActiveWindowPidReporter):
     """
 
     identifier = 'active_window_process_name'
+    dependencies = ('active_window', 'active_window_pid')
+    parallel = False
 
     def run(self):
-        pid = super(ActiveWindowProcessNameReporter, self).run()
+        pid = self.report('active_window_pid')
 
         if pid is None:
             return None
 
-        # First try to read the cmdline
-        try:
-            with open('/proc/%d/cmdline' % pid, 'r') as fil:
-                return fil.read().strip()
-        except IOError:
-            pass
+        # The X11 monitor keeps the process name in the snapshot
+        window = self.report('active_window')
+        if window and window.pid == pid and window.process_name:
+            return window.process_name
 
-        # Fallback to comm
-        try:
-            with open('/proc/%d/comm' % pid, 'r') as fil:
-                return fil.read().strip()
-        except IOError:
-            pass
+        return process_name(pid)
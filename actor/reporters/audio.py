@@ -1,8 +1,6 @@
-import os
-
 from actor.core.plugins import Reporter
+from actor.core.headphones import jack
 
-AUDIO_CARD_PATH = '/proc/asound/card0/codec#0'
 
 class HeadphonesPluggedReporter(Reporter):
     """
@@ -14,23 +12,13 @@ class HeadphonesPluggedReporter(Reporter):
 
     identifier = 'headphones_plugged'
 
-    def run(self):
-        # pylint: disable=arguments-differ
-
-        if os.path.isfile(AUDIO_CARD_PATH):
-            with open(AUDIO_CARD_PATH, 'r') as f:
-                data = f.read()
-                # Audio output jack has Conn set to Analog
-                headphone_nodes = [node for node in data.split('Node 0x')
-                                   if 'Conn = Analog' in node]
+    def __init__(self, *args, **kwargs):
+        super(HeadphonesPluggedReporter, self).__init__(*args, **kwargs)
 
-                # If there's not only one headphone node in the data,
-                # we don't know what to report
-                if len(headphone_nodes) == 1:
-                    node = headphone_nodes[0]
+        # Shared by default, see actor.core.headphones
+        self.jack = jack
 
-                    if 'Pin-ctls: 0x00' in node:
-                        return True
+    def run(self):
+        # pylint: disable=arguments-differ
 
-                    elif 'Pin-ctls: 0x40' in node:
-                        return False
+        return self.jack.plugged()
@@ -1,13 +1,61 @@
+import collections
 import os
+import threading
 
+from actor.core.config import config
 from actor.core.plugins import Reporter
+from actor.core.watch import watcher
+
+
+class ContentCache(object):
+    """
+    Keeps the contents of up to FILE_CONTENT_CACHE_SIZE files, together
+    with their signatures (see actor.core.watch.FileWatcher), dropping the
+    least recently used ones.
+    """
+
+    def __init__(self):
+        # Path -> (signature, content)
+        self.contents = collections.OrderedDict()
+
+        # Reporters are evaluated from the prefetching threads
+        self.lock = threading.Lock()
+
+    def get(self, path, signature):
+        """
+        Returns the content of the file if it has the given signature,
+        otherwise None.
+        """
+
+        with self.lock:
+            cached = self.contents.pop(path, None)
+
+            if cached is None:
+                return None
+
+            self.contents[path] = cached
+
+        return cached[1] if cached[0] == signature else None
+
+    def set(self, path, signature, content):
+        with self.lock:
+            self.contents.pop(path, None)
+            self.contents[path] = (signature, content)
+
+            while len(self.contents) > config.FILE_CONTENT_CACHE_SIZE:
+                self.contents.popitem(last=False)
+
+
+# Shared by the file content reporters
+contents = ContentCache()
 
 
 class FileContentReporter(Reporter):
     """
     Returns the content of a given file.
 
-    Returns None if the file does not exist.
+    Returns None if the file does not exist. The file is read again only
+    when it changes.
     """
 
     identifier = 'file_content'
@@ -15,6 +63,72 @@ class FileContentReporter(Reporter):
     def run(self, path):
         # pylint: disable=arguments-differ
 
+        # Obtain the signature before reading, so that no change is missed
+        signature = watcher.signature(path)
+        content = contents.get(path, signature)
+
+        if content is not None:
+            return content
+
         if os.path.isfile(path):
             with open(path, 'r') as fil:
-                return fil.read()
+                content = fil.read()
+
+        contents.set(path, signature, content)
+        return content
+
+
+class FileNewLinesReporter(Reporter):
+    """
+    Returns the list of the lines appended to a given file since the
+    previous evaluation (of the same rule), i.e. to follow the log files.
+    The first evaluation returns no lines.
+
+    If the file is replaced (i.e. rotated) or truncated, it is followed
+    from its beginning. Incomplete lines are returned once they are
+    completed.
+    """
+
+    identifier = 'file_new_lines'
+    stateless = False
+
+    def __init__(self, *args, **kwargs):
+        super(FileNewLinesReporter, self).__init__(*args, **kwargs)
+
+        # Path -> (signature, inode, offset of the end of the last line)
+        self.positions = {}
+
+    def run(self, path):
+        # pylint: disable=arguments-differ
+
+        signature = watcher.signature(path)
+        position = self.positions.get(path)
+
+        if position is not None and position[0] == signature:
+            return []
+
+        try:
+            with open(path, 'r') as fil:
+                stat = os.fstat(fil.fileno())
+
+                if position is None:
+                    # Start following the file at its end
+                    offset = stat.st_size
+                elif position[1] != stat.st_ino or stat.st_size < position[2]:
+                    offset = 0
+                else:
+                    offset = position[2]
+
+                fil.seek(offset)
+                data = fil.read()
+        except IOError:
+            # Follow the file from its beginning once it exists
+            self.positions[path] = (signature, None, 0)
+            return []
+
+        # Keep the incomplete last line for the next evaluation
+        complete = data[:data.rfind('\n') + 1]
+        self.positions[path] = (signature, stat.st_ino,
+                                offset + len(complete))
+
+        return complete.splitlines()
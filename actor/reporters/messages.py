@@ -1,24 +1,17 @@
-from actor.core.plugins import Reporter, DBusMixin
+from actor.core.plugins import Reporter
+from actor.core.purple import monitor
 
 
-class MessagesReporter(DBusMixin, Reporter):
+class MessagesReporter(Reporter):
     """
     Returns a list of raw sender names of users you have unread
     IM messages from.
+
+    The senders are kept up to date by the Purple signals, see
+    actor.core.purple.PurpleMonitor.
     """
 
     identifier = 'messages'
 
-    bus_name = "im.pidgin.purple.PurpleService"
-    object_path = "/im/pidgin/purple/PurpleObject"
-    interface_name = "im.pidgin.purple.PurpleInterface"
-
     def run(self):
-        if not self.interface:
-            return []
-
-        messages = self.interface.PurpleGetIms()
-        names = [self.interface.PurpleConversationGetName(m)
-                 for m in messages]
-
-        return names
+        return monitor.unread_senders()
@@ -1,6 +1,114 @@
-from actor.core.plugins import Reporter
+import os
+import threading
+import time
+
+from actor.core.config import config
+from actor.core.plugins import Reporter, freeze
+from actor.core.watch import watcher
 from tasklib import TaskWarrior
 
+# Taskwarrior 2.x keeps the tasks in the .data files, 3.x in a SQLite db
+DATA_FILES = ('pending.data', 'completed.data', 'taskchampion.sqlite3')
+
+# Fields whose filters are plain equality checks, these can be evaluated
+# on a single export of all the tasks
+SIMPLE_FIELDS = ('status', 'priority')
+
+
+class TaskWarriorPool(object):
+    """
+    Keeps a TaskWarrior instance per set of options, and the results of the
+    filters. The results are reused until any of the data files of the
+    instance changes (see actor.core.watch.FileWatcher), or for at most
+    TASKWARRIOR_RESULT_MAX_AGE seconds, since the filters can depend on the
+    time (e.g. due.before:now or +OVERDUE).
+
+    The Task objects are shared by all the callers, and must not be
+    modified.
+    """
+
+    def __init__(self):
+        self.warriors = {}  # Options -> (TaskWarrior, data location)
+
+        # (options, rawfilter, taskfilter) -> (signature, timestamp, tasks)
+        self.results = {}
+
+        # Reporters are evaluated from the prefetching threads
+        self.lock = threading.RLock()
+
+    def warrior(self, options):
+        key = freeze(options)
+
+        with self.lock:
+            if key not in self.warriors:
+                warrior = TaskWarrior(**options)
+                location = (warrior.overrides.get('data.location') or
+                            warrior.config.get('data.location', '~/.task'))
+                self.warriors[key] = (warrior, os.path.expanduser(location))
+
+            return self.warriors[key]
+
+    @staticmethod
+    def signature(location):
+        return tuple(watcher.signature(os.path.join(location, filename))
+                     for filename in DATA_FILES)
+
+    def filter(self, options, rawfilter, taskfilter):
+        """
+        Returns the list of the tasks matching the filter. The list is a
+        copy, the tasks are not.
+        """
+
+        warrior, location = self.warrior(options)
+        key = (freeze(options), freeze(rawfilter), freeze(taskfilter))
+
+        # Obtain the signature before the export, so that no change is missed
+        signature = self.signature(location)
+
+        with self.lock:
+            cached = self.results.get(key)
+
+        if cached is not None and cached[0] == signature and \
+                time.time() - cached[1] < config.TASKWARRIOR_RESULT_MAX_AGE:
+            return list(cached[2])
+
+        timestamp = time.time()
+        tasks = list(warrior.tasks.filter(*rawfilter, **taskfilter))
+
+        with self.lock:
+            self.results[key] = (signature, timestamp, tasks)
+
+        return list(tasks)
+
+    def bulk_filter(self, options, taskfilters):
+        """
+        Returns the lists of the tasks matching each of the filters. The
+        filters on SIMPLE_FIELDS are evaluated on a single export.
+        """
+
+        simple = [
+            all(field in SIMPLE_FIELDS for field in taskfilter)
+            for taskfilter in taskfilters
+        ]
+
+        if simple.count(True) < 2:
+            return [self.filter(options, (), taskfilter)
+                    for taskfilter in taskfilters]
+
+        everything = self.filter(options, (), {})
+
+        return [
+            [task for task in everything
+             if all(task[field] == value
+                    for field, value in taskfilter.items())]
+            if is_simple else self.filter(options, (), taskfilter)
+            for taskfilter, is_simple in zip(taskfilters, simple)
+        ]
+
+
+# Shared by the TaskWarrior reporters
+pool = TaskWarriorPool()
+
 
 class TaskWarriorReporter(Reporter):
     """
@@ -16,7 +124,19 @@ class TaskWarriorReporter(Reporter):
         taskfilter = taskfilter or dict()
         rawfilter = rawfilter or tuple()
 
-        warrior = TaskWarrior(**warrior_options)
-        tasks = warrior.tasks.filter(*rawfilter, **taskfilter)
+        return pool.filter(warrior_options, rawfilter, taskfilter)
+
+
+class TaskWarriorBulkReporter(Reporter):
+    """
+    Returns the lists of TaskWarrior tasks matching each of the given
+    filters (dictionaries, as the taskfilter of the tasks reporter). Filters
+    on the status and priority only are evaluated on a single export.
+    """
+
+    identifier = 'tasks_bulk'
+
+    def run(self, taskfilters, warrior_options=None):
+        # pylint: disable=arguments-differ
 
-        return tasks
+        return pool.bulk_filter(warrior_options or dict(), list(taskfilters))
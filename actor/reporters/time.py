@@ -19,6 +19,7 @@ class WeekdayReporter(Reporter):
     """
 
     identifier = 'weekday'
+    freshness = 'day'
 
     def run(self):
         day = datetime.datetime.now().strftime("%w")
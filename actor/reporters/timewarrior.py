@@ -1,41 +1,26 @@
 from actor.core.plugins import Reporter
-from actor.core.util import run
+from actor.core.timewarrior import data
 
 
-class TaskWarriorReporter(Reporter):
+class TimewActivityReporter(Reporter):
     """
-    Returns TaskWarrior tasks matching the given filter.
+    Returns the activity currently tracked by Timewarrior.
     """
 
     identifier = 'timew_activity'
 
     def run(self):
-        stdout, stderr, code = run(['timew'])
-        parts = stdout.splitlines()[0].split("Tracking ")
+        return data.activity()
 
-        if len(parts) > 1:
-            return parts[1].strip()
-        else:
-            return None
 
-
-class TaskWarriorReporterDuration(Reporter):
+class TimewActivityDurationReporter(Reporter):
     """
-    Returns TaskWarrior tasks matching the given filter.
+    Returns the duration (in minutes) of the activity currently tracked by
+    Timewarrior.
     """
 
     identifier = 'timew_activity_duration'
+    freshness = 'minute'
 
     def run(self):
-        stdout, stderr, code = run(['timew'])
-        parts = stdout.splitlines()[3].split("Total ")
-
-        if len(parts) > 1:
-            segments = parts[1].strip().split(':')
-            if len(segments) > 1:
-                minutes = int(segments[1].lstrip('0') or 0)
-                hours = int(segments[0].lstrip('0') or 0)
-
-                return (hours * 60) + minutes
-
-        return None
+        return data.duration()
@@ -1,7 +1,6 @@
 from actor.core.plugins import Reporter
-from actor.core.util import run
-
-from psutil import Process
+from actor.core.proctree import index
+from actor.core.tmux import client
 
 
 class TmuxActiveSessionNameReporter(Reporter):
@@ -12,17 +11,10 @@ class TmuxActiveSessionNameReporter(Reporter):
     identifier = 'tmux_active_sessions'
 
     def run(self):
-        output = run(['tmux',
-                      'list-sessions',
-                      '-F', '#{session_attached} #{session_name}'])[0]
-
-        active_sessions = [line[2:] for line in output.splitlines()
-                           if line.startswith('1 ')]
-
-        return active_sessions
+        return client.active_sessions()
 
 
-class TmuxActiveWindowNameReporter(TmuxActiveSessionNameReporter):
+class TmuxActiveWindowNameReporter(Reporter):
     """
     Returns a list of the names of the active windows.
     """
@@ -30,56 +22,24 @@ class TmuxActiveWindowNameReporter(TmuxActiveSessionNameReporter):
     identifier = 'tmux_active_windows'
 
     def run(self):
-        active_sessions = super(TmuxActiveWindowNameReporter, self).run()
-        active_windows = []
-
-        for session in active_sessions:
-            output = run(
-                ['tmux',
-                 'list-windows',
-                 '-t', session,
-                 '-F', '#{window_active} #{window_name}'])[0]
-
-            active_windows = active_windows + [line[2:]
-                                               for line in output.splitlines()
-                                               if line.startswith('1 ')]
-
-        return active_windows
+        return client.active_windows()
 
 
-class TmuxActivePanePIDsReporter(TmuxActiveSessionNameReporter):
+class TmuxActivePanePIDsReporter(Reporter):
     """
     Returns a list of pids of the processes in the active panes.
     """
 
     identifier = 'tmux_active_panes_pids'
 
-    def get_active_panes(self):
-        active_sessions = super(TmuxActivePanePIDsReporter, self).run()
-        active_panes = []
-
-        for session in active_sessions:
-            output = run(
-                ['tmux',
-                 'list-panes',
-                 '-t', session,
-                 '-F', '#{pane_active} #{pane_pid}'])[0]
-
-            active_panes = active_panes + [int(line[2:])
-                                           for line in output.splitlines()
-                                           if line.startswith('1 ')]
-
-        return active_panes
-
     def run(self):
-        processes = []
+        pids = []
 
-        for pid in self.get_active_panes():
-            process = Process(pid)
-            processes.append(process)
-            processes = processes + list(process.children())
+        for pane in client.active_panes():
+            pids.append(pane.pane_pid)
+            pids = pids + index.direct_children(pane.pane_pid)
 
-        return [p.pid for p in processes]
+        return pids
 
 
 class TmuxActivePaneProcessNames(Reporter):
@@ -88,7 +48,10 @@ class TmuxActivePaneProcessNames(Reporter):
     """
 
     identifier = 'tmux_active_panes_process_names'
+    dependencies = ('tmux_active_panes_pids',)
 
     def run(self):
-        return [' '.join(Process(pid).cmdline())
-                for pid in self.report('tmux_active_panes_pids')]
+        cmdlines = [index.cmdline(pid)
+                    for pid in self.report('tmux_active_panes_pids')]
+
+        return [cmdline for cmdline in cmdlines if cmdline is not None]
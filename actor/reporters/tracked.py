@@ -11,3 +11,16 @@ class TrackReporter(Reporter):
     def run(self, ident, key):
         # pylint: disable=arguments-differ
         return self.context.backend.get(ident, key)
+
+
+class TrackRangeReporter(Reporter):
+    """
+    Returns an ordered dictionary of the values tracked under the given
+    identifier, for the keys (dates) in the interval [start, end).
+    """
+
+    identifier = 'track_range'
+
+    def run(self, ident, start, end):
+        # pylint: disable=arguments-differ
+        return self.context.backend.get_range(ident, start, end)
@@ -5,14 +5,27 @@ class FakePluginCache(object):
 
     def __init__(self):
         self.store = {}
+        self.linked = {}
 
     def get(self, identifier, args, kwargs):
         """
         Returns a stored value for the given identifier, ignoring the
-        args/kwargs.
+        args/kwargs. Linked plugins are evaluated instead.
         """
+
+        if identifier in self.linked:
+            return self.linked[identifier].run(*args, **kwargs)
+
         return self.store.get(identifier)
 
+    def link(self, identifier, plugin):
+        """
+        Makes the cache evaluate given plugin instance for the identifier,
+        useful to test reporters together with their dependencies.
+        """
+
+        self.linked[identifier] = plugin
+
     def __setitem__(self, identifier, value):
         """
         Supports faking the cache values via item assigment.
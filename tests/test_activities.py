@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import time
+from unittest import TestCase
+
+import snapshot
+from activities import ActivityApplicationEnforcementMixin, ActivitySpec
+from proctree import index as process_index
+from util import SubstringMatcher
+
+SUBSTRINGS = ('vim', 'vi', 'c++', 'a.b', '[x]', 'x|y', 'EMACS', u'ž')
+
+STRINGS = ('', 'vim', '/usr/bin/vi', 'gvim -f', 'g++ c++', 'aXb', 'a.b',
+           '[x] done', 'x', 'x|y', 'emacs', u'kžb', 'nothing here')
+
+
+def contains_any(substrings, string):
+    """
+    The substring test the matcher replaced.
+    """
+
+    return any(substring in string for substring in substrings)
+
+
+class SubstringMatcherTest(TestCase):
+
+    def assert_same_as_substring_test(self, substrings):
+        matcher = SubstringMatcher(substrings)
+
+        for string in STRINGS:
+            assert matcher(string) == contains_any(substrings, string), \
+                (substrings, string)
+
+    def test_substrings(self):
+        self.assert_same_as_substring_test(SUBSTRINGS)
+
+        for substring in SUBSTRINGS:
+            self.assert_same_as_substring_test((substring,))
+
+    def test_empty(self):
+        self.assert_same_as_substring_test(())
+        self.assert_same_as_substring_test(('',))
+        self.assert_same_as_substring_test(('', 'vim'))
+
+    def test_overlapping(self):
+        # The longer alternative is preferred, the shorter one still matches
+        self.assert_same_as_substring_test(('vi', 'vim', 'gvim'))
+        self.assert_same_as_substring_test(('abc', 'bcd'))
+
+
+class Enforcement(ActivityApplicationEnforcementMixin):
+
+    blacklisted_commands = ('sleep 7', 'c++')
+    whitelisted_commands = ('firefox',)
+
+    def __init__(self, reports):
+        self.reports = reports
+        self.fixes = []
+
+    def report(self, identifier):
+        return self.reports.get(identifier)
+
+    def fix(self, identifier, **kwargs):
+        self.fixes.append(identifier)
+
+
+class ApplicationEnforcementTest(TestCase):
+
+    def test_compile_matchers(self):
+        enforcement = Enforcement({})
+        enforcement.setup()
+
+        assert enforcement.whitelisted_command('/usr/bin/firefox')
+        assert enforcement.whitelisted_command('actor-desktop')
+        assert not enforcement.whitelisted_command('chromium')
+        assert enforcement.blacklisted_command('c++ main.cpp')
+        assert not enforcement.blacklisted_command('cc main.c')
+        assert enforcement.terminal_emulator('/usr/bin/xterm -e sh')
+
+    def test_forbidden_memo(self):
+        enforcement = Enforcement({})
+        enforcement.compile_matchers()
+
+        assert enforcement.forbidden(1, 'c++ main.cpp')
+        assert not enforcement.forbidden(2, 'cc main.c')
+        assert enforcement.verdicts == {(1, 'c++ main.cpp'): True,
+                                        (2, 'cc main.c'): False}
+
+        for pid in range(3, 1025):
+            enforcement.forbidden(pid, 'cc main.c')
+        assert len(enforcement.verdicts) == 1024
+
+        # The verdicts of the exited processes do not pile up
+        assert enforcement.forbidden(1025, 'c++ main.cpp')
+        assert enforcement.verdicts == {(1025, 'c++ main.cpp'): True}
+
+    def test_restored_activity(self):
+        # The setup is skipped for the restored activities
+        enforcement = Enforcement({
+            'active_window_name': 'Mozilla Firefox',
+            'active_window_process_name': 'chromium',
+        })
+        assert enforcement.blacklisted_command is None
+
+        enforcement.run()
+        assert enforcement.blacklisted_command is not None
+        assert enforcement.fixes == ['notify', 'kill_process']
+
+        enforcement.fixes = []
+        enforcement.reports['active_window_process_name'] = 'firefox'
+        enforcement.run()
+        assert enforcement.fixes == []
+
+    def test_terminal_emulator(self):
+        allowed = subprocess.Popen(['sleep', '5'])
+        forbidden = subprocess.Popen(['sleep', '7'])
+
+        # The tests pretend to be the terminal emulator
+        enforcement = Enforcement({
+            'active_window_name': 'Terminal',
+            'active_window_process_name': 'xterm',
+            'active_window_pid': os.getpid(),
+        })
+        enforcement.whitelisted_commands = ('xterm',)
+
+        try:
+            process_index.refresh(force=True)
+            enforcement.run()
+
+            deadline = time.time() + 2
+            while forbidden.poll() is None and time.time() < deadline:
+                time.sleep(0.01)
+
+            assert forbidden.poll() is not None
+            assert allowed.poll() is None
+            assert enforcement.fixes == []
+        finally:
+            for process in (allowed, forbidden):
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+
+
+class ActivitySpecCodecTest(TestCase):
+
+    def test_codec(self):
+        spec = ActivitySpec('writing', 30, max_shrinking=0.5, priority=2)
+        spec.shrinking = 0.75
+
+        # Encoded using the ActivitySpec codec, not pickled or as a dict
+        data = snapshot.dumps(spec)
+        assert snapshot.loads(data).snapshot() == spec.snapshot()
+        assert snapshot.dumps(spec.snapshot()) != data
+        assert snapshot.codecs_by_tag['A'][0] is ActivitySpec
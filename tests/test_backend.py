@@ -0,0 +1,168 @@
+import collections
+import datetime
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from pony import orm
+
+from config import config
+
+# The database is bound when the backend module is imported, hence it needs
+# to be redirected first
+config.DB_FILE = os.path.join(tempfile.mkdtemp(), 'actor.db')
+
+import backend
+
+
+class GatedLock(object):
+    """
+    Lock that keeps the given thread waiting (as if the lock was taken)
+    until the gate is opened.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gate = threading.Event()
+        self.arrived = threading.Event()
+        self.gated_thread = None
+
+    def __enter__(self):
+        if threading.current_thread() is self.gated_thread:
+            self.arrived.set()
+            self.gate.wait()
+
+        self.lock.acquire()
+
+    def __exit__(self, *args):
+        self.lock.release()
+
+
+class BackendTest(TestCase):
+
+    def setUp(self):
+        self.flush_interval = config.BACKEND_FLUSH_INTERVAL
+        config.BACKEND_FLUSH_INTERVAL = 3600
+        self.backend = backend.Backend()
+
+    def tearDown(self):
+        self.backend.flush()
+        config.BACKEND_FLUSH_INTERVAL = self.flush_interval
+
+    def test_put_get_flush(self):
+        self.backend.put('test-put', 'key', {'a': [1, 2]})
+        assert self.backend.get('test-put', 'key') == {'a': [1, 2]}
+
+        # Not written until flushed
+        assert self.backend.read('test-put', 'key') is backend.MISSING
+
+        self.backend.flush()
+        assert self.backend.pending == {}
+        assert self.backend.read('test-put', 'key') == {'a': [1, 2]}
+        assert backend.Backend().get('test-put', 'key') == {'a': [1, 2]}
+
+    def test_overwrite(self):
+        self.backend.put('test-overwrite', 'key', 1)
+        self.backend.put('test-overwrite', 'key', 2)
+        assert len(self.backend.pending) == 1
+
+        self.backend.flush()
+        assert self.backend.read('test-overwrite', 'key') == 2
+
+        self.backend.put('test-overwrite', 'key', 3)
+        self.backend.flush()
+        assert self.backend.read('test-overwrite', 'key') == 3
+        assert self.backend.get('test-overwrite', 'key') == 3
+
+    def test_failed_write_requeued(self):
+        def failing_write(pending):
+            raise orm.DatabaseError(None, 'disk I/O error')
+
+        self.backend.put('test-failed', 'old', 1)
+        self.backend.put('test-failed', 'new', 1)
+
+        self.backend.write = failing_write
+        self.backend.flush()
+
+        # Newer values are not overwritten by the requeued ones
+        self.backend.put('test-failed', 'new', 2)
+        assert self.backend.pending == {('test-failed', 'old'): 1,
+                                        ('test-failed', 'new'): 2}
+
+        del self.backend.write
+        self.backend.flush()
+        assert self.backend.read('test-failed', 'old') == 1
+        assert self.backend.read('test-failed', 'new') == 2
+
+    def test_get_range(self):
+        for day in (1, 15, 31):
+            self.backend.put('test-range', datetime.date(2016, 1, day), day)
+        self.backend.put('test-range', datetime.date(2016, 2, 1), 32)
+        self.backend.flush()
+
+        # Includes the values not written yet
+        self.backend.put('test-range', datetime.date(2016, 1, 20), 20)
+
+        january = self.backend.get_range('test-range',
+                                         datetime.date(2016, 1, 1),
+                                         datetime.date(2016, 2, 1))
+        assert january == collections.OrderedDict([
+            ('2016-01-01', 1), ('2016-01-15', 15), ('2016-01-20', 20),
+            ('2016-01-31', 31),
+        ])
+        assert list(january) == sorted(january)
+
+    def test_get_prefix(self):
+        self.backend.put('test-prefix', '2016-01-05 10:00:00', 'a')
+        self.backend.put('test-prefix', '2016-02-05 10:00:00', 'b')
+        self.backend.flush()
+        self.backend.put('test-prefix', '2016-01-06 10:00:00', 'c')
+
+        assert self.backend.get_prefix('test-prefix', '2016-01') == \
+            collections.OrderedDict([('2016-01-05 10:00:00', 'a'),
+                                     ('2016-01-06 10:00:00', 'c')])
+        assert list(self.backend.get_prefix('test-prefix', '')) == [
+            '2016-01-05 10:00:00', '2016-01-06 10:00:00',
+            '2016-02-05 10:00:00'
+        ]
+
+    def test_values_cache(self):
+        reads = []
+        read = self.backend.read
+
+        def counting_read(name, key):
+            reads.append((name, key))
+            return read(name, key)
+
+        self.backend.read = counting_read
+
+        # Missing values are cached too
+        assert self.backend.get('test-cache', 'key') is None
+        assert self.backend.get('test-cache', 'key') is None
+        assert reads == [('test-cache', 'key')]
+
+        self.backend.put('test-cache', 'key', 1)
+        assert self.backend.get('test-cache', 'key') == 1
+        assert len(reads) == 1
+
+    def test_flush_while_timer_waits(self):
+        config.BACKEND_FLUSH_INTERVAL = 0.01
+        self.backend.lock = GatedLock()
+
+        self.backend.put('test-timer', 'key', 1)
+        self.backend.lock.gated_thread = self.backend.timer
+
+        # The timer fired and its flush is waiting for the lock
+        assert self.backend.lock.arrived.wait(2)
+
+        flusher = threading.Thread(target=self.backend.flush)
+        flusher.daemon = True
+        flusher.start()
+        flusher.join(2)
+        finished = not flusher.is_alive()
+
+        self.backend.lock.gate.set()
+
+        assert finished
+        assert self.backend.read('test-timer', 'key') == 1
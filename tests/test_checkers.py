@@ -1,5 +1,11 @@
+import time
+from unittest import TestCase
+
+import pytest
+
 from tests.base import CheckerTestCase
 
+from timeline import ScheduleIndex
 from util import convert_timestamp
 
 
@@ -13,6 +19,40 @@ class RegularExpressionCheckerTest(CheckerTestCase):
         assert self.plugin.run(regexp='ratata', string="nasty ratata") == True
 
 
+class RegularExpressionsCheckerTest(CheckerTestCase):
+    class_name = 'RegularExpressionsChecker'
+    module_name = 'regular_expression'
+
+    def test_named_patterns(self):
+        patterns = {'video': 'youtube|vimeo', 'social': 'face(book)?',
+                    'news': 'reddit'}
+
+        assert self.plugin.run(patterns=patterns, string="potato") == []
+        assert self.plugin.run(patterns=patterns,
+                               string="reddit - facebook") == ['news', 'social']
+
+    def test_overlapping_patterns(self):
+        patterns = ['facebook', 'ace', 'book', 'k$']
+        assert self.plugin.run(patterns=patterns, string="facebook") == \
+            ['ace', 'book', 'facebook', 'k$']
+
+    def test_uncombinable_patterns(self):
+        patterns = {'repeat': r'(a)\1', 'case': '(?i)RAT',
+                    'first': '(?P<x>b)', 'second': '(?P<x>c)'}
+
+        assert self.plugin.run(patterns=patterns, string="aa rat bc") == \
+            ['case', 'first', 'repeat', 'second']
+        assert self.plugin.run(patterns=patterns, string="a RA") == []
+
+    def test_many_patterns(self):
+        patterns = {'site{0}'.format(i): r'site{0}\.com'.format(i)
+                    for i in range(500)}
+
+        assert self.plugin.run(patterns=patterns,
+                               string="site42.com, site499.com") == \
+            ['site42', 'site499']
+
+
 class TimeIntervalCheckerTest(CheckerTestCase):
     class_name = 'TimeIntervalChecker'
     module_name = 'time_interval'
@@ -54,3 +94,37 @@ class TimeIntervalCheckerTest(CheckerTestCase):
 
         self.context.reporters['time'] = convert_timestamp('09.00')
         assert self.plugin.run(start='18.00', end='05.00') == False
+
+
+class ScheduleIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = ScheduleIndex()
+        self.index.register('18.00', '19.00')
+        self.index.register('18.30', '05.00')
+
+    def timestamp(self, timestamp):
+        return time.mktime(convert_timestamp(timestamp).timetuple())
+
+    def test_active_windows(self):
+        evening = (18 * 3600, 19 * 3600)
+        night = (18 * 3600 + 30 * 60, 5 * 3600)
+
+        assert self.index.active(17 * 3600) == frozenset()
+        assert self.index.active(18 * 3600) == frozenset([evening])
+        assert self.index.active(18 * 3600 + 45 * 60) == frozenset([evening, night])
+        assert self.index.active(19 * 3600) == frozenset([night])
+        assert self.index.active(0) == frozenset([night])
+        assert self.index.active(5 * 3600) == frozenset()
+
+    def test_next_boundary(self):
+        assert self.index.next_boundary(self.timestamp('17.00')) == self.timestamp('18.00')
+        assert self.index.next_boundary(self.timestamp('18.00')) == self.timestamp('18.30')
+        assert self.index.next_boundary(self.timestamp('04.00')) == self.timestamp('05.00')
+
+        # After the last boundary of the day, the first one of the next day
+        tomorrow = self.index.next_boundary(self.timestamp('19.30'))
+        assert tomorrow - self.timestamp('05.00') == pytest.approx(24 * 3600, abs=3600)
+
+    def test_no_windows(self):
+        assert ScheduleIndex().next_boundary() is None
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from context import Context
+from plugins import ContextProxyMixin, Plugin
+
+
+class RecordingCache(object):
+
+    def __init__(self, identifiers):
+        self.identifiers = identifiers
+        self.requests = None
+
+    def provides(self, identifier):
+        return identifier in self.identifiers
+
+    def rule_requests(self, rule_name):
+        return [('window_name', tuple(), dict())]
+
+    def prefetch(self, requests):
+        self.requests = requests
+
+
+class Tracker(Plugin):
+    sources = ('prompt_yesno', 'time')
+
+
+class Rule(ContextProxyMixin, Plugin):
+    sources = ('hamster_activity',)
+
+
+class ContextPrefetchTest(TestCase):
+
+    def test_sources(self):
+        context = Context()
+        context.reporters = RecordingCache(
+            ('time', 'hamster_activity', 'window_name'))
+
+        context.prefetch([Tracker(context), Rule(context)])
+
+        # The fixers waking up the plugins are not prefetched
+        assert context.reporters.requests == [
+            ('time', tuple(), dict()),
+            ('hamster_activity', tuple(), dict()),
+            ('window_name', tuple(), dict()),
+        ]
@@ -0,0 +1,113 @@
+import time
+from unittest import TestCase
+
+import pytest
+
+import hamster
+from hamster import HamsterMonitor
+
+
+def fact(name, category, minutes, ongoing=False):
+    """
+    Returns the fact in the form it is sent by the Hamster DBus service.
+    """
+
+    end_time = 0 if ongoing else 1
+    return (1, 0, end_time, '', name, 1, category, [], 0, minutes * 60)
+
+
+class FakeBus(object):
+
+    def __init__(self):
+        self.signals = []
+        self.watched = []
+
+    def add_signal_receiver(self, handler, signal_name, **kwargs):
+        self.signals.append(signal_name)
+
+    def watch_name_owner(self, bus_name, callback):
+        self.watched.append(bus_name)
+
+
+class FakeHamster(object):
+
+    def __init__(self, facts):
+        self.facts = facts
+        self.calls = 0
+
+    def GetTodaysFacts(self):
+        self.calls += 1
+        return self.facts
+
+
+class FakeProxies(object):
+
+    def __init__(self, interface):
+        self.bus = FakeBus()
+        self.interface = interface
+
+    def session_bus(self):
+        return self.bus
+
+    def get(self, bus_name, object_path):
+        return self.interface
+
+
+class HamsterMonitorTest(TestCase):
+
+    def setUp(self):
+        self.monitor = HamsterMonitor()
+
+    def test_load(self):
+        self.monitor.load([
+            fact('writing', 'work', 30),
+            fact('reading', 'fun', 10),
+            fact('writing', 'work', 15),
+            fact('actor', 'work', 5, ongoing=True),
+        ])
+
+        assert self.monitor.activity_totals == {
+            'writing@work': 45, 'reading@fun': 10, 'actor@work': 5,
+        }
+        assert self.monitor.category_totals == {'work': 50, 'fun': 10}
+        assert self.monitor.current == ('actor@work', 'work')
+
+    def test_load_finished_facts(self):
+        self.monitor.load([fact('writing', 'work', 30)])
+        assert self.monitor.current is None
+
+        self.monitor.load([])
+        assert self.monitor.activity_totals == {}
+        assert self.monitor.current is None
+
+    def test_elapsed(self):
+        self.monitor.load([fact('actor', 'work', 5, ongoing=True)])
+        self.monitor.loaded_at = time.time() - 120
+
+        assert self.monitor.elapsed('actor@work', 0) == pytest.approx(2, abs=0.1)
+        assert self.monitor.elapsed('work', 1) == pytest.approx(2, abs=0.1)
+        assert self.monitor.elapsed('writing@work', 0) == 0
+        assert self.monitor.elapsed('fun', 1) == 0
+
+    def test_subscribed_on_first_use(self):
+        interface = FakeHamster([fact('actor', 'work', 5, ongoing=True)])
+        proxies = hamster.proxies
+        hamster.proxies = FakeProxies(interface)
+
+        try:
+            assert not self.monitor.subscribed
+            assert self.monitor.current_activity() == 'actor@work'
+            assert self.monitor.subscribed
+            assert sorted(hamster.proxies.bus.signals) == \
+                ['ActivitiesChanged', 'FactsChanged']
+
+            # Loaded again only after a change
+            self.monitor.activity_duration('actor@work')
+            assert interface.calls == 1
+
+            self.monitor.changed()
+            assert self.monitor.category_duration('work') == \
+                pytest.approx(5, abs=0.1)
+            assert interface.calls == 2
+        finally:
+            hamster.proxies = proxies
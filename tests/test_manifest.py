@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import plugins
+import manifest
+from config import config
+from plugins import Plugin, PluginFactory, PluginMount
+
+SAMPLE_MODULE = '''
+from tests.test_manifest import Sample
+
+
+class First(Sample):
+    identifier = 'first'
+
+
+class Second(Sample):
+    """
+    identifier = 'not an identifier'
+    """
+
+    identifier = "second"
+
+    def run(self):
+        identifier = 'local'
+'''
+
+OTHER_MODULE = '''
+from tests.test_manifest import Sample
+
+
+class Other(Sample):
+    identifier = 'other'
+'''
+
+DYNAMIC_MODULE = '''
+from tests.test_manifest import Sample
+
+
+class Base(Sample):
+    identifier = None
+
+
+class Dynamic(Base):
+    identifier = 'dyna' + 'mic'
+'''
+
+
+class Sample(Plugin):
+    __metaclass__ = PluginMount
+
+
+class PluginManifestTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.package = os.path.join(self.directory, 'manifest_plugins')
+        os.mkdir(self.package)
+
+        self.write('__init__.py', '')
+        self.write('sample.py', SAMPLE_MODULE)
+        self.write('other.py', OTHER_MODULE)
+
+        self.source_dir = config.SOURCE_DIR
+        self.manifest_file = config.PLUGIN_MANIFEST_FILE
+        config.SOURCE_DIR = self.directory
+        config.PLUGIN_MANIFEST_FILE = os.path.join(self.directory,
+                                                   'plugins.json')
+
+        self.packages = manifest.PACKAGES
+        manifest.PACKAGES = {'Sample': 'manifest_plugins'}
+        sys.path.insert(0, self.directory)
+
+        self.manifest = manifest.PluginManifest()
+
+    def tearDown(self):
+        config.SOURCE_DIR = self.source_dir
+        config.PLUGIN_MANIFEST_FILE = self.manifest_file
+
+        manifest.PACKAGES = self.packages
+        sys.path.remove(self.directory)
+
+        for module_id in list(sys.modules):
+            if module_id.startswith('manifest_plugins'):
+                del sys.modules[module_id]
+
+        del Sample.plugins[:]
+        Sample.index.clear()
+
+        shutil.rmtree(self.directory)
+
+    def write(self, filename, content):
+        with open(os.path.join(self.package, filename), 'w') as fil:
+            fil.write(content)
+
+    def path(self, filename):
+        return os.path.join(self.package, filename)
+
+    def test_scan_module(self):
+        assert manifest.scan_module(self.path('sample.py')) == \
+            (['first', 'second'], False)
+
+        self.write('dynamic.py', DYNAMIC_MODULE)
+        assert manifest.scan_module(self.path('dynamic.py')) == ([], True)
+
+    def test_load(self):
+        self.manifest.load()
+
+        assert self.manifest.modules['manifest_plugins.sample'] == {
+            'path': self.path('sample.py'),
+            'mtime': os.path.getmtime(self.path('sample.py')),
+            'identifiers': ['first', 'second'],
+            'dynamic': False,
+        }
+        assert self.manifest.modules['manifest_plugins.other'][
+            'identifiers'] == ['other']
+
+        with open(config.PLUGIN_MANIFEST_FILE, 'r') as fil:
+            cache = json.load(fil)
+
+        assert cache['version'] == manifest.VERSION
+        assert cache['modules'] == self.manifest.modules
+
+    def test_cache_invalidation(self):
+        self.manifest.load()
+
+        # Unchanged modules are not scanned again
+        with open(config.PLUGIN_MANIFEST_FILE, 'r') as fil:
+            cache = json.load(fil)
+        cache['modules']['manifest_plugins.other']['identifiers'] = ['cached']
+        with open(config.PLUGIN_MANIFEST_FILE, 'w') as fil:
+            json.dump(cache, fil)
+
+        self.manifest.load()
+        assert self.manifest.modules['manifest_plugins.other'][
+            'identifiers'] == ['cached']
+
+        # Modified ones are
+        mtime = os.path.getmtime(self.path('other.py')) + 10
+        os.utime(self.path('other.py'), (mtime, mtime))
+
+        self.manifest.load()
+        assert self.manifest.modules['manifest_plugins.other'][
+            'identifiers'] == ['other']
+
+    def test_cache_version(self):
+        with open(config.PLUGIN_MANIFEST_FILE, 'w') as fil:
+            json.dump({'version': manifest.VERSION + 1, 'modules': {}}, fil)
+
+        assert self.manifest.read_cache() == {}
+
+    def test_lazy_import(self):
+        shared = plugins.manifest
+        plugins.manifest = self.manifest
+
+        try:
+            factory = PluginFactory(Sample, None)
+
+            assert factory.get_plugin('other').__name__ == 'Other'
+            assert 'manifest_plugins.other' in sys.modules
+            assert 'manifest_plugins.sample' not in sys.modules
+
+            assert factory.get_plugin('second').__name__ == 'Second'
+            assert 'manifest_plugins.sample' in sys.modules
+        finally:
+            plugins.manifest = shared
+
+    def test_unknown_identifier(self):
+        self.write('dynamic.py', DYNAMIC_MODULE)
+        listdir = manifest.os.listdir
+        listed = []
+
+        def counting_listdir(path):
+            listed.append(path)
+            return listdir(path)
+
+        manifest.os.listdir = counting_listdir
+
+        try:
+            # Only the modules with identifiers which are not string
+            # literals are imported
+            self.manifest.import_plugin(Sample, 'dynamic')
+            assert 'manifest_plugins.dynamic' in sys.modules
+            assert 'manifest_plugins.sample' not in sys.modules
+            assert 'manifest_plugins.other' not in sys.modules
+
+            # The missing identifiers are remembered
+            self.manifest.import_plugin(Sample, 'missing')
+            assert ('Sample', 'missing') in self.manifest.missing
+            assert ('Sample', 'dynamic') not in self.manifest.missing
+            self.manifest.import_plugin(Sample, 'missing')
+
+            assert len(listed) == 1
+            assert 'manifest_plugins.sample' not in sys.modules
+        finally:
+            manifest.os.listdir = listdir
@@ -0,0 +1,512 @@
+import logging
+import sys
+import threading
+import time
+from unittest import TestCase
+
+import pytest
+
+from config import config
+from logger import LoggerMixin
+from plugins import (MISSING, AsyncEvalBlockingMixin, AsyncEvalMixinBase,
+                     AsyncEvalNonBlockingMixin, CacheKey, ContextProxyMixin,
+                     CyclicDependency, NoSuchPlugin, Plugin, PluginCache,
+                     PluginFactory, PluginMount, Worker, freeze)
+from profiler import Profiler
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class PluginMountTest(TestCase):
+
+    def setUp(self):
+        class Sample(Plugin):
+            __metaclass__ = PluginMount
+
+        self.mount = Sample
+
+        self.handler = RecordingHandler()
+        LoggerMixin.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        LoggerMixin.logger.removeHandler(self.handler)
+
+    def test_lookup(self):
+        class First(self.mount):
+            identifier = 'first'
+
+        class Second(self.mount):
+            identifier = 'second'
+
+        factory = PluginFactory(self.mount, None)
+
+        assert self.mount.plugins == [First, Second]
+        assert factory.get_plugin('first') is First
+        assert factory.get_plugin('second') is Second
+
+        with pytest.raises(NoSuchPlugin):
+            factory.get_plugin('third')
+
+        assert factory.provides('first')
+        assert not factory.provides('third')
+
+    def test_duplicate_identifier(self):
+        class Original(self.mount):
+            identifier = 'sample'
+
+        class Duplicate(self.mount):
+            identifier = 'sample'
+
+        assert self.mount.index == {'sample': Duplicate}
+        assert len(self.handler.messages) == 1
+        assert "Overrides {0}.Original".format(__name__) in \
+            self.handler.messages[0]
+
+    def test_class_name_identifiers(self):
+        # The identifier of the rules is a property giving their class name
+        class NamedMount(ContextProxyMixin, Plugin):
+            __metaclass__ = PluginMount
+
+        class First(NamedMount):
+            pass
+
+        class Second(NamedMount):
+            pass
+
+        assert NamedMount.plugins == [First, Second]
+        assert NamedMount.index == {}
+        assert self.handler.messages == []
+
+
+class DependencyOrderTest(TestCase):
+
+    def setUp(self):
+        class Sample(Plugin):
+            __metaclass__ = PluginMount
+
+        self.mount = Sample
+        self.cache = PluginCache(self.mount, None)
+
+    def define(self, identifier, *dependencies):
+        return type(str(identifier), (self.mount,), {
+            'identifier': identifier,
+            'dependencies': dependencies,
+        })
+
+    def test_order(self):
+        self.define('time')
+        self.define('weekday', 'time')
+        self.define('window')
+        self.define('window_name', 'window')
+        self.define('working', 'window_name', 'weekday', 'time')
+
+        assert self.cache.dependency_order('time') == ['time']
+        assert self.cache.dependency_order('working') == \
+            ['window', 'window_name', 'time', 'weekday', 'working']
+
+    def test_cycle(self):
+        self.define('first', 'second')
+        self.define('second', 'third')
+        self.define('third', 'first')
+
+        with pytest.raises(CyclicDependency) as exc:
+            self.cache.dependency_order('first')
+
+        assert 'first -> second -> third -> first' in str(exc.value)
+
+    def test_unknown_dependency(self):
+        self.define('first', 'missing')
+
+        with pytest.raises(NoSuchPlugin):
+            self.cache.dependency_order('first')
+
+
+class FakeContext(object):
+
+    def __init__(self, mount):
+        self.profiler = Profiler()
+        self.reporters = PluginCache(mount, self)
+
+
+class PluginCacheTestCase(TestCase):
+
+    def setUp(self):
+        class Sample(Worker):
+            __metaclass__ = PluginMount
+
+        self.mount = Sample
+        self.context = FakeContext(Sample)
+        self.cache = self.context.reporters
+
+        self.evaluations = []
+        self.lock = threading.Lock()
+
+        self.fresh_cache_size = config.FRESH_CACHE_SIZE
+        self.prefetch_workers = config.PREFETCH_WORKERS
+        config.PREFETCH_WORKERS = 4
+
+    def tearDown(self):
+        config.FRESH_CACHE_SIZE = self.fresh_cache_size
+        config.PREFETCH_WORKERS = self.prefetch_workers
+
+        if self.cache.pool is not None:
+            self.cache.pool.terminate()
+
+    def define(self, identifier, run, **attrs):
+        test = self
+
+        def evaluate(plugin, *args, **kwargs):
+            with test.lock:
+                test.evaluations.append((identifier, threading.current_thread()))
+            return run(plugin, *args, **kwargs)
+
+        attrs.update(identifier=identifier, run=evaluate)
+        return type(identifier, (self.mount,), attrs)
+
+    def calls(self, identifier):
+        return len([evaluation for evaluation in self.evaluations
+                    if evaluation[0] == identifier])
+
+
+class PrefetchTest(PluginCacheTestCase):
+
+    def test_reporters_calling_each_other(self):
+        # Small enough to evict the fresh results while the workers use them
+        config.FRESH_CACHE_SIZE = 4
+
+        for number in range(8):
+            self.define('shared{0}'.format(number),
+                        lambda plugin, number=number: number, freshness=60)
+
+        for number in range(32):
+            self.define('caller{0}'.format(number),
+                        lambda plugin, number=number: sum(
+                            plugin.report('shared{0}'.format(shared))
+                            for shared in range(number % 8 + 1)))
+
+        requests = [('caller{0}'.format(number), tuple(), dict())
+                    for number in range(32)]
+
+        # Switch the threads as often as possible
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+
+        try:
+            for _ in range(10):
+                self.cache.prefetch(requests)
+
+                for number in range(32):
+                    assert self.cache.cached_value(
+                        'caller{0}'.format(number)) == \
+                        sum(range(number % 8 + 1))
+
+                self.cache.clear()
+        finally:
+            sys.setcheckinterval(interval)
+
+        # The shared reporters were reported from the worker threads
+        assert any(identifier.startswith('shared') and
+                   thread is not threading.current_thread()
+                   for identifier, thread in self.evaluations)
+        assert len(self.cache.fresh) == 4
+
+    @staticmethod
+    def requests(*identifiers):
+        return [(identifier, tuple(), dict()) for identifier in identifiers]
+
+    def threads(self, identifier):
+        return [thread for name, thread in self.evaluations
+                if name == identifier]
+
+    def test_thread_pool(self):
+        for identifier in ('first', 'second', 'third'):
+            self.define(identifier, lambda plugin: threading.current_thread())
+
+        self.cache.prefetch(self.requests('first', 'second', 'third'))
+
+        for identifier in ('first', 'second', 'third'):
+            assert self.threads(identifier) != [threading.current_thread()]
+            assert self.cache.cached_value(identifier) is \
+                self.threads(identifier)[0]
+
+    def test_pinned_to_main_thread(self):
+        self.define('first', lambda plugin: 1)
+        self.define('second', lambda plugin: 2)
+        self.define('pinned', lambda plugin: 3, parallel=False)
+
+        self.cache.prefetch(self.requests('first', 'second', 'pinned'))
+
+        assert self.threads('pinned') == [threading.current_thread()]
+        assert self.threads('first') != [threading.current_thread()]
+        assert self.cache.cached_value('pinned') == 3
+
+    def test_lone_plugin_inline(self):
+        self.define('lone', lambda plugin: 1)
+        self.define('pinned', lambda plugin: 2, parallel=False)
+
+        # Not worth the thread synchronization
+        self.cache.prefetch(self.requests('lone', 'pinned'))
+
+        assert self.threads('lone') == [threading.current_thread()]
+        assert self.cache.pool is None
+
+    def test_evaluated_once_per_round(self):
+        self.define('base', lambda plugin: 1)
+        self.define('first', lambda plugin: plugin.report('base') + 1,
+                    dependencies=('base',))
+        self.define('second', lambda plugin: plugin.report('base') + 2,
+                    dependencies=('base',))
+        self.define('unrequested', lambda plugin: plugin.report('first'))
+
+        for workers in (4, 0):
+            config.PREFETCH_WORKERS = workers
+            self.evaluations = []
+
+            for _ in range(2):
+                self.cache.prefetch(self.requests('first', 'second'))
+
+                assert self.cache.get('first') == 2
+                assert self.cache.get('second') == 3
+                assert self.cache.get('unrequested') == 2
+                assert self.cache.get('base') == 1
+
+                self.cache.clear()
+
+            for identifier in ('base', 'first', 'second', 'unrequested'):
+                assert self.calls(identifier) == 2, (workers, identifier)
+
+    def test_invalid_requests(self):
+        handler = RecordingHandler()
+        LoggerMixin.logger.addHandler(handler)
+
+        self.define('first', lambda plugin: 1, dependencies=('second',))
+        self.define('second', lambda plugin: 2, dependencies=('first',))
+        self.define('valid', lambda plugin: 3)
+
+        try:
+            self.cache.prefetch([
+                ('first', tuple(), dict()),
+                ('missing', tuple(), dict()),
+                ('valid', tuple(), dict()),
+            ])
+        finally:
+            LoggerMixin.logger.removeHandler(handler)
+
+        assert self.cache.cached_value('valid') == 3
+        assert self.cache.cached_value('first') is MISSING
+        assert len(handler.messages) == 2
+        assert "Not prefetching first: Plugins first -> second -> first" in \
+            handler.messages[0]
+        assert "Not prefetching missing" in handler.messages[1]
+
+
+class CacheKeyTest(TestCase):
+
+    def test_freeze(self):
+        assert freeze({'b': [1, {'c': [2]}], 'a': set([1])}) == (
+            ('a', frozenset([1])),
+            ('b', (1, (('c', (2,)),))),
+        )
+        assert freeze(('a', 1, None)) == ('a', 1, None)
+
+        hash(freeze({'a': [{'b': [{}]}]}))
+
+    def test_equal_arguments(self):
+        first = CacheKey('task', ([1, 2],), {'b': {'c': [3]}, 'a': 1})
+        second = CacheKey('task', ((1, 2),), {'a': 1, 'b': {'c': (3,)}})
+
+        assert first == second
+        assert hash(first) == hash(second)
+        assert len({first: 1, second: 2}) == 1
+
+        assert CacheKey('task', (1,), {}) != CacheKey('task', (2,), {})
+        assert CacheKey('task', (), {'a': 1}) != CacheKey('task', (1,), {})
+        assert CacheKey('task', (1,), {}) != CacheKey('other', (1,), {})
+
+    def test_calls_without_arguments(self):
+        assert PluginCache.key('time', (), {}) == 'time'
+        assert isinstance(PluginCache.key('time', (1,), {}), CacheKey)
+
+
+class FreshCacheTest(PluginCacheTestCase):
+
+    def setUp(self):
+        super(FreshCacheTest, self).setUp()
+
+        self.define('fresh', lambda plugin, *args: args, freshness=60)
+        self.define('stale', lambda plugin, *args: args)
+
+    def get(self, identifier, *args):
+        return self.cache.get(identifier, args)
+
+    def test_kept_across_rounds(self):
+        for _ in range(3):
+            assert self.get('fresh', 1) == (1,)
+            assert self.get('stale', 1) == (1,)
+            self.cache.clear()
+
+        assert self.calls('fresh') == 1
+        assert self.calls('stale') == 3
+
+    def test_none_result(self):
+        self.define('nothing', lambda plugin, *args: None)
+
+        assert self.cache.cached_value('nothing') is MISSING
+
+        assert self.get('nothing') is None
+        assert self.get('nothing') is None
+        assert self.get('nothing', 1) is None
+        assert self.get('nothing', 1) is None
+
+        # A None result is a hit, not a miss
+        assert self.cache.cached_value('nothing') is None
+        assert self.calls('nothing') == 2
+
+    def test_expiry(self):
+        self.define('brief', lambda plugin: None, freshness=0.1)
+
+        assert self.get('brief') is None
+        self.cache.clear()
+        assert self.get('brief') is None
+        assert self.calls('brief') == 1
+
+        time.sleep(0.15)
+        self.cache.clear()
+        assert self.get('brief') is None
+        assert self.calls('brief') == 2
+
+    def test_eviction(self):
+        config.FRESH_CACHE_SIZE = 2
+
+        self.get('fresh', 1)
+        self.get('fresh', 2)
+
+        # The least recently used result is evicted
+        self.cache.clear()
+        self.get('fresh', 1)
+        self.get('fresh', 3)
+        assert len(self.cache.fresh) == 2
+
+        self.cache.clear()
+        self.get('fresh', 1)
+        self.get('fresh', 3)
+        assert self.calls('fresh') == 3
+
+        self.get('fresh', 2)
+        assert self.calls('fresh') == 4
+
+    def test_invalidate(self):
+        self.define('other', lambda plugin: 'other', freshness=60)
+
+        self.get('fresh')
+        self.get('fresh', 1)
+        self.get('fresh', 2, 3)
+        self.get('other')
+
+        self.cache.invalidate('fresh')
+
+        # Both the key without arguments and the CacheKeys are dropped
+        assert list(self.cache.cache) == ['other']
+        assert list(self.cache.fresh) == ['other']
+
+        self.get('fresh', 1)
+        assert self.calls('fresh') == 4
+
+
+class FakeScheduler(object):
+
+    def __init__(self, waiting=()):
+        self.waiting = waiting
+        self.woken = []
+        self.notified = threading.Event()
+
+    def wakeup(self, *sources):
+        self.woken.extend(sources)
+        self.notified.set()
+        return any(source in self.waiting for source in sources)
+
+    def notify(self):
+        self.woken.append(None)
+        self.notified.set()
+
+
+class SchedulerContext(object):
+
+    def __init__(self, waiting=()):
+        self.scheduler = FakeScheduler(waiting)
+
+
+class Polling(AsyncEvalNonBlockingMixin, Worker):
+    identifier = 'polling'
+
+    def __init__(self, context):
+        super(Polling, self).__init__(context)
+        self.threads = []
+
+    def run(self, value):
+        self.threads.append(threading.current_thread())
+        return value
+
+
+class Pushing(AsyncEvalBlockingMixin, Worker):
+    identifier = 'pushing'
+
+    def run(self):
+        pass
+
+
+class AsyncEvalTest(TestCase):
+
+    @staticmethod
+    def wait_for(condition, timeout=2):
+        deadline = time.time() + timeout
+
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+
+        return condition()
+
+    def test_shared_pool(self):
+        assert Polling.executor() is Pushing.executor()
+        assert Polling.executor() is AsyncEvalMixinBase.pool
+
+    def test_completion_wakes_up_waiting_plugins(self):
+        context = SchedulerContext(waiting=('polling',))
+        plugin = Polling(context)
+
+        assert plugin.evaluate(42) is None
+        assert context.scheduler.notified.wait(2)
+        assert plugin.threads[0] is not threading.current_thread()
+
+        assert plugin.evaluate(42) == 42
+        assert context.scheduler.woken == ['polling']
+
+        # Evaluated again only after a reset
+        plugin.reset()
+        assert plugin.evaluate(43) is None
+        assert self.wait_for(lambda: plugin.completed)
+        assert plugin.evaluate(43) == 43
+        assert len(plugin.threads) == 2
+
+    def test_completion_notifies_scheduler(self):
+        # Nothing waits for the plugin, the round happens anyway
+        context = SchedulerContext()
+        plugin = Pushing(context)
+
+        assert plugin.evaluate() is None
+        assert plugin.evaluate() is None
+        assert not plugin.completed
+
+        # I.e. from a DBus reply handler
+        plugin.result = 'pushed'
+        assert plugin.completed
+        assert plugin.evaluate() == 'pushed'
+        assert context.scheduler.woken == ['pushing', None]
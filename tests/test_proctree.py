@@ -0,0 +1,115 @@
+import errno
+import os
+import socket
+import subprocess
+import time
+from unittest import TestCase
+
+from proctree import (CN_MSG, EVENT_DATA, NLMSGHDR, PROC_EVENT,
+                      PROC_EVENT_EXIT, ProcessEventsListener, ProcessIndex)
+
+
+class FakeSocket(object):
+
+    def __init__(self, datagrams):
+        self.datagrams = list(datagrams)
+
+    def recv(self, size):
+        if not self.datagrams:
+            raise socket.error(errno.EAGAIN, "Resource temporarily unavailable")
+        return self.datagrams.pop(0)
+
+
+def exit_event(pid):
+    event = PROC_EVENT.pack(PROC_EVENT_EXIT, 0, 0) + \
+        EVENT_DATA.pack(pid, pid, 0, 0)
+    message = CN_MSG.pack(1, 1, 0, 0, len(event), 0) + event
+    return NLMSGHDR.pack(NLMSGHDR.size + len(message), 3, 0, 0, 0) + message
+
+
+class ProcessEventsListenerTest(TestCase):
+
+    def test_events(self):
+        listener = ProcessEventsListener()
+        listener.socket = FakeSocket([exit_event(42) + exit_event(43)])
+
+        assert list(listener.events()) == [
+            (PROC_EVENT_EXIT, 42, None), (PROC_EVENT_EXIT, 43, None),
+        ]
+
+    def test_malformed_event(self):
+        listener = ProcessEventsListener()
+        listener.socket = FakeSocket([
+            exit_event(42) + exit_event(43)[:-8],
+            exit_event(44),
+        ])
+
+        # The truncated message is skipped, the following datagrams are not
+        assert list(listener.events()) == [
+            (PROC_EVENT_EXIT, 42, None), (PROC_EVENT_EXIT, 44, None),
+        ]
+
+
+class ProcessIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = ProcessIndex()
+        self.processes = []
+
+    def tearDown(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def spawn(self, command):
+        process = subprocess.Popen(['sh', '-c', command])
+        self.processes.append(process)
+        return process
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+
+        while not condition():
+            assert time.time() < deadline
+            time.sleep(0.05)
+
+    def test_children(self):
+        process = self.spawn('sleep 5')
+
+        self.index.refresh(force=True)
+        assert process.pid in self.index.direct_children(os.getpid())
+        assert process.pid in self.index.descendants(os.getppid())
+
+        process.kill()
+        process.wait()
+
+        self.index.refresh(force=True)
+        assert process.pid not in self.index.direct_children(os.getpid())
+        assert self.index.cmdline(process.pid) is None
+
+    def test_exec(self):
+        process = self.spawn('sleep 0.3; exec sleep 5')
+        assert self.index.cmdline(process.pid) == \
+            'sh -c sleep 0.3; exec sleep 5'
+
+        # Noticed without waiting for a refresh
+        self.wait_for(lambda: self.index.cmdline(process.pid) == 'sleep 5')
+
+    def test_reused_pid(self):
+        process = self.spawn('sleep 5; true')
+        self.index.refresh(force=True)
+
+        # Pretend the PID belonged to another process, which has exited
+        # since the last refresh
+        self.index.cmdlines[process.pid] = \
+            ((0, 'old', None), 'old command')
+        self.index.start_times[process.pid] = 0
+        self.index.children[os.getpid()].discard(process.pid)
+        self.index.parents[process.pid] = 1
+        self.index.children[1].add(process.pid)
+
+        assert self.index.cmdline(process.pid) == 'sh -c sleep 5; true'
+        assert self.index.parents[process.pid] == os.getpid()
+        assert process.pid in self.index.direct_children(os.getpid())
+        assert process.pid not in self.index.direct_children(1)
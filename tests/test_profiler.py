@@ -0,0 +1,181 @@
+import sys
+import time
+from StringIO import StringIO
+from unittest import TestCase
+
+import pytest
+
+from client import CLIClient
+from config import config
+from profiler import SUMMARY_SIGNATURE, Profiler, Statistics
+
+
+class StatisticsTest(TestCase):
+
+    def test_record(self):
+        statistics = Statistics()
+
+        statistics.record(0.0005, hit=True)
+        statistics.record(0.003, hit=False)
+        statistics.record(0.02, exclusive=0.005, failed=True)
+        statistics.record(2)
+
+        assert statistics.calls == 4
+        assert statistics.hits == 1
+        assert statistics.misses == 1
+        assert statistics.exceptions == 1
+        assert statistics.total == pytest.approx(2023.5)
+        assert statistics.exclusive == pytest.approx(2008.5)
+        assert statistics.maximum == pytest.approx(2000)
+        assert statistics.histogram == [1, 1, 0, 1, 0, 0, 0, 1]
+
+
+class ProfilerTest(TestCase):
+
+    def setUp(self):
+        self.profiler = Profiler()
+        self.profiling = config.PROFILING
+        config.PROFILING = True
+
+    def tearDown(self):
+        config.PROFILING = self.profiling
+
+    def rows(self):
+        return {(row[0], row[1]): row for row in self.profiler.summary()}
+
+    def test_summary(self):
+        for hit in (True, False, True):
+            with self.profiler.measure('reporter', 'time') as measurement:
+                measurement.hit = hit
+
+        with pytest.raises(ValueError):
+            with self.profiler.measure('rule', 'Failing'):
+                time.sleep(0.01)
+                raise ValueError()
+
+        rows = self.profiler.summary()
+
+        # Sorted by the total time
+        assert [row[:6] for row in rows] == [
+            ('rule', 'Failing', 1, 0, 0, 1),
+            ('reporter', 'time', 3, 2, 1, 0),
+        ]
+        assert rows[0][6] >= 10
+        assert sum(rows[0][9]) == 1
+
+    def test_nested_measurements(self):
+        with self.profiler.measure('rule', 'Rule'):
+            time.sleep(0.02)
+
+            with self.profiler.measure('reporter', 'slow'):
+                time.sleep(0.05)
+
+        rows = self.rows()
+        rule = rows[('rule', 'Rule')]
+        reporter = rows[('reporter', 'slow')]
+
+        # Total time includes the nested measurements, exclusive does not
+        assert rule[6] >= 70
+        assert rule[7] == pytest.approx(rule[6] - reporter[6])
+        assert rule[7] < 50
+        assert reporter[7] == pytest.approx(reporter[6])
+
+    def test_signature(self):
+        with self.profiler.measure('reporter', 'time') as measurement:
+            measurement.hit = True
+
+        types = {'s': basestring, 'i': (int, long), 'd': float}
+        codes = SUMMARY_SIGNATURE[2:-1]
+        assert SUMMARY_SIGNATURE.startswith('a(')
+        assert codes.endswith('ai')
+
+        for row in self.profiler.summary():
+            assert len(row) == len(codes) - 1
+
+            for code, value in zip(codes[:-2], row):
+                assert isinstance(value, types[code])
+
+            assert all(isinstance(count, int) for count in row[-1])
+
+    def test_reset(self):
+        with self.profiler.measure('reporter', 'time'):
+            pass
+
+        self.profiler.reset()
+        assert self.profiler.summary() == []
+
+    def test_disabled(self):
+        config.PROFILING = False
+
+        with self.profiler.measure('reporter', 'time'):
+            pass
+
+        assert self.profiler.summary() == []
+
+
+class FakeActorInterface(object):
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def Stats(self):
+        return self.profiler.summary()
+
+    def ResetStats(self):
+        self.profiler.reset()
+
+
+class FakeClient(CLIClient):
+
+    def __init__(self, interface):
+        # pylint: disable=super-init-not-called
+        self.fake_interface = interface
+
+    @property
+    def interface(self):
+        return self.fake_interface
+
+
+class StatsCommandTest(TestCase):
+
+    def setUp(self):
+        self.profiler = Profiler()
+        self.client = FakeClient(FakeActorInterface(self.profiler))
+
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+    def output(self, command):
+        sys.stdout.seek(0)
+        sys.stdout.truncate()
+        self.client.run_command(command, [])
+        return sys.stdout.getvalue().splitlines()
+
+    def test_stats(self):
+        assert self.output('stats') == ["No statistics collected yet."]
+
+        self.profiler.record('reporter', 'time', 0.002, exclusive=0.001,
+                             hit=False)
+        self.profiler.record('rule', 'Rule', 0.5)
+
+        lines = self.output('stats')
+        assert lines[0].split() == ['Category', 'Name', 'Calls', 'Hits',
+                                    'Misses', 'Exc', 'Total(ms)', 'Self(ms)',
+                                    'Max(ms)']
+        assert lines[1].split() == ['rule', 'Rule', '1', '0', '0', '0',
+                                    '500.0', '500.0', '500.0']
+        assert lines[2].split() == ['reporter', 'time', '1', '0', '1', '0',
+                                    '2.0', '1.0', '2.0']
+        assert lines[-2].split() == ['rule', 'Rule'] + \
+            '0 0 0 0 0 0 1 0'.split()
+        assert lines[-1].split() == ['reporter', 'time'] + \
+            '0 1 0 0 0 0 0 0'.split()
+
+    def test_stats_reset(self):
+        self.profiler.record('reporter', 'time', 0.002)
+
+        assert self.output('stats-reset') == ["Statistics were reset."]
+        assert self.profiler.summary() == []
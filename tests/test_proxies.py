@@ -0,0 +1,129 @@
+import subprocess
+import time
+from unittest import TestCase
+
+import dbus
+import dbus.bus
+import dbus.service
+import gobject
+import pytest
+from dbus.mainloop.glib import DBusGMainLoop
+
+from config import config
+from proxies import ProxyCache
+
+BUS_NAME = 'org.example.Sample'
+OBJECT_PATH = '/org/example/Sample'
+
+
+class SampleService(dbus.service.Object):
+
+    def __init__(self, connection):
+        dbus.service.Object.__init__(self, connection, OBJECT_PATH)
+
+    @dbus.service.method(BUS_NAME, out_signature='s')
+    def Ping(self):
+        return 'pong'
+
+    @dbus.service.method(BUS_NAME, out_signature='s',
+                         async_callbacks=('reply', 'error'))
+    def SlowPing(self, reply, error):
+        gobject.timeout_add(500, lambda: reply('pong') and False)
+
+
+class ProxyCacheTest(TestCase):
+    """
+    Runs the proxy cache against a sample service on a private bus.
+    """
+
+    def setUp(self):
+        self.daemon = subprocess.Popen(
+            ['dbus-daemon', '--session', '--nofork', '--print-address'],
+            stdout=subprocess.PIPE)
+        address = self.daemon.stdout.readline().strip()
+
+        mainloop = DBusGMainLoop()
+        self.service_bus = dbus.bus.BusConnection(address, mainloop=mainloop)
+
+        self.proxies = ProxyCache()
+        self.proxies.bus = dbus.bus.BusConnection(address, mainloop=mainloop)
+
+        self.timeout = config.DBUS_TIMEOUT
+        self.max_backoff = config.DBUS_MAX_BACKOFF
+        config.DBUS_TIMEOUT = 0.2
+
+    def tearDown(self):
+        config.DBUS_TIMEOUT = self.timeout
+        config.DBUS_MAX_BACKOFF = self.max_backoff
+
+        self.proxies.bus.close()
+        self.service_bus.close()
+        self.daemon.terminate()
+        self.daemon.wait()
+
+    def start_service(self):
+        self.bus_name = dbus.service.BusName(BUS_NAME, self.service_bus)
+        self.service = SampleService(self.service_bus)
+
+    @staticmethod
+    def wait_for(condition, timeout=2):
+        context = gobject.main_context_default()
+        deadline = time.time() + timeout
+
+        while not condition() and time.time() < deadline:
+            if not context.iteration(False):
+                time.sleep(0.01)
+
+        return condition()
+
+    def get(self):
+        return self.proxies.get(BUS_NAME, OBJECT_PATH)
+
+    def test_backoff(self):
+        config.DBUS_MAX_BACKOFF = 4
+
+        assert self.get() is None
+        assert self.proxies.failures[BUS_NAME][0] == 1
+
+        # Backed off, not even trying to connect
+        self.wait_for(lambda: False, timeout=0.2)
+        assert self.get() is None
+        assert self.proxies.failures[BUS_NAME][0] == 1
+
+        for _ in range(4):
+            self.proxies.failed(BUS_NAME)
+
+        count, retry = self.proxies.failures[BUS_NAME]
+        assert count == 5
+        assert retry - time.time() == pytest.approx(4, abs=0.5)
+
+    def test_reconnection(self):
+        assert self.get() is None
+
+        # Connected as soon as the service appears, despite the backoff
+        self.start_service()
+        assert self.wait_for(lambda: BUS_NAME not in self.proxies.failures)
+        assert self.get().Ping() == 'pong'
+
+    def test_sync_call_timeout(self):
+        self.start_service()
+        interface = self.get()
+
+        # The service in this process cannot reply while the call blocks
+        with pytest.raises(dbus.exceptions.DBusException):
+            interface.Ping()
+
+        assert self.proxies.failures[BUS_NAME][0] == 1
+        assert not self.proxies.proxies
+
+    def test_async_call_timeout(self):
+        self.start_service()
+        replies = []
+
+        # Replied later than DBUS_TIMEOUT, which applies to the synchronous
+        # calls only
+        self.get().SlowPing(reply_handler=replies.append,
+                            error_handler=replies.append)
+
+        assert self.wait_for(lambda: replies)
+        assert replies == ['pong']
@@ -0,0 +1,116 @@
+import subprocess
+import time
+from unittest import TestCase
+
+import dbus
+import dbus.bus
+import dbus.service
+import gobject
+from dbus.mainloop.glib import DBusGMainLoop
+
+import purple
+from proxies import ProxyCache
+
+
+class FakePurpleService(dbus.service.Object):
+    """
+    Implements the parts of the Purple DBus interface used by the monitor.
+    """
+
+    def __init__(self, connection):
+        dbus.service.Object.__init__(self, connection, purple.OBJECT_PATH)
+        self.names = {}
+        self.focused = set()
+
+    @dbus.service.method(purple.INTERFACE_NAME, out_signature='ai')
+    def PurpleGetIms(self):
+        return sorted(self.names)
+
+    @dbus.service.method(purple.INTERFACE_NAME, in_signature='i',
+                         out_signature='i')
+    def PurpleConversationHasFocus(self, conversation):
+        return int(conversation in self.focused)
+
+    @dbus.service.method(purple.INTERFACE_NAME, in_signature='i',
+                         out_signature='s')
+    def PurpleConversationGetName(self, conversation):
+        return self.names[conversation]
+
+    @dbus.service.signal(purple.INTERFACE_NAME, signature='issiu')
+    def ReceivedImMsg(self, account, sender, message, conversation, flags):
+        # pylint: disable=too-many-arguments
+        pass
+
+    @dbus.service.signal(purple.INTERFACE_NAME, signature='ii')
+    def ConversationUpdated(self, conversation, update_type):
+        pass
+
+    def receive(self, conversation, sender):
+        self.names[conversation] = sender
+        self.ReceivedImMsg(1, sender, "hello", conversation, 2)
+
+
+class PurpleMonitorTest(TestCase):
+    """
+    Runs the monitor against a fake Purple service on a private bus.
+    """
+
+    def setUp(self):
+        self.daemon = subprocess.Popen(
+            ['dbus-daemon', '--session', '--nofork', '--print-address'],
+            stdout=subprocess.PIPE)
+        address = self.daemon.stdout.readline().strip()
+
+        mainloop = DBusGMainLoop()
+        self.service_bus = dbus.bus.BusConnection(address, mainloop=mainloop)
+        self.bus_name = dbus.service.BusName(purple.BUS_NAME,
+                                             self.service_bus)
+        self.service = FakePurpleService(self.service_bus)
+
+        self.proxies = purple.proxies
+        purple.proxies = ProxyCache()
+        purple.proxies.bus = dbus.bus.BusConnection(address, mainloop=mainloop)
+
+        self.monitor = purple.PurpleMonitor()
+        self.monitor.subscribe()
+
+    def tearDown(self):
+        purple.proxies.bus.close()
+        purple.proxies = self.proxies
+
+        self.service_bus.close()
+        self.daemon.terminate()
+        self.daemon.wait()
+
+    @staticmethod
+    def wait_for(condition, timeout=2):
+        context = gobject.main_context_default()
+        deadline = time.time() + timeout
+
+        while not condition() and time.time() < deadline:
+            if not context.iteration(False):
+                time.sleep(0.01)
+
+        return condition()
+
+    def test_unfocused_conversation(self):
+        self.service.receive(1, 'alice')
+        assert self.wait_for(lambda: self.monitor.unread_senders())
+        assert self.monitor.unread_senders() == ['alice']
+
+    def test_focused_conversation(self):
+        self.service.focused.add(1)
+        self.service.receive(1, 'alice')
+        self.service.receive(2, 'bob')
+
+        # The replies arrive in order, hence alice was processed before bob
+        assert self.wait_for(lambda: self.monitor.unread_senders())
+        assert self.monitor.unread_senders() == ['bob']
+
+    def test_conversation_seen(self):
+        self.service.receive(1, 'alice')
+        assert self.wait_for(lambda: self.monitor.unread_senders())
+
+        self.service.focused.add(1)
+        self.service.ConversationUpdated(1, purple.CONV_UPDATE_UNSEEN)
+        assert self.wait_for(lambda: not self.monitor.unread_senders())
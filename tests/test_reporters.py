@@ -1,10 +1,14 @@
 import datetime
+import importlib
+import shutil
 import subprocess
 import tempfile
 import os
+import sys
 import dbus.mainloop.glib
 
 from tests.base import ReporterTestCase
+from headphones import HeadphoneJack
 from util import run
 from time import sleep
 from tasklib import TaskWarrior, Task
@@ -38,6 +42,14 @@ class ActiveWindowReporterTest(ReporterTestCase):
 
     def setUp(self):
         super(ActiveWindowReporterTest, self).setUp()
+
+        # Evaluate the dependencies of the tested reporter for real
+        module = importlib.import_module('reporters.active_window')
+        self.context.reporters.link(
+            'active_window', module.ActiveWindowReporter(self.context))
+        self.context.reporters.link(
+            'active_window_pid', module.ActiveWindowPidReporter(self.context))
+
         self.close('gedit')
         self.close('Calculator')
         sleep(0.5)
@@ -178,6 +190,97 @@ class FileContentReporterTest(ReporterTestCase):
         assert "ccc" in file_content
 
 
+class FileNewLinesReporterTest(ReporterTestCase):
+    class_name = 'FileNewLinesReporter'
+    module_name = 'file_content'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'log')
+
+        with open(self.path, 'w') as fil:
+            fil.write("old\n")
+
+        super(FileNewLinesReporterTest, self).setUp()
+
+    def append(self, data):
+        with open(self.path, 'a') as fil:
+            fil.write(data)
+
+    def test_new_lines(self):
+        assert self.plugin.run(self.path) == []
+
+        self.append("aaa\nbbb\ncc")
+        assert self.plugin.run(self.path) == ['aaa', 'bbb']
+        assert self.plugin.run(self.path) == []
+
+        self.append("c\n")
+        assert self.plugin.run(self.path) == ['ccc']
+
+    def test_rotated_file(self):
+        assert self.plugin.run(self.path) == []
+
+        os.rename(self.path, self.path + '.1')
+        self.append("new\n")
+        assert self.plugin.run(self.path) == ['new']
+
+
+CODEC_DATA = """Codec: Realtek ALC3202
+Node 0x14 [Pin Complex] wcaps 0x40058d: Stereo Amp-Out
+  Pincap 0x00010014: OUT EAPD Detect
+  Pin Default 0x90170110: [Fixed] Speaker at Int N/A
+    Conn = Analog, Color = Unknown
+  Pin-ctls: {speaker}: OUT
+Node 0x21 [Pin Complex] wcaps 0x40058d: Stereo Amp-Out
+  Pincap 0x0001001c: OUT HP EAPD Detect
+  Pin Default 0x0221401f: [Jack] HP Out at Ext Front
+    Conn = 1/8, Color = Black
+  Pin-ctls: 0xc0: OUT HP
+"""
+
+
+class HeadphonesPluggedReporterTest(ReporterTestCase):
+    class_name = 'HeadphonesPluggedReporter'
+    module_name = 'audio'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'card1'))
+        self.path = os.path.join(self.directory, 'card1', 'codec#0')
+
+        super(HeadphonesPluggedReporterTest, self).setUp()
+
+        # Use a fresh jack, reading the fake codec file
+        self.plugin.jack = HeadphoneJack(
+            codec_glob=os.path.join(self.directory, 'card*', 'codec#*'),
+            acpid_socket=os.path.join(self.directory, 'acpid.socket'),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, speaker, prefix=''):
+        with open(self.path, 'w') as fil:
+            fil.write(prefix + CODEC_DATA.format(speaker=speaker))
+
+    def test_headphones_plugged(self):
+        self.write(speaker='0x40')
+        assert self.plugin.run() is False
+
+        self.write(speaker='0x00')
+        assert self.plugin.run() is True
+
+    def test_node_moved(self):
+        self.write(speaker='0x00')
+        assert self.plugin.run() is True
+
+        self.write(speaker='0x40', prefix='Vendor Id: 0x10ec0236\n')
+        assert self.plugin.run() is False
+
+    def test_no_codec(self):
+        assert self.plugin.run() is None
+
+
 class HamsterActivityReporterTest(ReporterTestCase):
     class_name = 'HamsterActivityReporter'
     module_name = 'hamster'
@@ -235,3 +338,60 @@ class TaskWarriorReporterTest(ReporterTestCase):
             taskfilter={'project': 'work'}
         )
         assert repr(result) == '[work task1]'
+
+    def test_changes_reported(self):
+        assert len(self.plugin.run(warrior_options=self.tw_options)) == 0
+
+        Task(self.warrior, description="test").save()
+        assert repr(self.plugin.run(warrior_options=self.tw_options)) == '[test]'
+
+    def test_time_dependent_filter(self):
+        # The reporters read actor.core.config, which is loaded separately
+        # from the config module of the core tests, patch the one in use
+        config = sys.modules[self.plugin.__module__].config
+
+        max_age = config.TASKWARRIOR_RESULT_MAX_AGE
+        config.TASKWARRIOR_RESULT_MAX_AGE = 1
+
+        try:
+            due = datetime.datetime.now() + datetime.timedelta(seconds=1)
+            Task(self.warrior, description="test", due=due).save()
+
+            rawfilter = ('due.before:now',)
+            assert self.plugin.run(warrior_options=self.tw_options,
+                                   rawfilter=rawfilter) == []
+
+            # The tasks did not change, but the cached result expired
+            sleep(2)
+            assert repr(self.plugin.run(warrior_options=self.tw_options,
+                                        rawfilter=rawfilter)) == '[test]'
+        finally:
+            config.TASKWARRIOR_RESULT_MAX_AGE = max_age
+
+
+class TaskWarriorBulkReporterTest(ReporterTestCase):
+    class_name = 'TaskWarriorBulkReporter'
+    module_name = 'taskwarrior'
+
+    def setUp(self):
+        data_dir = tempfile.mkdtemp()
+        self.warrior = TaskWarrior(data_location=data_dir)
+        self.tw_options = {'data_location': data_dir}
+        super(TaskWarriorBulkReporterTest, self).setUp()
+
+    def test_bulk_filters(self):
+        Task(self.warrior, description="pending task", priority="H").save()
+        done_task = Task(self.warrior, description="done task")
+        done_task.save()
+        done_task.done()
+
+        pending, completed, important, work = self.plugin.run(
+            [{'status': 'pending'}, {'status': 'completed'},
+             {'priority': 'H'}, {'project': 'work'}],
+            warrior_options=self.tw_options
+        )
+
+        assert repr(pending) == '[pending task]'
+        assert repr(completed) == '[done task]'
+        assert repr(important) == '[pending task]'
+        assert repr(work) == '[]'
@@ -0,0 +1,88 @@
+import time
+from unittest import TestCase
+
+import scheduler
+from config import config
+from timeline import ScheduleIndex
+from util import convert_timestamp
+
+
+class FakePlugin(object):
+
+    def __init__(self, run_interval=None, sources=tuple()):
+        self.run_interval = run_interval
+        self.sources = sources
+
+
+class SchedulerTest(TestCase):
+
+    def setUp(self):
+        # Keep the windows registered by the other tests out of the way
+        self.schedule_index = scheduler.schedule_index
+        scheduler.schedule_index = ScheduleIndex()
+
+        self.scheduler = scheduler.Scheduler()
+        self.now = self.timestamp('12.00')
+
+    def tearDown(self):
+        scheduler.schedule_index = self.schedule_index
+
+    def timestamp(self, timestamp):
+        return time.mktime(convert_timestamp(timestamp).timetuple())
+
+    def test_added_plugins_due(self):
+        first, second = FakePlugin(), FakePlugin()
+        self.scheduler.add(first)
+        self.scheduler.add(second)
+
+        assert self.scheduler.due(self.now) == [first, second]
+        assert self.scheduler.due(self.now + 1) == []
+
+    def test_intervals(self):
+        default, slow = FakePlugin(), FakePlugin(run_interval=60)
+        self.scheduler.add(default)
+        self.scheduler.add(slow)
+        self.scheduler.due(self.now)
+
+        assert self.scheduler.due(self.now + config.CHECK_INTERVAL) == [default]
+        assert self.scheduler.due(self.now + 60) == [default, slow]
+
+    def test_wakeup(self):
+        plugin = FakePlugin(run_interval=60, sources=('hamster_activity',))
+        other = FakePlugin(run_interval=60)
+        self.scheduler.add(plugin)
+        self.scheduler.add(other)
+        self.scheduler.due(self.now)
+
+        notified = []
+        self.scheduler.add_listener(lambda: notified.append(True))
+
+        assert not self.scheduler.wakeup('tmux_sessions')
+        assert notified == []
+
+        assert self.scheduler.wakeup('hamster_activity', 'tmux_sessions')
+        assert notified == [True]
+        assert self.scheduler.due(self.now + 1) == [plugin]
+
+    def test_timeout(self):
+        assert self.scheduler.timeout(self.now) is None
+
+        self.scheduler.add(FakePlugin(run_interval=60))
+        self.scheduler.add(FakePlugin(run_interval=30))
+        assert self.scheduler.timeout(self.now) == 0
+
+        self.scheduler.due(self.now)
+        assert self.scheduler.timeout(self.now + 10) == 20
+
+    def test_time_window_boundaries(self):
+        plugins = [FakePlugin(run_interval=3600), FakePlugin(run_interval=3600)]
+        for plugin in plugins:
+            self.scheduler.add(plugin)
+        self.scheduler.due(self.now)
+
+        scheduler.schedule_index.register('12.10', '13.00')
+
+        # Wake up at the start of the window, with everything due
+        assert self.scheduler.timeout(self.now) == 600
+        assert self.scheduler.due(self.now + 300) == []
+        assert self.scheduler.due(self.timestamp('12.10')) == plugins
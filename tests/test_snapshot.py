@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import datetime
+from unittest import TestCase
+
+import pytest
+
+import snapshot
+from activities import ActivitySpec
+from plugins import PersistentStateMixin, Plugin, PluginFactory, PluginMount
+from util import Expiration, Periodic, json_encode
+
+
+def round_trip(value):
+    return snapshot.loads(snapshot.dumps(value))
+
+
+class SnapshotTest(TestCase):
+
+    def test_builtin_values(self):
+        values = [
+            None, True, False, 42, -2**63, 2**63, 10L, 0.5, 'str',
+            u'čučoriedka', [1, u'ž'], (1, 'a'), {'a': [1, (2,)], u'b': {}},
+            datetime.datetime(2016, 2, 29, 23, 59, 59, 999999),
+            datetime.timedelta(days=-1, seconds=5, microseconds=7),
+        ]
+
+        for value in values:
+            restored = round_trip(value)
+            assert restored == value
+
+            # The integers fitting 64 bits are restored as int
+            if not isinstance(value, (int, long)):
+                assert type(restored) == type(value)
+
+    def test_expiration(self):
+        expiration = Expiration(5)
+        expiration.expiration_notified = True
+
+        restored = round_trip(expiration)
+        assert type(restored) is Expiration
+        assert vars(restored) == vars(expiration)
+
+    def test_periodic(self):
+        periodic = Periodic(3, automatic_intervals=False)
+        periodic.start_new_interval()
+
+        restored = round_trip(periodic)
+        assert type(restored) is Periodic
+        assert vars(restored) == vars(periodic)
+
+    def test_activity_spec(self):
+        spec = ActivitySpec('writing', 30, max_shrinking=0.5, priority=2)
+        spec.shrinking = 0.75
+        spec.skipped = True
+
+        restored = round_trip([spec])[0]
+        assert type(restored) is ActivitySpec
+        assert vars(restored) == vars(spec)
+
+    def test_unsupported_version(self):
+        data = snapshot.PREFIX + base64.b64encode(chr(snapshot.VERSION + 1))
+
+        with pytest.raises(ValueError):
+            snapshot.loads(data)
+
+    def test_unknown_codec(self):
+        data = snapshot.PREFIX + base64.b64encode(
+            chr(snapshot.VERSION) + 'c' + '\x00' + 'N')
+
+        with pytest.raises(ValueError):
+            snapshot.loads(data)
+
+    def test_truncated_snapshot(self):
+        data = snapshot.dumps([u'čučoriedka', 10])
+
+        with pytest.raises(ValueError):
+            snapshot.loads(data[:-8])
+
+
+class PersistentStateTest(TestCase):
+
+    def setUp(self):
+        class Sample(PersistentStateMixin, Plugin):
+            __metaclass__ = PluginMount
+
+            persistent_attrs = ('identifier', 'expired')
+
+        class Restored(Sample):
+            identifier = 'restored'
+
+            def __init__(self, context, setup=True):
+                super(Restored, self).__init__(context)
+                self.expired = None
+
+        self.factory = PluginFactory(Sample, None)
+        self.plugin_class = Restored
+
+    def test_snapshot_state(self):
+        plugin = self.plugin_class(None)
+        plugin.expired = Expiration(5)
+
+        restored = PersistentStateMixin.restore(plugin.store(), self.factory,
+                                                None)
+        assert type(restored) is self.plugin_class
+        assert vars(restored.expired) == vars(plugin.expired)
+
+    def test_json_state(self):
+        # The state stored by the previous versions
+        expired = Expiration(5)
+        data = json_encode({'identifier': 'restored', 'expired': expired})
+
+        restored = PersistentStateMixin.restore(data, self.factory, None)
+        assert type(restored) is self.plugin_class
+        assert vars(restored.expired) == vars(expired)
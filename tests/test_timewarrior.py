@@ -0,0 +1,123 @@
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from config import config
+from timewarrior import TIME_FORMAT, TimewarriorData, parse_interval
+
+
+class ParseIntervalTest(TestCase):
+
+    def test_closed_interval(self):
+        start, end, tags = parse_interval(
+            'inc 20170101T100000Z - 20170101T110000Z # work\n')
+
+        assert start == datetime.datetime(2017, 1, 1, 10)
+        assert end == datetime.datetime(2017, 1, 1, 11)
+        assert tags == ('work',)
+
+    def test_open_interval(self):
+        assert parse_interval('inc 20170101T100000Z # work actor\n') == \
+            (datetime.datetime(2017, 1, 1, 10), None, ('work', 'actor'))
+
+    def test_untagged_interval(self):
+        assert parse_interval('inc 20170101T100000Z\n') == \
+            (datetime.datetime(2017, 1, 1, 10), None, ())
+
+    def test_quoted_tags_and_annotation(self):
+        assert parse_interval(
+            'inc 20170101T100000Z # "deep work" actor # "fixing #12"\n'
+        ) == (datetime.datetime(2017, 1, 1, 10), None, ('deep work', 'actor'))
+
+    def test_other_lines(self):
+        assert parse_interval('\n') is None
+        assert parse_interval('exc monday <8:00:00\n') is None
+
+
+class TimewarriorDataTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_dir = config.TIMEWARRIOR_DATA_DIR
+        config.TIMEWARRIOR_DATA_DIR = self.directory
+
+        self.data = TimewarriorData()
+        self.path = self.data_file('2017-01')
+
+    def tearDown(self):
+        config.TIMEWARRIOR_DATA_DIR = self.data_dir
+        shutil.rmtree(self.directory)
+
+    def data_file(self, month):
+        return os.path.join(self.directory, month + '.data')
+
+    @staticmethod
+    def line(tags, minutes_ago=5, closed=False):
+        now = datetime.datetime.utcnow()
+        start = now - datetime.timedelta(minutes=minutes_ago)
+        line = 'inc ' + start.strftime(TIME_FORMAT)
+
+        if closed:
+            line += ' - ' + now.strftime(TIME_FORMAT)
+
+        return line + ' # ' + tags + '\n'
+
+    def write(self, data, path=None, mode='w'):
+        with open(path or self.path, mode) as fil:
+            fil.write(data)
+
+    def test_no_data(self):
+        assert self.data.activity() is None
+        assert self.data.duration() is None
+
+    def test_tracking(self):
+        self.write(self.line('work', minutes_ago=10, closed=True))
+        assert self.data.activity() is None
+
+        # Start tracking
+        self.write(self.line('actor "deep work"'), mode='a')
+        assert self.data.activity() == 'actor "deep work"'
+        assert self.data.duration() == 5
+
+        # Stop tracking, the last line is rewritten
+        self.write(self.line('work', minutes_ago=10, closed=True) +
+                   self.line('actor "deep work"', closed=True))
+        assert self.data.activity() is None
+
+        # Track something else, the line is appended
+        self.write(self.line('writing', minutes_ago=0), mode='a')
+        assert self.data.activity() == 'writing'
+
+    def test_incomplete_line(self):
+        self.write(self.line('work'))
+        assert self.data.activity() == 'work'
+
+        self.write(self.line('writing', minutes_ago=0).rstrip('\n'), mode='a')
+        assert self.data.activity() == 'work'
+
+        self.write('\n', mode='a')
+        assert self.data.activity() == 'writing'
+
+    def test_cancelled_interval(self):
+        closed = self.line('work', minutes_ago=10, closed=True)
+        self.write(closed + self.line('writing'))
+        assert self.data.activity() == 'writing'
+
+        # Cancelling removes the open interval
+        self.write(closed)
+        assert self.data.activity() is None
+
+    def test_new_month(self):
+        self.write(self.line('work'))
+        assert self.data.activity() == 'work'
+
+        # The interval is stopped at the end of the month, and continues
+        # in the file of the new month
+        self.write(self.line('work', closed=True))
+        self.write(self.line('work', minutes_ago=1),
+                   path=self.data_file('2017-02'))
+        assert self.data.activity() == 'work'
+        assert self.data.duration() == 1
+        assert self.data.path == self.data_file('2017-02')
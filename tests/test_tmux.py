@@ -0,0 +1,190 @@
+import Queue
+import threading
+import time
+from StringIO import StringIO
+from unittest import TestCase
+
+import pytest
+
+import tmux
+from config import config
+from tmux import CONTROL_SESSION, TmuxControlClient, TmuxError
+
+CONTROL_OUTPUT = '''\
+%begin 1500000000 1 0
+%end 1500000000 1 0
+%sessions-changed
+%output %1 some output
+%begin 1500000000 2 1
+1\twork\t1\teditor\t1\t100\t%1
+%end 1500000000 2 1
+%window-renamed @1 editor
+%window-add @2
+%begin 1500000000 3 1
+unknown command: foo
+%error 1500000000 3 1
+'''
+
+PANES = [
+    '1\twork\t1\teditor\t1\t100\t%1',
+    '1\twork\t1\teditor\t0\t101\t%2',
+    '1\twork\t0\tshell\t1\t102\t%3',
+    '0\tdetached\t1\tvim\t1\t103\t%4',
+    '1\t{0}\t1\tcat\t1\t104\t%5'.format(CONTROL_SESSION),
+    'malformed',
+]
+
+
+class FakeProcess(object):
+
+    def __init__(self, output=''):
+        self.stdout = StringIO(output)
+
+    def poll(self):
+        return None
+
+
+class FakeGObject(object):
+
+    def __init__(self):
+        self.callbacks = []
+        self.threads = []
+
+    def idle_add(self, callback):
+        self.callbacks.append(callback)
+        self.threads.append(threading.current_thread())
+
+    def iterate(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class ParserTest(TestCase):
+
+    def setUp(self):
+        self.gobject = tmux.gobject
+        tmux.gobject = FakeGObject()
+
+        self.client = TmuxControlClient()
+        self.client.dirty = False
+
+        self.notified = []
+        self.client.add_listener(
+            lambda: self.notified.append(threading.current_thread()))
+
+    def tearDown(self):
+        tmux.gobject = self.gobject
+
+    def read(self, output):
+        replies = Queue.Queue()
+        reader = threading.Thread(target=self.client.read,
+                                  args=(FakeProcess(output), replies))
+        reader.start()
+        reader.join()
+
+        return [replies.get_nowait() for _ in range(replies.qsize())]
+
+    def test_replies(self):
+        assert self.read(CONTROL_OUTPUT) == [
+            (True, []),
+            (True, ['1\twork\t1\teditor\t1\t100\t%1']),
+            (False, ['unknown command: foo']),
+            (False, ['tmux control client exited']),
+        ]
+
+        # The replies of a previous connection do not reach the current one
+        assert self.client.replies.empty()
+
+    def test_notifications(self):
+        self.read(CONTROL_OUTPUT)
+        assert self.client.dirty
+
+        # Scheduled once from the reader thread, called from the main loop
+        assert len(tmux.gobject.callbacks) == 1
+        assert tmux.gobject.threads[0] is not threading.current_thread()
+        assert self.notified == []
+
+        tmux.gobject.iterate()
+        assert self.notified == [threading.current_thread()]
+
+        # Scheduled again after the listeners were called
+        self.read('%sessions-changed\n')
+        assert len(tmux.gobject.callbacks) == 1
+
+    def test_ignored_notifications(self):
+        self.read('%output %1 hello\n%begin 1 1 0\n%end 1 1 0\n')
+
+        assert not tmux.gobject.callbacks
+        assert not self.client.notify_pending
+
+    def test_reply_timeout(self):
+        timeout = config.TMUX_TIMEOUT
+        config.TMUX_TIMEOUT = 0.05
+
+        try:
+            with pytest.raises(TmuxError):
+                self.client.wait_for_reply()
+        finally:
+            config.TMUX_TIMEOUT = timeout
+
+        assert self.client.process is None
+
+    def test_failed_reply(self):
+        self.client.replies.put((False, ['unknown command: foo']))
+
+        with pytest.raises(TmuxError) as exc:
+            self.client.wait_for_reply()
+
+        assert 'unknown command: foo' in str(exc.value)
+
+
+class FakeControlClient(TmuxControlClient):
+
+    def __init__(self):
+        super(FakeControlClient, self).__init__()
+        self.process = FakeProcess()
+        self.commands = []
+
+    def command(self, command):
+        self.commands.append(command)
+        return PANES
+
+
+class PaneModelTest(TestCase):
+
+    def setUp(self):
+        self.client = FakeControlClient()
+        self.max_age = config.TMUX_MODEL_MAX_AGE
+        config.TMUX_MODEL_MAX_AGE = 5
+
+    def tearDown(self):
+        config.TMUX_MODEL_MAX_AGE = self.max_age
+
+    def test_active_panes(self):
+        assert self.client.active_sessions() == ['work']
+        assert self.client.active_windows() == ['editor']
+
+        pane = self.client.active_panes()[0]
+        assert pane.pane_pid == 100
+        assert pane.pane_id == '%1'
+
+        # The hidden control session is not reported
+        assert all(pane.session_name != CONTROL_SESSION
+                   for pane in self.client.panes)
+        assert len(self.client.panes) == 4
+
+    def test_model_max_age(self):
+        self.client.active_panes()
+        self.client.active_panes()
+        assert len(self.client.commands) == 1
+
+        # Refreshed after a notification
+        self.client.dirty = True
+        self.client.active_panes()
+        assert len(self.client.commands) == 2
+
+        # Or once the model is too old
+        self.client.refreshed = time.time() - 6
+        self.client.active_panes()
+        assert len(self.client.commands) == 3
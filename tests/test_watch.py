@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from watch import FileWatcher
+
+
+class FileWatcherTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'file')
+        self.watcher = FileWatcher()
+
+        with open(self.path, 'w') as fil:
+            fil.write("aaa\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def append(self, path, data):
+        with open(path, 'a') as fil:
+            fil.write(data)
+
+    def test_changed_file(self):
+        signature = self.watcher.signature(self.path)
+        assert self.watcher.signature(self.path) == signature
+
+        self.append(self.path, "bbb\n")
+        assert self.watcher.signature(self.path) != signature
+
+    def test_directory(self):
+        signature = self.watcher.signature(self.directory, directory=True)
+        assert self.watcher.signature(self.directory, directory=True) == \
+            signature
+
+        self.append(os.path.join(self.directory, 'new'), "aaa\n")
+        assert self.watcher.signature(self.directory, directory=True) != \
+            signature
+
+    def test_replaced_file(self):
+        signature = self.watcher.signature(self.path)
+
+        replacement = os.path.join(self.directory, 'replacement')
+        self.append(replacement, "bbb\n")
+        os.rename(replacement, self.path)
+
+        assert self.watcher.signature(self.path) != signature
+
+    def test_symlinked_file(self):
+        target_directory = os.path.join(self.directory, 'target')
+        target = os.path.join(target_directory, 'file')
+        link = os.path.join(self.directory, 'link')
+
+        os.mkdir(target_directory)
+        self.append(target, "aaa\n")
+        os.symlink(target, link)
+
+        signature = self.watcher.signature(link)
+        assert self.watcher.signature(link) == signature
+
+        # The target changes
+        self.append(target, "bbb\n")
+        changed = self.watcher.signature(link)
+        assert changed != signature
+
+        # The link is pointed elsewhere
+        os.remove(link)
+        os.symlink(self.path, link)
+        assert self.watcher.signature(link) != changed
+
+    def test_volatile_file(self):
+        # The files of the pseudo filesystems change without any events
+        signature = self.watcher.signature('/proc/self/stat')
+        assert self.watcher.signature('/proc/self/stat') != signature
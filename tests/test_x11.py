@@ -0,0 +1,166 @@
+import os
+import subprocess
+import sys
+import time
+import types
+from unittest import TestCase
+
+from Xlib import X, Xatom, display, error
+
+from x11 import ActiveWindowMonitor
+
+XVFB_DISPLAY = ':97'
+
+
+class ActiveWindowMonitorReconnectTest(TestCase):
+
+    def test_reconnect_rate_limited(self):
+        monitor = ActiveWindowMonitor(':12345')
+
+        assert not monitor.available
+        attempt = monitor.last_attempt
+
+        assert not monitor.available
+        assert monitor.last_attempt == attempt
+
+
+class ClosedDisplay(object):
+
+    def __init__(self):
+        self.closed = False
+
+    def pending_events(self):
+        raise error.ConnectionClosedError('Server')
+
+    def close(self):
+        self.closed = True
+
+
+class ActiveWindowMonitorDisconnectTest(TestCase):
+
+    def setUp(self):
+        self.removed = []
+        self.gobject = sys.modules.get('gobject')
+
+        gobject = types.ModuleType('gobject')
+        gobject.source_remove = self.removed.append
+        sys.modules['gobject'] = gobject
+
+        self.monitor = ActiveWindowMonitor()
+        self.monitor.display = ClosedDisplay()
+        self.monitor.io_watch = 42
+
+    def tearDown(self):
+        if self.gobject is not None:
+            sys.modules['gobject'] = self.gobject
+        else:
+            del sys.modules['gobject']
+
+    def test_disconnect(self):
+        display = self.monitor.display
+        self.monitor.disconnect()
+
+        assert display.closed
+        assert self.removed == [42]
+        assert self.monitor.display is None
+        assert self.monitor.io_watch is None
+
+    def test_disconnected_from_watch(self):
+        display = self.monitor.display
+
+        # The watch is removed by returning False only
+        assert self.monitor.handle_io() is False
+        assert display.closed
+        assert self.removed == []
+        assert self.monitor.io_watch is None
+
+
+class ActiveWindowMonitorTest(TestCase):
+    """
+    Drives the _NET_ACTIVE_WINDOW property of the root window of a private
+    Xvfb server, as the window manager would.
+    """
+
+    def setUp(self):
+        self.xvfb = subprocess.Popen(['Xvfb', XVFB_DISPLAY, '-nolisten', 'tcp'],
+                                     stdout=open(os.devnull, 'w'),
+                                     stderr=subprocess.STDOUT)
+        self.display = self.wait_for_display()
+        self.root = self.display.screen().root
+        self.monitor = ActiveWindowMonitor(XVFB_DISPLAY)
+
+    def tearDown(self):
+        self.display.close()
+        self.xvfb.terminate()
+        self.xvfb.wait()
+
+    def wait_for_display(self, timeout=5):
+        deadline = time.time() + timeout
+
+        while True:
+            try:
+                return display.Display(XVFB_DISPLAY)
+            except error.DisplayError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def atom(self, name):
+        return self.display.intern_atom(name)
+
+    def create_window(self, name, pid):
+        window = self.root.create_window(0, 0, 10, 10, 0, X.CopyFromParent)
+        self.set_name(window, name)
+        window.change_property(self.atom('_NET_WM_PID'), Xatom.CARDINAL, 32,
+                               [pid])
+        return window
+
+    def set_name(self, window, name):
+        window.change_property(self.atom('_NET_WM_NAME'),
+                               self.atom('UTF8_STRING'), 8, name)
+        self.display.sync()
+
+    def activate(self, window):
+        self.root.change_property(self.atom('_NET_ACTIVE_WINDOW'),
+                                  Xatom.WINDOW, 32, [window.id])
+        self.display.sync()
+
+    def wait_for_name(self, name, timeout=2):
+        deadline = time.time() + timeout
+
+        while time.time() < deadline:
+            snapshot = self.monitor.active_window()
+            if snapshot is not None and snapshot.name == name:
+                return snapshot
+            time.sleep(0.01)
+
+        return self.monitor.active_window()
+
+    def test_active_window_changes(self):
+        first = self.create_window('first', os.getpid())
+        second = self.create_window('second', 1)
+
+        assert self.monitor.active_window() is None
+
+        self.activate(first)
+        snapshot = self.wait_for_name('first')
+        assert snapshot.window_id == first.id
+        assert snapshot.pid == os.getpid()
+        assert snapshot.process_name
+
+        self.activate(second)
+        snapshot = self.wait_for_name('second')
+        assert snapshot.window_id == second.id
+        assert snapshot.pid == 1
+
+    def test_title_changes(self):
+        window = self.create_window('before', os.getpid())
+        self.activate(window)
+        assert self.wait_for_name('before') is not None
+
+        changes = []
+        self.monitor.add_listener(lambda: changes.append(True))
+
+        self.set_name(window, 'after')
+        assert self.wait_for_name('after').window_id == window.id
+        assert changes